@@ -1,55 +1,3649 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
-import pyautogui
 import time
 import threading
-import keyboard
 import json
+import os
+import sys
 import random
+import math
+import re
+import argparse
+import itertools
+import importlib.util
+import functools
+import statistics
+import hashlib
+import struct
+from array import array
+from collections import deque
 
-# Ensure pyautogui is configured properly
-pyautogui.FAILSAFE = True  # Move mouse to corner to abort
-pyautogui.PAUSE = 0        # No delay between actions
+# GUI, hotkey, injection and NumPy modules are imported on demand so the command
+# line and the daemon start without paying for tkinter, pyautogui or keyboard. The
+# same goes for asyncio and concurrent.futures, imported by the code that uses them.
+tk = ttk = messagebox = filedialog = None
+np = None
+_numpy_missing = False
+
+
+def _load_gui():
+    """Import tkinter into the module globals used by the GUI."""
+    global tk, ttk, messagebox, filedialog
+    if tk is None:
+        import tkinter
+        from tkinter import ttk as tk_ttk, messagebox as tk_messagebox, filedialog as tk_filedialog
+        tk, ttk, messagebox, filedialog = tkinter, tk_ttk, tk_messagebox, tk_filedialog
+
+
+def _load_numpy():
+    """Return the numpy module, or None if it isn't installed."""
+    global np, _numpy_missing
+    if np is None and not _numpy_missing:
+        try:
+            import numpy
+        except ImportError:  # Batched timing is optional; the scalar model is used instead
+            _numpy_missing = True
+        else:
+            np = numpy
+    return np
+
+# ---------- Timing model ----------
+class TimingModel:
+    """Scalar keystroke timing: a WPM random walk with bursts, micro-variation and
+    occasional "thinking" pauses. The WPM range is a snapshot taken when the model is
+    created, so the typing thread never has to read Tk variables.
+    """
+
+    def __init__(self, min_wpm, max_wpm, start_wpm=None, rng=None):
+        self.rng = rng if rng is not None else random  # Per-session random.Random
+        self.min_wpm = max(1, min_wpm)
+        self.max_wpm = max(self.min_wpm, max_wpm)
+
+        # Typing pattern variables
+        self.current_wpm = start_wpm if start_wpm is not None else (self.min_wpm + self.max_wpm) / 2
+        self.target_wpm = self.current_wpm  # Target speed to gradually move towards
+        self.speed_change_chance = 0.15     # 15% chance to change speed per character
+        self.acceleration = 0               # Current speed change direction and magnitude
+        self.burst_mode = False             # For sudden speed bursts
+
+    def next_delay(self):
+        """Calculate delay between keystrokes with dynamic speed changes (returns milliseconds)"""
+        rng = self.rng
+        min_wpm = self.min_wpm
+        max_wpm = self.max_wpm
+
+        # Chance to change typing behavior
+        if rng.random() < self.speed_change_chance:
+            # Decide whether to start a burst or change target speed
+            if rng.random() < 0.3:  # 30% chance for burst
+                self.burst_mode = True
+                self.target_wpm = max_wpm
+                self.acceleration = 5.0  # Rapid acceleration
+            else:
+                self.burst_mode = False
+                self.target_wpm = rng.uniform(min_wpm, max_wpm)
+                self.acceleration = rng.uniform(-2.0, 2.0)
+
+        # Update current speed based on acceleration and target
+        if self.burst_mode:
+            # Rapid approach to target during burst
+            self.current_wpm = min(self.current_wpm + self.acceleration, self.target_wpm)
+            if self.current_wpm >= self.target_wpm:
+                self.burst_mode = False
+                self.target_wpm = min_wpm  # Return to slower speed after burst
+        else:
+            # Gradual approach to target speed
+            if abs(self.current_wpm - self.target_wpm) < 0.1:
+                if rng.random() < 0.2:  # 20% chance to change target
+                    self.target_wpm = rng.uniform(min_wpm, max_wpm)
+            else:
+                self.current_wpm += self.acceleration
+                self.current_wpm = max(min_wpm, min(self.current_wpm, max_wpm))
+
+        # Convert current WPM to milliseconds per character
+        chars_per_minute = max(5, self.current_wpm * 5)
+        base_delay = 60000 / chars_per_minute
+
+        # Add micro variations (±10%)
+        variation = base_delay * 0.1
+        actual_delay = base_delay + rng.uniform(-variation, variation)
+
+        # Occasionally add "thinking" pauses mid-word (5% chance)
+        if not self.burst_mode and rng.random() < 0.05:
+            actual_delay += rng.uniform(100, 300)  # Add 0.1–0.3 second pause
+
+        return actual_delay
+
+    def delays(self, n):
+        """Return the next n delays (milliseconds) as a list."""
+        return [self.next_delay() for _ in range(n)]
+
+    def get_state(self):
+        """JSON-serializable walk state (the session RNG is captured separately)."""
+        return {
+            "kind": type(self).__name__,
+            "current_wpm": self.current_wpm,
+            "target_wpm": self.target_wpm,
+            "acceleration": self.acceleration,
+            "burst_mode": self.burst_mode,
+        }
+
+    def set_state(self, state):
+        if state["kind"] != type(self).__name__:
+            raise ValueError(f"timing state was saved by {state['kind']}, not {type(self).__name__}")
+        self.current_wpm = state["current_wpm"]
+        self.target_wpm = state["target_wpm"]
+        self.acceleration = state["acceleration"]
+        self.burst_mode = state["burst_mode"]
+
+
+class BatchTimingModel(TimingModel):
+    """NumPy timing engine: generates delays a block at a time with the same statistics
+    as TimingModel.
+
+    Speed changes split a block into segments with constant acceleration. Inside a
+    segment the WPM is a clipped linear ramp, optionally holding at the target for a
+    geometric number of steps once it gets within 0.1 WPM of it, so only the segment
+    start values are computed sequentially and every per-character step is vectorized.
+    A second target hit within the same segment is not modelled.
+    """
+
+    block_size = 4096
+
+    def __init__(self, min_wpm, max_wpm, start_wpm=None, rng=None):
+        if _load_numpy() is None:
+            raise RuntimeError("BatchTimingModel requires numpy")
+        super().__init__(min_wpm, max_wpm, start_wpm, rng)
+        self.np_rng = np.random.default_rng(self.rng.getrandbits(64))  # Derived from the session RNG
+        self._buffer = []
+        self._pos = 0
+
+    def next_delay(self):
+        if self._pos >= len(self._buffer):
+            self._buffer = self.delays(self.block_size).tolist()
+            self._pos = 0
+        delay = self._buffer[self._pos]
+        self._pos += 1
+        return delay
+
+    def get_state(self):
+        state = super().get_state()
+        state["np_rng"] = self.np_rng.bit_generator.state
+        state["buffer"] = self._buffer[self._pos:]  # Delays generated but not yet handed out
+        return state
+
+    def set_state(self, state):
+        super().set_state(state)
+        self.np_rng.bit_generator.state = state["np_rng"]
+        self._buffer = list(state["buffer"])
+        self._pos = 0
+
+    @staticmethod
+    def _first_hit(w, a, target):
+        """Steps taken before a ramp from w with slope a comes within 0.1 of target."""
+        if abs(w - target) < 0.1:
+            return 0
+        if a == 0:
+            return None
+        k_lo, k_hi = sorted(((target - 0.1 - w) / a, (target + 0.1 - w) / a))
+        k = max(1, math.floor(k_lo) + 1)
+        return k if k < k_hi else None
+
+    def delays(self, n):
+        """Return the next n delays (milliseconds) as a NumPy array."""
+        rng = self.np_rng
+        lo, hi = float(self.min_wpm), float(self.max_wpm)
+        if n <= 0:
+            return np.empty(0)
+
+        # Segment boundaries: a speed change happens before the step it is drawn for
+        starts = np.flatnonzero(rng.random(n) < self.speed_change_chance)
+        carried = starts.size == 0 or starts[0] != 0
+        if carried:
+            starts = np.concatenate(([0], starts))
+        lengths = np.diff(np.append(starts, n))
+        count = starts.size
+
+        is_burst = rng.random(count) < 0.3  # 30% chance for burst
+        accel = np.where(is_burst, 5.0, rng.uniform(-2.0, 2.0, count))
+        target = np.where(is_burst, hi, rng.uniform(lo, hi, count))
+        holds = rng.geometric(0.2, count)   # Steps held at target before retargeting (20% chance each)
+        if carried:
+            is_burst[0] = self.burst_mode
+            accel[0] = self.acceleration
+            target[0] = self.target_wpm
+
+        # Sequential part: each segment starts where the previous one ended
+        never = n + 1
+        w0 = np.empty(count)
+        k_hit = np.full(count, never, dtype=np.int64)
+        w = float(self.current_wpm)
+        seg_burst = is_burst.tolist()
+        seg_accel = accel.tolist()
+        seg_target = target.tolist()
+        seg_len = lengths.tolist()
+        seg_hold = holds.tolist()
+        for s in range(count):
+            w0[s] = w
+            a, length = seg_accel[s], seg_len[s]
+            if seg_burst[s]:
+                w = min(w + a * length, hi)
+                continue
+            kh = self._first_hit(w, a, seg_target[s])
+            if kh is not None and kh < length:
+                k_hit[s] = kh
+                steps = kh + max(0, length - kh - seg_hold[s])
+            else:
+                steps = length
+            w = min(max(w + a * steps, lo), hi)
+
+        # Vectorized part: expand segments to per-character speeds
+        seg = np.repeat(np.arange(count), lengths)
+        k = np.arange(1, n + 1) - starts[seg]
+        kh = k_hit[seg]
+        steps = np.minimum(k, kh) + np.maximum(0, k - kh - holds[seg])
+        wpm = np.clip(w0[seg] + accel[seg] * steps, lo, hi)
+        burst = is_burst[seg] & (wpm < hi)
+
+        # Convert WPM to milliseconds per character, ±10% micro variation, 5% thinking pauses
+        base = 60000.0 / np.maximum(5.0, wpm * 5.0)
+        delays = base * (1.0 + rng.uniform(-0.1, 0.1, n))
+        thinking = (rng.random(n) < 0.05) & ~burst
+        delays += thinking * rng.uniform(100, 300, n)
+
+        # Carry the walk state into the next block
+        last = count - 1
+        self.current_wpm = float(wpm[-1])
+        self.burst_mode = bool(burst[-1])
+        self.acceleration = seg_accel[last]
+        if seg_burst[last] and not self.burst_mode:
+            self.target_wpm = lo  # Return to slower speed after burst
+        elif k_hit[last] < never and seg_len[last] > k_hit[last] + seg_hold[last]:
+            self.target_wpm = float(rng.uniform(lo, hi))
+        else:
+            self.target_wpm = seg_target[last]
+        return delays
+
+
+def make_timing_model(min_wpm, max_wpm, start_wpm=None, engine="auto", rng=None):
+    """Return the batched NumPy timing model when available, else the scalar one."""
+    if engine == "batch" or (engine == "auto" and _load_numpy() is not None):
+        return BatchTimingModel(min_wpm, max_wpm, start_wpm, rng)
+    return TimingModel(min_wpm, max_wpm, start_wpm, rng)
+
+
+def _ks_distance(a, b):
+    """Two-sample Kolmogorov–Smirnov statistic of two sorted sequences."""
+    i = j = 0
+    d = 0.0
+    while i < len(a) and j < len(b):
+        if a[i] <= b[j]:
+            i += 1
+        else:
+            j += 1
+        d = max(d, abs(i / len(a) - j / len(b)))
+    return d
+
+
+def compare_timing_engines(n=100000, min_wpm=60, max_wpm=80, seed=None):
+    """Generate n delays with both engines and summarize their distributions.
+
+    Returns per-engine mean/stdev/percentiles plus the KS distance between the two
+    samples, so the batched engine can be checked against the scalar reference. A seed
+    makes both samples reproducible.
+    """
+    rng = random.Random(seed)
+    samples = {"scalar": sorted(TimingModel(min_wpm, max_wpm, rng=rng).delays(n))}
+    if _load_numpy() is not None:
+        samples["batch"] = sorted(BatchTimingModel(min_wpm, max_wpm, rng=rng).delays(n).tolist())
+
+    result = {}
+    for name, values in samples.items():
+        q = statistics.quantiles(values, n=20)
+        result[name] = {
+            "mean": round(statistics.fmean(values), 3),
+            "stdev": round(statistics.pstdev(values), 3),
+            "p5": round(q[0], 3),
+            "p50": round(q[9], 3),
+            "p95": round(q[18], 3),
+        }
+    if "batch" in samples:
+        result["ks_distance"] = round(_ks_distance(samples["scalar"], samples["batch"]), 4)
+    return result
+
+
+# ---------- Source input ----------
+SOURCE_CHUNK_SIZE = 64 * 1024  # Characters per streamed chunk
+
+
+def iter_text_chunks(text, chunk_size=SOURCE_CHUNK_SIZE):
+    """Yield an in-memory string in consecutive chunks."""
+    for start in range(0, len(text), chunk_size):
+        yield text[start:start + chunk_size]
+
+
+def iter_source_chunks(path, chunk_size=SOURCE_CHUNK_SIZE, encoding="utf-8"):
+    """Stream a source document from a file ("-" for stdin) in chunks.
+
+    The output matches what .strip() would give for the whole document: leading
+    whitespace is dropped and a trailing whitespace run is held back until more text
+    follows it. Only the current chunk (plus at most one held-back run) is in memory.
+    """
+    f = sys.stdin if path == "-" else open(path, "r", encoding=encoding, errors="replace")
+    try:
+        started = False
+        pending = ""
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            if not started:
+                chunk = chunk.lstrip()
+                if not chunk:
+                    continue
+                started = True
+
+            body = chunk.rstrip()
+            if not body:
+                pending += chunk
+                if len(pending) > chunk_size:
+                    # Keep memory bounded; worst case some trailing whitespace gets typed
+                    yield pending
+                    pending = ""
+                continue
+            yield pending + body
+            pending = chunk[len(body):]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+# ---------- Keyboard layouts ----------
+LAYOUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "layouts")
+DEFAULT_LAYOUT = "qwerty"
+
+
+def _alias_table(weights):
+    """Vose alias table for O(1) sampling from a discrete distribution."""
+    n = len(weights)
+    total = sum(weights)
+    scaled = [w * n / total for w in weights]
+    prob = [1.0] * n
+    alias = list(range(n))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] -= 1.0 - scaled[s]
+        (small if scaled[l] < 1.0 else large).append(l)
+    return prob, alias
+
+
+class KeyboardLayout:
+    """Physical key geometry of one layout with precomputed typo tables.
+
+    A layout file (layouts/<name>.json) lists keyboard rows, each with a horizontal
+    stagger offset and its keys as "<unshifted><shifted>" character pairs. Every key
+    sits at (offset + column, row); keys within neighbor_radius of each other are
+    typo candidates, weighted by inverse squared distance, so the nearest keys are
+    hit most often. Candidates keep the shift state of the intended character, and
+    each character gets an alias table so a typo is drawn in O(1).
+
+    An ASCII character only gets ASCII candidates: backends that type through a US
+    keymap drop characters such as é or ö, so such a typo would be lost while its
+    correction still deletes a character. Non-ASCII characters may get either.
+    """
+
+    neighbor_radius = 1.3
+
+    def __init__(self, name, rows, title=None):
+        self.name = name
+        self.title = title or name
+        self.positions = {}  # char -> (x, y, shifted)
+        keys = []            # (x, y, unshifted, shifted)
+        for y, row in enumerate(rows):
+            for col, pair in enumerate(row["keys"]):
+                x = row["offset"] + col
+                keys.append((x, y, pair[0], pair[1]))
+                self.positions.setdefault(pair[0], (x, y, False))
+                self.positions.setdefault(pair[1], (x, y, True))
+
+        # char -> (candidates, prob, alias)
+        self.table = {}
+        radius = self.neighbor_radius
+        for ch, (x, y, shifted) in self.positions.items():
+            candidates = []
+            weights = []
+            for kx, ky, lower, upper in keys:
+                dist = math.hypot(kx - x, ky - y)
+                out = upper if shifted else lower
+                if 0 < dist <= radius and out != ch and (out.isascii() or not ch.isascii()):
+                    candidates.append(out)
+                    weights.append(1.0 / (dist * dist))
+            if candidates:
+                prob, alias = _alias_table(weights)
+                self.table[ch] = (tuple(candidates), prob, alias)
+
+    @classmethod
+    def load(cls, name):
+        with open(os.path.join(LAYOUT_DIR, f"{name}.json"), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(name, data["rows"], data.get("name"))
+
+    def neighbors(self, ch):
+        """Typo candidates for ch with their probabilities (for inspection)."""
+        entry = self.table.get(ch)
+        if entry is None:
+            return {}
+        candidates, prob, alias = entry
+        n = len(candidates)
+        result = dict.fromkeys(candidates, 0.0)
+        for i in range(n):
+            result[candidates[i]] += prob[i] / n
+            result[candidates[alias[i]]] += (1.0 - prob[i]) / n
+        return result
+
+    def neighbor(self, ch, rng=random):
+        """Return a nearby key for ch (same shift state) or None"""
+        entry = self.table.get(ch)
+        if entry is None:
+            # Uppercase letters that only exist in lowercase on this layout (e.g. É)
+            lower = ch.lower()
+            if lower == ch or lower not in self.table:
+                return None
+            return self.neighbor(lower, rng).upper()
+        candidates, prob, alias = entry
+        i = int(rng.random() * len(candidates))
+        return candidates[i] if rng.random() < prob[i] else candidates[alias[i]]
+
+
+_layouts = {}
+
+
+def available_layouts():
+    try:
+        return sorted(f[:-5] for f in os.listdir(LAYOUT_DIR) if f.endswith(".json"))
+    except OSError:
+        return []
+
+
+def get_layout(name=DEFAULT_LAYOUT):
+    """Load a keyboard layout once and cache it."""
+    layout = _layouts.get(name)
+    if layout is None:
+        if name not in available_layouts():
+            raise ValueError(f"Unknown keyboard layout: {name!r} (choose from {', '.join(available_layouts())})")
+        layout = _layouts[name] = KeyboardLayout.load(name)
+    return layout
+
+
+# ---------- Keystroke plan ----------
+ACTION_WRITE = 0      # Type the event's key
+ACTION_BACKSPACE = 1  # Press backspace
+ACTION_PAUSE = 2      # Natural word-level pause (no key)
+ACTION_PASTE = 3      # Paste a segment in bulk (the key indexes the plan's pastes)
+
+
+def _is_word_char(c):
+    return c.isalnum() or c in "'-"
+
+
+class KeystrokePlan:
+    """Compact, array-backed stream of keystroke events.
+
+    Event i is (keys[i], actions[i], delays[i], advances[i]): the key code point to
+    emit, what to do with it, how long to wait afterwards (ms) and how many source
+    characters it commits (used to keep current_index in step while replaying).
+    A paste event's key is the index of its (text, advance) pair in `pastes`.
+    """
+
+    def __init__(self):
+        self.keys = array('I')
+        self.actions = array('B')
+        self.delays = array('d')
+        self.advances = array('B')
+        self.pastes = []
+
+    def __len__(self):
+        return len(self.actions)
+
+    def __iter__(self):
+        return self.events()
+
+    def events(self, start=0):
+        """Yield (key, action, delay_ms, advance) tuples, from event `start` on."""
+        keys, actions, delays, advances = self.keys, self.actions, self.delays, self.advances
+        if start:
+            keys, actions, delays, advances = keys[start:], actions[start:], delays[start:], advances[start:]
+        for code, action, delay, advance in zip(keys, actions, delays, advances):
+            yield chr(code), action, delay, advance
+
+    def append(self, key, action, delay, advance=0):
+        self.keys.append(ord(key))
+        self.actions.append(action)
+        self.delays.append(delay)
+        self.advances.append(advance)
+
+    def append_paste(self, text, advance, delay):
+        self.append(chr(len(self.pastes)), ACTION_PASTE, delay)
+        self.pastes.append((text, advance))
+
+    def clear(self):
+        del self.keys[:], self.actions[:], self.delays[:], self.advances[:]
+        self.pastes.clear()
+
+    def total_delay(self):
+        """Planned waiting time of the whole plan in milliseconds."""
+        return sum(self.delays)
+
+    def source_length(self):
+        """Number of source characters the plan commits."""
+        return sum(self.advances) + sum(advance for _, advance in self.pastes)
+
+    def save(self, path):
+        """Save the plan as JSON so it can be inspected or replayed later."""
+        data = {
+            "keys": "".join(map(chr, self.keys)),
+            "actions": self.actions.tolist(),
+            "delays": [round(d, 3) for d in self.delays],
+            "advances": self.advances.tolist(),
+            "pastes": self.pastes,
+        }
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as f:
+            data = json.load(f)
+        plan = cls()
+        plan.keys.extend(map(ord, data["keys"]))
+        plan.actions.extend(data["actions"])
+        plan.delays.extend(data["delays"])
+        plan.advances.extend(data["advances"])
+        plan.pastes.extend(map(tuple, data.get("pastes", ())))
+        return plan
+
+
+class KeystrokePlanner:
+    """Compile source text into a KeystrokePlan in a single pass.
+
+    Every per-character decision (word boundaries, typo placement, keystroke delays,
+    natural pauses and correction retyping) is made here, so the executor only has to
+    replay the events. feed() may be called repeatedly with consecutive pieces of text;
+    call finish() once the source is exhausted.
+    """
+
+    def __init__(self, delay_fn, neighbor_fn, typo_min_words=5, typo_max_words=12, plan=None, rng=None,
+                 splitter=None):
+        self.delay_fn = delay_fn        # Returns the next keystroke delay in milliseconds
+        self.neighbor_fn = neighbor_fn  # Returns a nearby key for a character, or None
+        self.splitter = splitter        # PasteSplitter picking segments to paste, or None
+        self.rng = rng if rng is not None else random
+        self.typo_min_words = max(1, typo_min_words)
+        self.typo_max_words = max(self.typo_min_words, typo_max_words)
+        self.plan = plan if plan is not None else KeystrokePlan()
+
+        # Natural pause and typo schedules
+        self.words_typed_since_last_pause = 0
+        self.next_pause_after_words = self.rng.randint(1, 8)
+        self.words_since_last_typo = 0
+        self.next_typo_after_words = self.rng.randint(self.typo_min_words, self.typo_max_words)
+
+        # Track current word and typo plan
+        self.current_word_correct = []  # Intended correct characters for the current word
+        self.typed_word_len = 0         # How many chars actually typed for this word (including the typo)
+        self.typo_planned = False       # Whether this word should get a typo
+        self.typo_introduced = False    # Whether we've already injected the typo in this word
+
+    def feed(self, text):
+        """Plan keystrokes for the next piece of source text."""
+        if self.splitter is None:
+            self._plan_text(text)
+        else:
+            self._plan_pieces(self.splitter.feed(text))
+        return self.plan
+
+    def finish(self):
+        """Flush the trailing word; if it ended on a typo (no boundary), correct it now."""
+        if self.splitter is not None:
+            self._plan_pieces(self.splitter.finish())
+        self._close_word()
+        return self.plan
+
+    def _plan_text(self, text):
+        for ch in text:
+            if _is_word_char(ch):
+                self._plan_word_char(ch)
+            else:
+                self._plan_boundary(ch)
+
+    def _plan_pieces(self, pieces):
+        for paste, text, advance in pieces:
+            if not paste:
+                self._plan_text(text)
+                continue
+            # Pasted in one go, after finishing the word in progress
+            self._close_word()
+            self.plan.append_paste(text, advance, self.rng.uniform(150, 400))
+
+    def _close_word(self):
+        if self.current_word_correct and self.typo_planned and self.typo_introduced:
+            self._plan_backspaces(self.typed_word_len)
+            self._plan_retype()
+        self._reset_word()
+
+    def get_state(self):
+        """JSON-serializable schedule and current-word state (including a pending typo)."""
+        return {
+            "words_typed_since_last_pause": self.words_typed_since_last_pause,
+            "next_pause_after_words": self.next_pause_after_words,
+            "words_since_last_typo": self.words_since_last_typo,
+            "next_typo_after_words": self.next_typo_after_words,
+            "current_word_correct": "".join(self.current_word_correct),
+            "typed_word_len": self.typed_word_len,
+            "typo_planned": self.typo_planned,
+            "typo_introduced": self.typo_introduced,
+            "splitter": self.splitter.get_state() if self.splitter is not None else None,
+        }
+
+    def set_state(self, state):
+        state = dict(state)
+        splitter = state.pop("splitter", None)
+        for name, value in state.items():
+            setattr(self, name, value)
+        self.current_word_correct = list(state["current_word_correct"])
+        if splitter is not None and self.splitter is not None:
+            self.splitter.set_state(splitter)
+
+    def _plan_word_char(self, ch):
+        # Starting a new word? Decide if this word should get a typo based on schedule
+        if not self.current_word_correct:
+            self.typo_planned = (self.words_since_last_typo >= self.next_typo_after_words)
+            self.typo_introduced = False
+            self.typed_word_len = 0
+
+        # Try to introduce exactly one neighbor-key mistake in this word
+        out = ch
+        if self.typo_planned and not self.typo_introduced:
+            nb = self.neighbor_fn(ch)
+            if nb and nb != ch:
+                out = nb
+                self.typo_introduced = True
+
+        self.plan.append(out, ACTION_WRITE, self.delay_fn(), 1)
+        self.typed_word_len += 1
+        self.current_word_correct.append(ch)
+
+    def _plan_boundary(self, ch):
+        plan = self.plan
+        if not self.current_word_correct:
+            # Not in a word; just type boundary and continue
+            plan.append(ch, ACTION_WRITE, self.delay_fn(), 1)
+            return
+
+        # Word boundary (space/punct/newline)
+        self.words_typed_since_last_pause += 1
+
+        if self.typo_planned and self.typo_introduced:
+            if ch.isspace():
+                # Many people notice right after hitting the space
+                plan.append(ch, ACTION_WRITE, self.rng.uniform(50, 200), 1)
+                # Delete the boundary + word, then retype both correctly
+                self._plan_backspaces(1 + self.typed_word_len)
+                self._plan_retype()
+                plan.append(ch, ACTION_WRITE, 0.0)
+            else:
+                # Punctuation: correct before committing punctuation
+                self._plan_backspaces(self.typed_word_len)
+                self._plan_retype()
+                plan.append(ch, ACTION_WRITE, 0.0, 1)
+
+            # Reset mistake schedule after a correction
+            self.words_since_last_typo = 0
+            self.next_typo_after_words = self.rng.randint(self.typo_min_words, self.typo_max_words)
+        else:
+            # No typo on this word: just type the boundary
+            plan.append(ch, ACTION_WRITE, 0.0, 1)
+            # Count this word toward the next scheduled typo
+            self.words_since_last_typo += 1
+
+        # Natural word-level pause after boundary/correction
+        if self.words_typed_since_last_pause >= self.next_pause_after_words:
+            plan.append('\0', ACTION_PAUSE, self.rng.uniform(500, 3000))
+            self.words_typed_since_last_pause = 0
+            self.next_pause_after_words = self.rng.randint(1, 8)
+
+        self._reset_word()
+
+    def _plan_backspaces(self, count):
+        """Backspace with varied delays"""
+        for _ in range(count):
+            self.plan.append('\b', ACTION_BACKSPACE, max(25, self.delay_fn() * 0.5))
+
+    def _plan_retype(self):
+        for cc in self.current_word_correct:
+            self.plan.append(cc, ACTION_WRITE, self.delay_fn())
+
+    def _reset_word(self):
+        self.current_word_correct = []
+        self.typed_word_len = 0
+        self.typo_planned = False
+        self.typo_introduced = False
+
+
+# ---------- Paste segments ----------
+PASTE_OPEN = "[[paste]]"
+PASTE_CLOSE = "[[/paste]]"
+_NON_ASCII = re.compile(r"[^\x00-\x7f]+")
+
+
+def _marker_prefix(text, marker):
+    """Length of the longest end of text that could be the start of marker."""
+    for size in range(min(len(marker) - 1, len(text)), 0, -1):
+        if marker.startswith(text[-size:]):
+            return size
+    return 0
+
+
+class PasteSplitter:
+    """Split source text into pieces to type and pieces to paste in bulk.
+
+    Pasted are: text between PASTE_OPEN and PASTE_CLOSE (with markup; the markers are
+    not output), blocks of more than min_lines consecutive non-blank lines (when
+    min_lines > 0) and runs of non-ASCII characters (with non_ascii), which the
+    typing backends can't always type at all. feed() and finish() return
+    (paste, text, advance) pieces in source order; advance is the number of source
+    characters a piece stands for, markers included, so progress still adds up to the
+    source length. Text that could be a partial marker, the lines of a block whose
+    length isn't known yet and the start of a line that may still turn out blank are
+    held back until the next call, so the split doesn't depend on where chunks end.
+    """
+
+    def __init__(self, markup=True, min_lines=0, non_ascii=False):
+        self.markup = markup
+        self.min_lines = min_lines
+        self.non_ascii = non_ascii
+        self.in_markup = False       # Inside a marked segment
+        self.tail = ""               # Held back: may be the start of a marker
+        self.partial = ""            # Held back: current line, not yet complete
+        self.block = []              # Held back: lines of the current block
+        self.pasting_block = False   # The current block is long enough to paste
+        self.midline = False         # The start of the current line was pasted already
+
+    def get_state(self):
+        return {
+            "in_markup": self.in_markup,
+            "tail": self.tail,
+            "partial": self.partial,
+            "block": list(self.block),
+            "pasting_block": self.pasting_block,
+            "midline": self.midline,
+        }
+
+    def set_state(self, state):
+        self.in_markup = state["in_markup"]
+        self.tail = state["tail"]
+        self.partial = state["partial"]
+        self.block = list(state["block"])
+        self.pasting_block = state["pasting_block"]
+        self.midline = state["midline"]
+
+    def feed(self, text):
+        out = []
+        if not self.markup:
+            self._lines(text, out)
+            return self._merge(out)
+        text = self.tail + text
+        pos = 0
+        while True:
+            marker = PASTE_CLOSE if self.in_markup else PASTE_OPEN
+            found = text.find(marker, pos)
+            if found < 0:
+                keep = _marker_prefix(text, marker)
+                self._emit(text[pos:len(text) - keep], out)
+                self.tail = text[len(text) - keep:]
+                return self._merge(out)
+            self._emit(text[pos:found], out)
+            if not self.in_markup:
+                self._flush_lines(out)
+            out.append((True, "", len(marker)))  # Merges into the marked segment
+            self.in_markup = not self.in_markup
+            pos = found + len(marker)
+
+    def finish(self):
+        """Everything still held back (an unclosed marked segment is pasted)."""
+        out = []
+        self._emit(self.tail, out)
+        self.tail = ""
+        self._flush_lines(out)
+        return self._merge(out)
+
+    def _emit(self, text, out):
+        if not text:
+            return
+        if self.in_markup:
+            out.append((True, text, len(text)))
+        else:
+            self._lines(text, out)
+
+    def _lines(self, text, out):
+        if not self.min_lines:
+            self._type(text, out)
+            return
+        start = 0
+        while start < len(text):
+            end = text.find("\n", start)
+            if end < 0:
+                self.partial += text[start:]
+                if self.pasting_block and (self.midline or self.partial.strip()):
+                    # Not a blank line, so it belongs to the pasted block: no need to wait for its end
+                    out.append((True, self.partial, len(self.partial)))
+                    self.partial = ""
+                    self.midline = True
+                return
+            line = self.partial + text[start:end + 1]
+            self.partial = ""
+            start = end + 1
+            if self.midline:
+                self.midline = False
+                out.append((True, line, len(line)))
+            elif not line.strip():
+                self._end_block(out)
+                self._type(line, out)
+            elif self.pasting_block:
+                out.append((True, line, len(line)))
+            else:
+                self.block.append(line)
+                if len(self.block) > self.min_lines:
+                    pasted = "".join(self.block)
+                    out.append((True, pasted, len(pasted)))
+                    self.block = []
+                    self.pasting_block = True
+
+    def _flush_lines(self, out):
+        """End the current line and block here (before a marker, or at the end)."""
+        if self.partial:
+            if self.pasting_block:
+                out.append((True, self.partial, len(self.partial)))
+            else:
+                self.block.append(self.partial)
+            self.partial = ""
+        self.midline = False
+        self._end_block(out)
+
+    def _end_block(self, out):
+        if self.block:
+            self._type("".join(self.block), out)
+            self.block = []
+        self.pasting_block = False
+
+    def _type(self, text, out):
+        if not self.non_ascii:
+            out.append((False, text, len(text)))
+            return
+        pos = 0
+        for match in _NON_ASCII.finditer(text):
+            out.append((False, text[pos:match.start()], match.start() - pos))
+            out.append((True, match.group(), len(match.group())))
+            pos = match.end()
+        out.append((False, text[pos:], len(text) - pos))
+
+    @staticmethod
+    def _merge(pieces):
+        merged = []
+        for paste, text, advance in pieces:
+            if not advance:
+                continue
+            if merged and merged[-1][0] == paste:
+                _, last_text, last_advance = merged[-1]
+                merged[-1] = (paste, last_text + text, last_advance + advance)
+            else:
+                merged.append((paste, text, advance))
+        return merged
+
+
+def make_splitter(markup=False, min_lines=0, non_ascii=False):
+    """A PasteSplitter for these paste settings, or None when nothing is pasted."""
+    if not (markup or min_lines or non_ascii):
+        return None
+    return PasteSplitter(markup, min_lines, non_ascii)
+
+
+# ---------- Traces ----------
+TRACE_MAGIC = b"ASTRACE1"
+
+
+class KeystrokeTrace(KeystrokePlan):
+    """The keystrokes a session actually emitted, with their planned delays and the
+    time (seconds from the start of the schedule) each one went out.
+
+    A trace is a plan, so TypingEngine.replay() re-emits it exactly: same keys, same
+    delays, no randomness. Comparing the times of two replays of one trace isolates
+    timing changes from changes in the keystroke stream.
+    """
+
+    def __init__(self, header=None):
+        super().__init__()
+        self.times = array('d')
+        self.header = header or {}  # Seed, settings and anything else worth keeping
+
+    def record(self, key, action, delay, advance, at):
+        self.append(key, action, delay, advance)
+        self.times.append(at)
+
+    def record_paste(self, text, advance, delay, at):
+        self.append_paste(text, advance, delay)
+        self.times.append(at)
+
+    def clear(self):
+        super().clear()
+        del self.times[:]
+
+    def intervals(self):
+        """Actual gaps between consecutive emitted events, in milliseconds."""
+        times = self.times
+        return [(b - a) * 1000.0 for a, b in zip(times, times[1:])]
+
+    def save(self, path):
+        with TraceWriter(path, self.header) as writer:
+            writer.write_block(self)
+
+    @classmethod
+    def load(cls, path):
+        """Read a binary trace written by TraceWriter (or save())."""
+        with open(path, "rb") as f:
+            if f.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+                raise ValueError(f"{path} is not an AutoScribe trace")
+            (size,) = struct.unpack("<I", f.read(4))
+            trace = cls(json.loads(f.read(size)))
+            swap = trace.header.get("byteorder", sys.byteorder) != sys.byteorder
+            has_pastes = trace.header.get("version", 1) >= 2
+            columns = (trace.keys, trace.actions, trace.advances, trace.delays, trace.times)
+            while True:
+                raw = f.read(4)
+                if len(raw) < 4:
+                    break  # End of file (or a block cut short by a crash)
+                (count,) = struct.unpack("<I", raw)
+                block = [array(column.typecode) for column in columns]
+                try:
+                    for column in block:
+                        column.fromfile(f, count)
+                    pastes = []
+                    if has_pastes:
+                        (size,) = struct.unpack("<I", f.read(4))
+                        pastes = json.loads(f.read(size))
+                except (EOFError, struct.error, ValueError):
+                    break
+                if swap:
+                    for values in block:
+                        values.byteswap()
+                if pastes and trace.pastes:
+                    keys, actions = block[0], block[1]
+                    for i, action in enumerate(actions):
+                        if action == ACTION_PASTE:
+                            keys[i] += len(trace.pastes)  # Indexes are per block
+                for column, values in zip(columns, block):
+                    column.extend(values)
+                trace.pastes.extend(map(tuple, pastes))
+        return trace
+
+
+class TraceWriter:
+    """Stream a KeystrokeTrace to a compact binary file, one block per flush.
+
+    Layout: TRACE_MAGIC, a little-endian uint32 header length and a JSON header, then
+    blocks of a uint32 event count followed by the key, action, advance, delay and time
+    columns as raw arrays (22 bytes per event in native byte order, noted in the header)
+    and the block's pasted segments as a uint32 length and a JSON list (version 2).
+
+    The header is on disk as soon as the file is opened, and a block is written every
+    flush_every events or flush_s seconds of session time (and on flush()), so a killed
+    session loses at most that much of its trace.
+    """
+
+    def __init__(self, path, header=None, flush_every=256, flush_s=1.0):
+        self.path = path
+        self.trace = KeystrokeTrace(header)
+        self.events = 0
+        self.flush_every = flush_every
+        self.flush_s = flush_s
+        self._block_at = None  # Session time of the first event not yet written
+        header = dict(header or {}, byteorder=sys.byteorder, version=2)
+        encoded = json.dumps(header).encode("utf-8")
+        self._file = open(path, "wb")
+        self._file.write(TRACE_MAGIC + struct.pack("<I", len(encoded)) + encoded)
+        self._file.flush()
+
+    def record(self, key, action, delay, advance, at):
+        self.trace.record(key, action, delay, advance, at)
+        self._recorded(at)
+
+    def record_paste(self, text, advance, delay, at):
+        self.trace.record_paste(text, advance, delay, at)
+        self._recorded(at)
+
+    def _recorded(self, at):
+        if self._block_at is None:
+            self._block_at = at
+        if len(self.trace) >= self.flush_every or at - self._block_at >= self.flush_s:
+            self.flush()
+
+    def write_block(self, trace):
+        count = len(trace)
+        if not count:
+            return
+        f = self._file
+        f.write(struct.pack("<I", count))
+        for column in (trace.keys, trace.actions, trace.advances, trace.delays, trace.times):
+            column.tofile(f)
+        pastes = json.dumps(trace.pastes).encode("utf-8")
+        f.write(struct.pack("<I", len(pastes)) + pastes)
+        f.flush()
+        self.events += count
+
+    def flush(self):
+        """Write the events recorded since the last flush as one block."""
+        self.write_block(self.trace)
+        self.trace.clear()
+        self._block_at = None
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------- Digraph profiles ----------
+PROFILE_MAGIC = b"ASDIGRF1"
+
+
+def _pair_code(prev, key):
+    """Table key of a bigram from two code points; prev 0 stands for any previous key."""
+    return prev << 21 | key
+
+
+def _quantile_row(values, count):
+    """count evenly spaced quantiles (2nd to 98th percentile) of sorted values."""
+    last = len(values) - 1
+    row = []
+    for j in range(count):
+        x = (0.02 + 0.96 * j / (count - 1)) * last
+        i = int(x)
+        v = values[i]
+        if i < last:
+            v += (values[i + 1] - v) * (x - i)
+        row.append(v)
+    return row
+
+
+def _trace_keystrokes(trace):
+    """(key, time_ms) of a trace's events; backspaces and pauses come out as None."""
+    for key, action, at in zip(trace.keys, trace.actions, trace.times):
+        yield (chr(key) if action == ACTION_WRITE else None), at * 1000.0
+
+
+def _csv_keystrokes(path):
+    """(key, time_ms) rows of a CSV keystroke log with `key` and `time_ms` columns."""
+    import csv
+
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        fields = {name.strip().lower(): name for name in reader.fieldnames or ()}
+        if "key" not in fields or "time_ms" not in fields:
+            raise ValueError(f"{path} needs 'key' and 'time_ms' columns")
+        key_field, time_field = fields["key"], fields["time_ms"]
+        for row in reader:
+            yield row[key_field], float(row[time_field])
+
+
+class DigraphProfile:
+    """Per-bigram keystroke latency, fitted from recorded typing.
+
+    Each row holds `quantiles` evenly spaced quantiles of the latency from one key to
+    the next, as a ratio to the mean latency of the whole log, so a profile shapes the
+    rhythm (which pairs are quick, which hesitate) while the WPM walk still sets the
+    pace. Rows are kept for every bigram with at least min_samples observations, for
+    every key after any key, and for all keys together; lookups fall back in that
+    order. Sampling is one dict lookup and one interpolation in a flat float32 table.
+    """
+
+    def __init__(self, quantiles=16, header=None):
+        self.quantiles = quantiles
+        self.codes = array('Q')   # Pair code of each row
+        self.counts = array('I')  # Observations behind each row
+        self.values = array('f')  # Row-major quantiles of latency / mean latency
+        self.header = header or {}
+        self.index = {}           # Pair code -> offset of its row in values
+        self.path = None          # File it was loaded from
+
+    def __len__(self):
+        return len(self.codes)
+
+    def add_row(self, code, count, row):
+        self.index[code] = len(self.values)
+        self.codes.append(code)
+        self.counts.append(count)
+        self.values.extend(row)
+
+    @classmethod
+    def fit(cls, events, quantiles=16, min_samples=8, max_gap_ms=1500.0):
+        """Fit from (key, time_ms) keystrokes in typing order.
+
+        A key that isn't a single character (backspace, a named key, None) breaks the
+        sequence, and gaps longer than max_gap_ms are treated as pauses, not latency.
+        """
+        if quantiles < 2:
+            raise ValueError("a profile needs at least 2 quantiles per row")
+        samples = {}
+        prev = prev_time = None
+        for key, at in events:
+            if key is None or len(key) != 1 or key == '\b':
+                prev = None
+                continue
+            code = ord(key)
+            if prev is not None:
+                gap = at - prev_time
+                if 0 < gap <= max_gap_ms:
+                    samples.setdefault(_pair_code(prev, code), []).append(gap)
+            prev, prev_time = code, at
+        if not samples:
+            raise ValueError("no keystroke latencies to fit a profile from")
+
+        gaps = [gap for values in samples.values() for gap in values]
+        mean = statistics.fmean(gaps)
+        profile = cls(quantiles, {"samples": len(gaps), "mean_ms": round(mean, 3)})
+
+        def add(code, values):
+            values.sort()
+            profile.add_row(code, len(values), [v / mean for v in _quantile_row(values, quantiles)])
+
+        singles = {}
+        for code, values in sorted(samples.items()):
+            singles.setdefault(code & 0x1FFFFF, []).extend(values)
+            if len(values) >= min_samples:
+                add(code, values)
+        for key, values in sorted(singles.items()):
+            if len(values) >= min_samples:
+                add(_pair_code(0, key), values)
+        add(0, gaps)
+        return profile
+
+    @classmethod
+    def from_trace(cls, trace, **options):
+        """Fit from a KeystrokeTrace (see TypingEngine.run(trace=...))."""
+        return cls.fit(_trace_keystrokes(trace), **options)
+
+    @classmethod
+    def from_recording(cls, backend, **options):
+        """Fit from the events captured by a RecordingBackend."""
+        return cls.fit(((key, at * 1000.0) for key, at in zip(backend.keys, backend.times)), **options)
+
+    @classmethod
+    def from_csv(cls, path, **options):
+        """Fit from a CSV keystroke log with `key` and `time_ms` columns (key-down times)."""
+        return cls.fit(_csv_keystrokes(path), **options)
+
+    def shape(self, plan, rng, start=0):
+        """Scale the gap between every two consecutive writes of a plan (from event
+        `start`) by a ratio sampled for their bigram."""
+        keys, actions, delays, values = plan.keys, plan.actions, plan.delays, self.values
+        index = self.index
+        default = index[0]
+        top = self.quantiles - 1
+        random = rng.random
+        for i in range(start, len(actions) - 1):
+            delay = delays[i]
+            if not delay or actions[i] != ACTION_WRITE or actions[i + 1] != ACTION_WRITE:
+                continue
+            key = keys[i + 1]
+            row = index.get(keys[i] << 21 | key)
+            if row is None:
+                row = index.get(key, default)
+            x = random() * top
+            j = int(x)
+            v = values[row + j]
+            delays[i] = delay * (v + (values[row + j + 1] - v) * (x - j))
+
+    def save(self, path):
+        """Write the table: PROFILE_MAGIC, a uint32 header length and JSON header, then
+        the code, count and value arrays raw (native byte order, noted in the header)."""
+        header = dict(self.header, quantiles=self.quantiles, rows=len(self), byteorder=sys.byteorder)
+        encoded = json.dumps(header).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(PROFILE_MAGIC + struct.pack("<I", len(encoded)) + encoded)
+            self.codes.tofile(f)
+            self.counts.tofile(f)
+            self.values.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            if f.read(len(PROFILE_MAGIC)) != PROFILE_MAGIC:
+                raise ValueError(f"{path} is not an AutoScribe timing profile")
+            (size,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(size))
+            profile = cls(header["quantiles"], header)
+            rows = header["rows"]
+            profile.codes.fromfile(f, rows)
+            profile.counts.fromfile(f, rows)
+            profile.values.fromfile(f, rows * profile.quantiles)
+        if header.get("byteorder", sys.byteorder) != sys.byteorder:
+            for column in (profile.codes, profile.counts, profile.values):
+                column.byteswap()
+        profile.index = dict(zip(profile.codes, range(0, len(profile.values), profile.quantiles)))
+        profile.path = path
+        return profile
+
+
+# ---------- Scheduling ----------
+def _plain_sleep(seconds):
+    time.sleep(seconds)
+    return True
+
+
+async def _plain_sleep_async(seconds):
+    import asyncio
+
+    await asyncio.sleep(seconds)
+    return True
+
+
+class DeadlineScheduler:
+    """Pace keystrokes against absolute perf_counter() deadlines.
+
+    Each planned delay is added to the previous deadline instead of to "now", so time
+    spent injecting keys and updating the status is taken out of the next gap rather
+    than accumulating. Waits sleep until spin_threshold before the deadline and then
+    spin, which hides OS sleep overshoot. If we ever fall more than max_lag behind
+    (a stalled injector, a hiccup) the schedule is rebased instead of bursting keys.
+    wait_async() is the event-loop version: it never spins, so sessions sharing a loop
+    keep running, at the cost of the loop's timer resolution. With a PhaseProfiler, the
+    sampled events' lateness and oversleep are added to its histograms.
+    """
+
+    def __init__(self, spin_threshold=0.002, max_lag=0.25, time_scale=1.0, sleep=None, sleep_async=None,
+                 profiler=None):
+        self.spin_threshold = spin_threshold  # Seconds spun (not slept) before a deadline
+        self.max_lag = max_lag                # Seconds behind schedule before rebasing
+        self.time_scale = time_scale          # Multiplier on every delay (benchmarks run faster than real time)
+        self.sleep = sleep or _plain_sleep    # sleep(seconds) -> False if woken early (see TypingControl)
+        self.sleep_async = sleep_async or _plain_sleep_async
+        self.profiler = profiler
+        self.start()
+
+    def start(self):
+        """Reset the schedule and statistics; the first deadline is now."""
+        now = time.perf_counter()
+        self.origin = now
+        self.deadline = now
+        self.planned = 0.0       # Sum of planned delays (seconds)
+        self.excluded = 0.0      # Time excluded from the schedule (user pauses, rebases)
+        self.chars = 0           # Source characters committed
+        self.max_lag_seen = 0.0
+        self.rebases = 0
+
+    def advance(self, count):
+        """Count committed source characters toward the achieved speed."""
+        self.chars += count
+
+    def rebase(self):
+        """Restart deadlines from now, excluding the gap."""
+        now = time.perf_counter()
+        if now > self.deadline:
+            self.excluded += now - self.deadline
+        self.deadline = now
+
+    def exclude(self, seconds):
+        """Push the schedule back by time that shouldn't count (e.g. a user pause)."""
+        self.deadline += seconds
+        self.excluded += seconds
+
+    def _next(self, delay_ms):
+        """Move the deadline on by delay_ms; returns the seconds left until it (<= 0 if late)."""
+        delay = delay_ms * self.time_scale / 1000.0
+        self.planned += delay
+        self.deadline += delay
+
+        remaining = self.deadline - time.perf_counter()
+        if remaining <= 0:
+            lag = -remaining
+            if lag > self.max_lag_seen:
+                self.max_lag_seen = lag
+            if lag > self.max_lag:
+                self.rebases += 1
+                self.rebase()
+        return remaining
+
+    def wait(self, delay_ms):
+        """Wait until the previous deadline plus delay_ms.
+
+        Returns False if the sleep was woken early; the deadline stands, so wait(0)
+        later finishes the remaining part of the gap.
+        """
+        remaining = self._next(delay_ms)
+        profiler = self.profiler
+        if remaining <= 0:
+            if profiler is not None and profiler.sampled:
+                profiler.add(PHASE_LATE, -remaining)
+            return True
+
+        if remaining > self.spin_threshold:
+            if not self.sleep(remaining - self.spin_threshold):
+                return False
+        while time.perf_counter() < self.deadline:
+            pass
+        if profiler is not None and profiler.sampled:
+            profiler.add(PHASE_OVERSLEEP, time.perf_counter() - self.deadline)
+        return True
+
+    async def wait_async(self, delay_ms):
+        """Coroutine version of wait()."""
+        import asyncio
+
+        remaining = self._next(delay_ms)
+        profiler = self.profiler
+        if remaining <= 0:
+            if profiler is not None and profiler.sampled:
+                profiler.add(PHASE_LATE, -remaining)
+            await asyncio.sleep(0)  # Running late: still let other tasks on the loop run
+            return True
+        if not await self.sleep_async(remaining):
+            return False
+        if profiler is not None and profiler.sampled:
+            profiler.add(PHASE_OVERSLEEP, time.perf_counter() - self.deadline)
+        return True
+
+    def report(self):
+        """How far the achieved speed is from the planned one (in unscaled time)."""
+        elapsed = max(1e-9, time.perf_counter() - self.origin - self.excluded) / self.time_scale
+        planned = max(1e-9, self.planned / self.time_scale)
+        target_wpm = self.chars / planned * 12    # 5 chars per word, 60 s per minute
+        achieved_wpm = self.chars / elapsed * 12
+        return {
+            "chars": self.chars,
+            "planned_s": round(planned, 3),
+            "elapsed_s": round(elapsed, 3),
+            "drift_ms": round((elapsed - planned) * 1000, 1),
+            "target_wpm": round(target_wpm, 2),
+            "achieved_wpm": round(achieved_wpm, 2),
+            "wpm_error_pct": round((achieved_wpm - target_wpm) / target_wpm * 100, 2) if target_wpm else 0.0,
+            "max_lag_ms": round(self.max_lag_seen * 1000, 2),
+            "rebases": self.rebases,
+        }
+
+
+# ---------- Output backends ----------
+PASTE_KEYS = ("command", "v") if sys.platform == "darwin" else ("ctrl", "v")
+
+# Clipboard writers tried when pyperclip isn't installed: (command, input encoding)
+CLIPBOARD_COMMANDS = (
+    (["wl-copy"], "utf-8"),
+    (["xclip", "-selection", "clipboard"], "utf-8"),
+    (["xsel", "--clipboard", "--input"], "utf-8"),
+    (["pbcopy"], "utf-8"),
+    (["clip"], "utf-16"),
+)
+
+
+def copy_to_clipboard(text):
+    """Put text on the system clipboard (pyperclip if installed, else a platform tool)."""
+    if importlib.util.find_spec("pyperclip") is not None:
+        import pyperclip
+
+        pyperclip.copy(text)
+        return
+    import shutil
+    import subprocess
+
+    for command, encoding in CLIPBOARD_COMMANDS:
+        if shutil.which(command[0]):
+            subprocess.run(command, input=text.encode(encoding), check=True)
+            return
+    raise RuntimeError("clipboard paste requires pyperclip, wl-copy, xclip, xsel, pbcopy or clip")
+
+
+class FailSafeError(RuntimeError):
+    """The mouse pointer is in a screen corner: the emergency stop."""
+
+
+class OutputBackend:
+    """Destination for keystrokes. Subclasses implement write(), press() and hotkey()."""
+
+    name = "base"
+
+    @classmethod
+    def available(cls):
+        """Whether this backend can be used on this machine."""
+        return True
+
+    def write(self, text):
+        """Type the characters of text."""
+        raise NotImplementedError
+
+    def press(self, key):
+        """Press a named key such as 'backspace'."""
+        raise NotImplementedError
+
+    def hotkey(self, *keys):
+        """Press keys together, e.g. hotkey('ctrl', 'v')."""
+        raise NotImplementedError
+
+    def paste(self, text):
+        """Insert text in one go: put it on the clipboard and press the paste shortcut."""
+        copy_to_clipboard(text)
+        self.hotkey(*PASTE_KEYS)
+
+    def close(self):
+        pass
+
+
+class PyAutoGUIBackend(OutputBackend):
+    """Cross-platform injection through pyautogui (the original behavior)."""
+
+    name = "pyautogui"
+
+    @classmethod
+    def available(cls):
+        return importlib.util.find_spec("pyautogui") is not None
+
+    def __init__(self):
+        import pyautogui
+
+        # Ensure pyautogui is configured properly
+        pyautogui.FAILSAFE = True  # Move mouse to corner to abort
+        pyautogui.PAUSE = 0        # No delay between actions
+        self._pyautogui = pyautogui
+
+    def write(self, text):
+        self._pyautogui.write(text)
+
+    def press(self, key):
+        self._pyautogui.press(key)
+
+    def hotkey(self, *keys):
+        self._pyautogui.hotkey(*keys)
+
+
+class XTestBackend(OutputBackend):
+    """Inject key events straight into the X server with the XTEST extension.
+
+    Skips pyautogui's per-call overhead: keycodes are resolved once per character and
+    cached, and each keystroke is just a press/release pair plus a flush. Requires
+    python-xlib and a Linux X11 session.
+
+    Keeps pyautogui's emergency stop: with the pointer in a screen corner, calls raise
+    FailSafeError. The pointer is queried at most every FAILSAFE_INTERVAL seconds, so
+    the check doesn't add a server round trip to every key.
+    """
+
+    name = "xtest"
+    FAILSAFE_INTERVAL = 0.05
+
+    # Named keys and control characters -> X keysym names
+    KEY_NAMES = {
+        'backspace': 'BackSpace', '\b': 'BackSpace',
+        'enter': 'Return', '\n': 'Return', '\r': 'Return',
+        'tab': 'Tab', '\t': 'Tab',
+        'space': 'space',
+        'ctrl': 'Control_L', 'shift': 'Shift_L', 'alt': 'Alt_L', 'command': 'Super_L',
+    }
+
+    @classmethod
+    def available(cls):
+        if not sys.platform.startswith("linux") or not os.environ.get("DISPLAY"):
+            return False
+        try:
+            import Xlib.ext.xtest  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def __init__(self, display_name=None):
+        from Xlib import X, XK, display
+        from Xlib.ext import xtest
+
+        self._X = X
+        self._XK = XK
+        self._fake_input = xtest.fake_input
+        self.display = display.Display(display_name)  # e.g. ":1" for a separate virtual display
+        self._shift = self.display.keysym_to_keycode(XK.XK_Shift_L)
+        self._keycodes = {}  # key -> (keycode, needs_shift), keycode 0 if unmappable
+        screen = self.display.screen()
+        self._root = screen.root
+        self._corners = ((0, screen.width_in_pixels - 1), (0, screen.height_in_pixels - 1))
+        self._checked = 0.0  # perf_counter() of the last pointer query
+
+    def _check_failsafe(self):
+        now = time.perf_counter()
+        if now - self._checked < self.FAILSAFE_INTERVAL:
+            return
+        self._checked = now
+        pointer = self._root.query_pointer()
+        xs, ys = self._corners
+        if pointer.root_x in xs and pointer.root_y in ys:
+            raise FailSafeError("typing stopped: the mouse pointer is in a screen corner")
+
+    def _lookup(self, key):
+        entry = self._keycodes.get(key)
+        if entry is not None:
+            return entry
+
+        name = self.KEY_NAMES.get(key)
+        if name is not None:
+            keysym = self._XK.string_to_keysym(name)
+        elif len(key) == 1:
+            # Latin-1 keysyms equal their code points; others use the Unicode range
+            code = ord(key)
+            keysym = code if 0x20 <= code <= 0xff else 0x01000000 + code
+        else:
+            keysym = self._XK.string_to_keysym(key)
+
+        keycode = self.display.keysym_to_keycode(keysym) if keysym else 0
+        needs_shift = bool(keycode) and self.display.keycode_to_keysym(keycode, 0) != keysym
+        entry = (keycode, needs_shift)
+        self._keycodes[key] = entry
+        return entry
+
+    def _tap(self, key):
+        keycode, needs_shift = self._lookup(key)
+        if not keycode:
+            return  # Not on the current keymap; pyautogui skips these too
+        X, fake_input, display = self._X, self._fake_input, self.display
+        if needs_shift:
+            fake_input(display, X.KeyPress, self._shift)
+        fake_input(display, X.KeyPress, keycode)
+        fake_input(display, X.KeyRelease, keycode)
+        if needs_shift:
+            fake_input(display, X.KeyRelease, self._shift)
+
+    def write(self, text):
+        self._check_failsafe()
+        for ch in text:
+            self._tap(ch)
+        self.display.flush()
+
+    def press(self, key):
+        self._check_failsafe()
+        self._tap(key)
+        self.display.flush()
+
+    def hotkey(self, *keys):
+        self._check_failsafe()
+        keycodes = [keycode for keycode, _ in map(self._lookup, keys) if keycode]
+        X, fake_input, display = self._X, self._fake_input, self.display
+        for keycode in keycodes:
+            fake_input(display, X.KeyPress, keycode)
+        for keycode in reversed(keycodes):
+            fake_input(display, X.KeyRelease, keycode)
+        display.flush()
+
+    def close(self):
+        self.display.close()
+
+
+class RecordingBackend(OutputBackend):
+    """Record every event in memory with a perf_counter() timestamp instead of typing.
+
+    Needs no display, so throughput and correctness can be measured headlessly.
+    Backspace is recorded as '\\b'.
+    """
+
+    name = "recording"
+
+    def __init__(self):
+        self.times = array('d')
+        self.keys = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def write(self, text):
+        now = time.perf_counter()
+        for ch in text:
+            self.times.append(now)
+            self.keys.append(ch)
+
+    def press(self, key):
+        self.times.append(time.perf_counter())
+        self.keys.append('\b' if key == 'backspace' else key)
+
+    def hotkey(self, *keys):
+        self.press("+".join(keys))
+
+    def paste(self, text):
+        """Record pasted text like typed text (no clipboard), so text() stays exact."""
+        self.write(text)
+
+    def clear(self):
+        del self.times[:]
+        self.keys.clear()
+
+    def text(self):
+        """The text a target window would contain after all recorded events."""
+        out = []
+        for key in self.keys:
+            if key == '\b':
+                if out:
+                    out.pop()
+            else:
+                out.append(key)
+        return "".join(out)
+
+    def intervals(self):
+        """Seconds between consecutive events."""
+        times = self.times
+        return [b - a for a, b in zip(times, times[1:])]
+
+
+class NullBackend(OutputBackend):
+    """Discard every event (only counting them); measures pure engine overhead."""
+
+    name = "null"
+
+    def __init__(self):
+        self.events = 0
+
+    def write(self, text):
+        self.events += len(text)
+
+    def press(self, key):
+        self.events += 1
+
+    def hotkey(self, *keys):
+        self.events += 1
+
+    def paste(self, text):
+        self.events += 1
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (XTestBackend, PyAutoGUIBackend, RecordingBackend, NullBackend)
+}
+
+# Interactive backends in order of preference (lowest per-event cost first); both stop
+# when the mouse pointer is moved to a screen corner
+BACKEND_PREFERENCE = ("xtest", "pyautogui")
+
+
+def available_backends():
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+def create_backend(name="auto", display=None):
+    """Create an output backend by name; "auto" picks the fastest available injector.
+
+    display targets a specific X display (xtest only).
+    """
+    if display is not None and name in ("auto", "xtest"):
+        return XTestBackend(display)
+    if name == "auto":
+        for candidate in BACKEND_PREFERENCE:
+            if BACKENDS[candidate].available():
+                try:
+                    return BACKENDS[candidate]()
+                except Exception:
+                    continue  # e.g. X server refused the connection; try the next one
+        return PyAutoGUIBackend()
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown output backend: {name!r} (choose from {', '.join(BACKENDS)})")
+    return backend()
+
+
+# ---------- Telemetry ----------
+class SessionMetrics:
+    """Counters and a keystroke-interval histogram for one typing session.
+
+    The typing loop only bumps a few attributes per event (the histogram bucket is
+    the bit length of the delay, so no search); rates, WPM and ETA are derived when
+    a snapshot is taken, so reading metrics costs the typing thread nothing.
+    """
+
+    # Histogram bucket i counts delays in [2**(i-1), 2**i) ms; the last bucket is open-ended
+    INTERVAL_BUCKETS = 14
+
+    def __init__(self, total_chars=None):
+        self.reset(total_chars)
+
+    def reset(self, total_chars=None):
+        self.total_chars = total_chars  # Source length if known (None when streaming stdin)
+        self.started = None             # perf_counter() when typing (not the countdown) began
+        self.finished = None
+        self.keystrokes = 0
+        self.backspaces = 0
+        self.pauses = 0
+        self.coalesced_calls = 0        # Backend calls that sent several keys (throughput mode)
+        self.coalesced_keys = 0         # Keystrokes sent in those calls
+        self.pastes = 0                 # Segments pasted instead of typed
+        self.pasted_chars = 0           # Source characters they covered
+        self.pause_ms = 0.0             # Planned natural pause time
+        self.correction_ms = 0.0        # Planned backspace and retyping time
+        self.paused_s = 0.0             # Time paused by the user
+        self.interval_counts = [0] * self.INTERVAL_BUCKETS
+        self.interval_sum_ms = 0.0
+        self._rate_mark = None          # (time, chars) of the previous snapshot for the live rate
+        self._live_cps = 0.0
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._rate_mark = (self.started, 0)
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @staticmethod
+    def bucket_bounds():
+        """Upper bounds (ms) of the histogram buckets; the last one is +Inf."""
+        return [2 ** i for i in range(SessionMetrics.INTERVAL_BUCKETS - 1)] + [math.inf]
+
+    def snapshot(self, chars):
+        """Derived view of the session after `chars` source characters."""
+        now = self.finished or time.perf_counter()
+        active = max(1e-9, now - self.started - self.paused_s) if self.started else 0.0
+        cps = chars / active if active else 0.0
+
+        # Live rate over at least the last second
+        if self._rate_mark is not None and not self.finished:
+            mark_time, mark_chars = self._rate_mark
+            if now - mark_time >= 1.0:
+                self._live_cps = (chars - mark_chars) / (now - mark_time)
+                self._rate_mark = (now, chars)
+        live_cps = self._live_cps if not self.finished else cps
+
+        remaining = None
+        eta = None
+        if self.total_chars is not None:
+            remaining = max(0, self.total_chars - chars)
+            eta = remaining / cps if cps > 0 else None
+        return {
+            "chars": chars,
+            "total_chars": self.total_chars,
+            "progress": round(chars / self.total_chars, 4) if self.total_chars else None,
+            "elapsed_s": round(active, 3),
+            "chars_per_sec": round(cps, 3),
+            "avg_wpm": round(cps * 12, 2),
+            "current_wpm": round(live_cps * 12, 2),
+            "eta_s": round(eta, 1) if eta is not None else None,
+            "keystrokes": self.keystrokes,
+            "backspaces": self.backspaces,
+            "coalesced_calls": self.coalesced_calls,
+            "coalesced_keys": self.coalesced_keys,
+            "pastes": self.pastes,
+            "pasted_chars": self.pasted_chars,
+            "natural_pauses": self.pauses,
+            "natural_pause_s": round(self.pause_ms / 1000, 3),
+            "correction_s": round(self.correction_ms / 1000, 3),
+            "user_paused_s": round(self.paused_s, 3),
+            "interval_histogram_ms": {
+                ("+Inf" if bound == math.inf else str(bound)): count
+                for bound, count in zip(self.bucket_bounds(), self.interval_counts)
+            },
+            "interval_sum_ms": round(self.interval_sum_ms, 3),
+        }
+
+    @staticmethod
+    def to_prometheus(snapshot):
+        """Render a snapshot in the Prometheus text exposition format."""
+        lines = []
+
+        def metric(name, kind, value, help_text):
+            lines.append(f"# HELP autoscribe_{name} {help_text}")
+            lines.append(f"# TYPE autoscribe_{name} {kind}")
+            lines.append(f"autoscribe_{name} {value}")
+
+        metric("chars_typed_total", "counter", snapshot["chars"], "Source characters typed.")
+        metric("keystrokes_total", "counter", snapshot["keystrokes"], "Keystrokes sent, including corrections.")
+        metric("backspaces_total", "counter", snapshot["backspaces"], "Backspaces sent for typo corrections.")
+        metric("natural_pause_seconds_total", "counter", snapshot["natural_pause_s"], "Time in natural pauses.")
+        metric("correction_seconds_total", "counter", snapshot["correction_s"], "Time spent correcting typos.")
+        metric("user_paused_seconds_total", "counter", snapshot["user_paused_s"], "Time paused by the user.")
+        metric("chars_per_second", "gauge", snapshot["chars_per_sec"], "Average characters per second.")
+        metric("wpm", "gauge", snapshot["current_wpm"], "Current words per minute.")
+        if snapshot["eta_s"] is not None:
+            metric("eta_seconds", "gauge", snapshot["eta_s"], "Estimated time remaining.")
+
+        name = "autoscribe_keystroke_interval_ms"
+        lines.append(f"# HELP {name} Planned delay after each keystroke.")
+        lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for le, count in snapshot["interval_histogram_ms"].items():
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{le}"}} {cumulative}')
+        lines.append(f"{name}_sum {snapshot['interval_sum_ms']}")
+        lines.append(f"{name}_count {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+# Phases of the typing loop timed by a PhaseProfiler
+PHASE_PLAN = 0       # Planning a chunk: delays, typo schedule, digraph shaping
+PHASE_WRITE = 1      # backend.write() of new text (one call per coalesced run)
+PHASE_RETYPE = 2     # backend.write() retyping a corrected word
+PHASE_BACKSPACE = 3  # backend.press('backspace') erasing a typo
+PHASE_PASTE = 4      # backend.paste() of a segment
+PHASE_OVERSLEEP = 5  # How far past its deadline a wait returned
+PHASE_LATE = 6       # How far behind a gap's deadline was before waiting at all
+PHASE_NAMES = ("plan", "write", "retype", "backspace", "paste", "oversleep", "late")
+
+
+class PhaseProfiler:
+    """Per-phase timing histograms for the typing loop.
+
+    The engine holds None instead of a profiler when profiling is off, so the loop
+    pays one `is not None` test per event. When on, tick() decides once per event
+    whether it is sampled and only sampled events read the clock; with sample_every N,
+    one event in N on average is timed (random strides, so periodic patterns such as
+    coalesced runs don't alias), which bounds the cost for long production sessions.
+    Chunk planning happens once per chunk and is always timed.
+    """
+
+    # Histogram bucket i counts durations in [2**(i-1), 2**i) us; the last bucket is open-ended
+    BUCKETS = 24
+
+    def __init__(self, sample_every=1):
+        if sample_every < 1:
+            raise ValueError("sample_every must be at least 1")
+        self.sample_every = sample_every
+        self.events = 0            # Events ticked
+        self.sampled = False       # Whether the current event is timed
+        self.samples = 0
+        self.counts = [[0] * self.BUCKETS for _ in PHASE_NAMES]
+        self.sums = [0.0] * len(PHASE_NAMES)
+        self.maxima = [0.0] * len(PHASE_NAMES)
+        self._rng = random.Random()  # Own RNG: sampling must not change the session's plan
+        self._countdown = self._stride()
+
+    def _stride(self):
+        return self._rng.randint(1, 2 * self.sample_every - 1) if self.sample_every > 1 else 1
+
+    def tick(self):
+        """Start an event; returns whether it is sampled."""
+        self.events += 1
+        self._countdown -= 1
+        if self._countdown:
+            self.sampled = False
+            return False
+        self._countdown = self._stride()
+        self.samples += 1
+        self.sampled = True
+        return True
+
+    def add(self, phase, seconds):
+        """Count one timed occurrence of a phase."""
+        if seconds < 0:
+            seconds = 0.0
+        bucket = int(seconds * 1e6).bit_length()
+        self.counts[phase][bucket if bucket < self.BUCKETS else self.BUCKETS - 1] += 1
+        self.sums[phase] += seconds
+        if seconds > self.maxima[phase]:
+            self.maxima[phase] = seconds
+
+    @staticmethod
+    def bucket_bounds():
+        """Upper bounds (us) of the histogram buckets; the last one is +Inf."""
+        return [2 ** i for i in range(PhaseProfiler.BUCKETS - 1)] + [math.inf]
+
+    def _quantile(self, phase, q):
+        """Upper bound (us) of the bucket holding quantile q of a phase (the maximum for
+        the open-ended bucket)."""
+        counts = self.counts[phase]
+        rank = q * sum(counts)
+        seen = 0
+        for bound, count in zip(self.bucket_bounds(), counts):
+            seen += count
+            if count and seen >= rank:
+                return round(self.maxima[phase] * 1e6, 1) if bound == math.inf else bound
+        return 0
+
+    def report(self):
+        """Per-phase counts, totals, quantiles (bucket upper bounds) and histograms."""
+        phases = {}
+        for phase, name in enumerate(PHASE_NAMES):
+            counts = self.counts[phase]
+            count = sum(counts)
+            if not count:
+                continue
+            phases[name] = {
+                "count": count,
+                "total_ms": round(self.sums[phase] * 1000, 3),
+                "mean_us": round(self.sums[phase] / count * 1e6, 1),
+                "p50_us": self._quantile(phase, 0.5),
+                "p90_us": self._quantile(phase, 0.9),
+                "p99_us": self._quantile(phase, 0.99),
+                "max_us": round(self.maxima[phase] * 1e6, 1),
+                "histogram_us": {
+                    ("+Inf" if bound == math.inf else str(bound)): n
+                    for bound, n in zip(self.bucket_bounds(), counts) if n
+                },
+            }
+        return {
+            "sample_every": self.sample_every,
+            "events": self.events,
+            "sampled_events": self.samples,
+            "phases": phases,
+        }
+
+
+def write_metrics_file(snapshot, path, fmt="json"):
+    """Atomically write a snapshot as JSON or a Prometheus textfile."""
+    text = SessionMetrics.to_prometheus(snapshot) if fmt == "prometheus" else json.dumps(snapshot)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class MetricsExporter:
+    """Background thread that rewrites a metrics file every `interval` seconds while
+    an engine is running (and once more when stopped)."""
+
+    def __init__(self, engine, path, fmt="json", interval=5.0):
+        self.engine = engine
+        self.path = path
+        self.fmt = fmt
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.export()
+
+    def export(self):
+        write_metrics_file(self.engine.metrics_snapshot(), self.path, self.fmt)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.export()
+
+
+# ---------- Control ----------
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class TypingControl:
+    """Run/pause/stop state shared by the control side (hotkeys, GUI, daemon) and the
+    typing thread.
+
+    Every wait goes through one condition variable: pausing blocks without polling,
+    and sleep() returns as soon as a pause or stop is requested, so both take effect
+    within milliseconds even in the middle of a long natural pause. The time from a
+    request to the typing thread acting on it is kept as control latency.
+
+    Coroutines (the asyncio engine) wait through sleep_async() and
+    wait_while_paused_async() instead: every state change also resolves their waiter
+    futures, on whichever event loop they run, so any thread can pause or stop them.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._running = False
+        self._paused = False
+        self._pending = {}  # Request kind -> perf_counter() when it was made
+        self._waiters = []  # (loop, future) of coroutines waiting for a state change
+        self.latencies = {"pause": deque(maxlen=100), "stop": deque(maxlen=100)}
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def paused(self):
+        return self._paused
+
+    def _interrupted(self):
+        return self._paused or not self._running
+
+    def _stopped(self):
+        return not self._running
+
+    def _notify(self):
+        """Wake every waiting thread and coroutine (call with the lock held)."""
+        self._cond.notify_all()
+        for loop, waiter in self._waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+        self._waiters.clear()
+
+    def start(self):
+        with self._cond:
+            self._running = True
+            self._paused = False
+            self._pending.clear()
+            self._notify()
+
+    def finish(self):
+        """The run ended on its own (not a stop request)."""
+        with self._cond:
+            self._running = False
+            self._paused = False
+            self._notify()
+
+    def stop(self):
+        with self._cond:
+            if self._running:
+                self._pending.setdefault("stop", time.perf_counter())
+            self._running = False
+            self._paused = False
+            self._notify()
+
+    def pause(self):
+        with self._cond:
+            if self._running and not self._paused:
+                self._paused = True
+                self._pending["pause"] = time.perf_counter()
+                self._notify()
+
+    def resume(self):
+        with self._cond:
+            self._paused = False
+            self._pending.pop("pause", None)
+            self._notify()
+
+    def toggle_pause(self):
+        """Toggle pause state; returns whether we are now paused."""
+        with self._cond:
+            if self._paused:
+                self.resume()
+            else:
+                self.pause()
+            return self._paused
+
+    def acknowledge(self):
+        """Called by the typing thread once it acts on the current state."""
+        if not self._pending:
+            return
+        now = time.perf_counter()
+        with self._cond:
+            for kind in list(self._pending):
+                if (kind == "stop" and not self._running) or (kind == "pause" and self._paused):
+                    self.latencies[kind].append(now - self._pending.pop(kind))
+
+    def sleep(self, seconds, wake_on_pause=True):
+        """Sleep up to `seconds`; returns False if woken early by a stop (or pause)."""
+        with self._cond:
+            return not self._cond.wait_for(self._interrupted if wake_on_pause else self._stopped, seconds)
+
+    def wait_while_paused(self):
+        """Block (without waking up) until resumed or stopped; returns the time paused."""
+        started = time.perf_counter()
+        with self._cond:
+            self._cond.wait_for(lambda: not self._paused or not self._running)
+        return time.perf_counter() - started
+
+    async def _changed(self, ready, timeout=None):
+        """Wait on the running loop until ready() or the timeout; returns ready()."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            with self._cond:
+                if ready():
+                    return True
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                waiter = loop.create_future()
+                entry = (loop, waiter)
+                self._waiters.append(entry)
+            timer = loop.call_later(remaining, _wake, waiter) if remaining is not None else None
+            try:
+                await waiter
+            finally:
+                if timer is not None:
+                    timer.cancel()
+                with self._cond:
+                    if entry in self._waiters:
+                        self._waiters.remove(entry)
+
+    async def sleep_async(self, seconds, wake_on_pause=True):
+        """Coroutine version of sleep(): yields to the event loop while it waits."""
+        return not await self._changed(self._interrupted if wake_on_pause else self._stopped, seconds)
+
+    async def wait_while_paused_async(self):
+        """Coroutine version of wait_while_paused()."""
+        started = time.perf_counter()
+        await self._changed(lambda: not self._paused or not self._running)
+        return time.perf_counter() - started
+
+    def latency_report(self):
+        """Pause/stop request-to-effect latency in milliseconds."""
+        report = {}
+        for kind, values in self.latencies.items():
+            values = list(values)
+            report[kind] = {
+                "count": len(values),
+                "last_ms": round(values[-1] * 1000, 3) if values else None,
+                "mean_ms": round(statistics.fmean(values) * 1000, 3) if values else None,
+                "max_ms": round(max(values) * 1000, 3) if values else None,
+            }
+        return report
+
+
+# ---------- Checkpoints ----------
+JOURNAL_FILE = "autoscribe.journal"
+
+
+def source_fingerprint(text=None, path=None):
+    """Identify a source so a journal is only resumed against the same document.
+
+    Returns None for stdin, which cannot be read a second time.
+    """
+    if path is not None:
+        if path == "-":
+            return None
+        st = os.stat(path)
+        return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    text = text.strip()
+    return {"sha256": hashlib.sha256(text.encode("utf-8")).hexdigest(), "length": len(text)}
+
+
+def _rng_state(rng):
+    version, internal, gauss_next = rng.getstate()
+    return [version, list(internal), gauss_next]
+
+
+def _set_rng_state(rng, state):
+    version, internal, gauss_next = state
+    rng.setstate((version, tuple(internal), gauss_next))
+
+
+class SessionJournal:
+    """Append-only journal of a typing session, so an interrupted job resumes at the
+    keystroke where it stopped instead of retyping the document.
+
+    One record per line:
+      {"type": "session", ...}      source fingerprint, settings and chunk size
+      {"type": "checkpoint", ...}   before each chunk is planned: chunk number, source
+                                    offset and the RNG, timing and planner state
+      P <chunk> <events> <index>    events of that chunk replayed, source chars committed
+      {"type": "done"}              the session completed
+
+    Resuming restores the checkpoint, re-plans that chunk (deterministic from the
+    restored state, so typos and pending corrections come out the same) and skips the
+    events already replayed. Progress is only written every flush_every events or
+    before a long gap such as a natural pause, and always on close; after a hard kill
+    at most flush_every - 1 keystrokes are repeated.
+    """
+
+    def __init__(self, path, flush_every=16, long_gap_ms=250.0):
+        self.path = path
+        self.flush_every = flush_every
+        self.long_gap_ms = long_gap_ms
+        self._file = None
+        self._pending = None  # Latest progress record not yet written
+        self._flushed = 0     # Events of the current chunk in the last written record
+
+    def open(self, header=None):
+        """Start a new journal with header or, if header is None, append to the existing one."""
+        self._file = open(self.path, "w" if header is not None else "a", encoding="utf-8")
+        if header is not None:
+            self._write(dict(header, type="session"), sync=True)
+        return self
+
+    def _write(self, record, sync=False):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def checkpoint(self, chunk, offset, state):
+        """Record the engine state before `chunk` (starting at source offset) is planned."""
+        self.flush()
+        self._write({"type": "checkpoint", "chunk": chunk, "offset": offset, "state": state}, sync=True)
+        self._flushed = 0
+
+    def progress(self, chunk, events, index, delay_ms=0.0):
+        """Note that `events` events of `chunk` are done and `index` source chars committed."""
+        self._pending = (chunk, events, index)
+        # By distance, not multiples: coalesced batches report only their last event
+        if events - self._flushed >= self.flush_every or delay_ms >= self.long_gap_ms:
+            self.flush()
+
+    def flush(self):
+        if self._pending is not None:
+            self._file.write("P %d %d %d\n" % self._pending)
+            self._file.flush()
+            self._flushed = self._pending[1]
+            self._pending = None
+
+    def close(self, completed=False):
+        """Write any pending progress (and the done marker) and close the file."""
+        if self._file is None:
+            return
+        self.flush()
+        if completed:
+            self._write({"type": "done"}, sync=True)
+        self._file.close()
+        self._file = None
+
+    @staticmethod
+    def load(path):
+        """Read a journal; returns (header, resume point).
+
+        The resume point is a dict with chunk, offset, state, event and index, or None if
+        the session completed or never planned anything. A missing file gives
+        (None, None); a torn last line (a crash mid-write) is ignored.
+        """
+        header = checkpoint = progress = None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        if line.startswith("P "):
+                            chunk, events, index = map(int, line.split()[1:4])
+                            progress = (chunk, events, index)
+                            continue
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    kind = record.get("type")
+                    if kind == "session":
+                        header = record
+                    elif kind == "checkpoint":
+                        checkpoint = record
+                    elif kind == "done":
+                        checkpoint = None
+        except FileNotFoundError:
+            return None, None
+        if header is None or checkpoint is None:
+            return header, None
+
+        point = {
+            "chunk": checkpoint["chunk"],
+            "offset": checkpoint["offset"],
+            "state": checkpoint["state"],
+            "event": 0,
+            "index": checkpoint["state"].get("index", checkpoint["offset"]),
+        }
+        if progress is not None and progress[0] == point["chunk"]:
+            point["event"], point["index"] = progress[1], progress[2]
+        return header, point
+
+
+def open_journal(path, fingerprint, settings, resume=True):
+    """Open the journal at path for a session over the source `fingerprint`.
+
+    If resume is set and the journal holds an unfinished session of the same source, it
+    is appended to and its resume point and settings are returned; otherwise a new
+    journal is started. Returns (journal, resume point or None, settings).
+    """
+    journal = SessionJournal(path)
+    if resume:
+        header, point = SessionJournal.load(path)
+        if point is not None and header.get("source") == fingerprint and header.get("chunk_size") == SOURCE_CHUNK_SIZE:
+            return journal.open(), point, header["settings"]
+    header = {"source": fingerprint, "settings": settings, "chunk_size": SOURCE_CHUNK_SIZE}
+    return journal.open(header), None, settings
+
+
+# ---------- Typing engine ----------
+def source_length(text=None, path=None):
+    """Length of the source if it can be known up front (file size for files, which
+    matches the character count for ASCII and is close enough for an ETA otherwise)."""
+    if path is not None:
+        return os.path.getsize(path) if path != "-" else None
+    return len(text.strip())
+
+
+def source_chunks(text=None, path=None):
+    """Chunks of the source: streamed from path ("-" for stdin) or split from text."""
+    if path is not None:
+        return iter_source_chunks(path)
+    return iter_text_chunks(text.strip())
+
+
+class TypingEngine:
+    """Headless typing engine shared by the GUI, the command line and the daemon.
+
+    Plans the source chunk by chunk and replays it on an output backend. pause(),
+    resume() and stop() may be called from any thread. Status text is published in
+    `status` (a plain attribute, so readers such as the GUI can poll it without
+    locking) and passed to the on_status callback.
+    """
+
+    SETTINGS = (
+        "min_wpm", "max_wpm", "typo_min_words", "typo_max_words", "layout", "seed", "coalesce_ms", "profile",
+        "paste_markup", "paste_min_lines", "paste_non_ascii",
+    )
+    COALESCE_KEYS = 16  # Most keys sent in one coalesced backend call
+
+    def __init__(self, backend=None, backend_name="auto", on_status=None):
+        self.backend = backend            # OutputBackend, created on first run if None
+        self.backend_name = backend_name
+        self.on_status = on_status
+
+        # Settings, snapshotted when a run starts
+        self.min_wpm = 60
+        self.max_wpm = 80
+        self.typo_min_words = 5           # Human-like typo schedule: every N words (random between min/max)
+        self.typo_max_words = 12
+        self.layout = DEFAULT_LAYOUT      # Keyboard layout used to place typos
+        self.seed = None                  # Session RNG seed; None picks a fresh one per run
+        self.coalesce_ms = 0.0            # Throughput mode: keys planned closer than this share one backend call
+        self.profile = None               # Path of a DigraphProfile shaping per-bigram timing
+        self.paste_markup = False         # Paste segments marked [[paste]] ... [[/paste]] (see PasteSplitter)
+        self.paste_min_lines = 0          # Paste blocks of more lines than this (0 = off)
+        self.paste_non_ascii = False      # Paste runs of non-ASCII characters
+
+        # State variables
+        self.control = TypingControl()
+        self.current_index = 0
+        self.last_report = None           # DeadlineScheduler report of the last run
+        self.time_scale = 1.0             # Delay multiplier passed to the scheduler
+        self.phase_sample = 0             # Profile the typing loop timing 1 event in N (0 = off)
+        self.profiler = None              # PhaseProfiler of the current (or last) run
+        self.rng = random.Random()        # Session-owned randomness (no shared global state)
+        self.session_seed = None          # Seed actually used by the current (or last) run
+        self.timing = TimingModel(self.min_wpm, self.max_wpm, rng=self.rng)
+        self.digraphs = None              # DigraphProfile loaded from `profile` (see load_profile())
+        self.metrics = SessionMetrics()
+        self.status = "Status: Ready"
+
+    def set_status(self, text):
+        self.status = text
+        if self.on_status is not None:
+            self.on_status(text)
+
+    def get_settings(self):
+        return {name: getattr(self, name) for name in self.SETTINGS}
+
+    def apply_settings(self, settings):
+        for name in self.SETTINGS:
+            if name in settings:
+                setattr(self, name, settings[name])
+
+    # ---------- Control ----------
+    @property
+    def typing(self):
+        return self.control.running
+
+    @property
+    def paused(self):
+        return self.control.paused
+
+    def pause(self):
+        self.control.pause()
+
+    def resume(self):
+        self.control.resume()
+
+    def toggle_pause(self):
+        """Toggle pause state; returns whether the engine is now paused."""
+        return self.control.toggle_pause()
+
+    def stop(self):
+        self.control.stop()
+
+    def metrics_snapshot(self):
+        """Live telemetry for the current (or last) session; safe from any thread."""
+        snapshot = self.metrics.snapshot(self.current_index)
+        snapshot["control_latency_ms"] = self.control.latency_report()
+        return snapshot
+
+    # ---------- Timing ----------
+    def calculate_delay(self):
+        """Delay before the next keystroke in milliseconds (see TimingModel)."""
+        return self.timing.next_delay()
+
+    # ---------- Planning and replay ----------
+    def make_planner(self):
+        """A KeystrokePlanner using the current speed and mistake settings."""
+        return KeystrokePlanner(
+            self.calculate_delay,
+            functools.partial(get_layout(self.layout).neighbor, rng=self.rng),
+            self.typo_min_words,
+            self.typo_max_words,
+            rng=self.rng,
+            splitter=self.make_splitter(),
+        )
+
+    def make_splitter(self):
+        """A PasteSplitter for the paste settings, or None when nothing is pasted."""
+        return make_splitter(self.paste_markup, self.paste_min_lines, self.paste_non_ascii)
+
+    def build_plan(self, text):
+        """Compile text into a KeystrokePlan using the current speed and mistake settings."""
+        planner = self.make_planner()
+        planner.feed(text)
+        plan = planner.finish()
+        digraphs = self.load_profile()
+        if digraphs is not None:
+            digraphs.shape(plan, self.rng)
+        return plan
+
+    def load_profile(self):
+        """The DigraphProfile at `profile` (loaded once per path), or None."""
+        if not self.profile:
+            return None
+        if self.digraphs is None or self.digraphs.path != self.profile:
+            self.digraphs = DigraphProfile.load(self.profile)
+        return self.digraphs
+
+    def iter_plans(self, planner, chunks, journal=None, resume=None):
+        """Plan the source chunk by chunk, yielding (chunk number, reused plan) after each one.
+
+        Only one chunk's worth of events is held at a time; the planner carries the
+        current word and typo/pause schedules across chunk boundaries. With a journal the
+        state is checkpointed before each chunk; with a resume point the chunks before it
+        are skipped and the saved state is restored so its plan comes out identical.
+        With a timing profile, each chunk's gaps are then shaped per bigram.
+        """
+        start = resume["chunk"] if resume is not None else 0
+        offset = 0  # Source characters in the chunks before this one
+        digraphs = self.load_profile()
+        profiler = self.profiler
+        for number, chunk in enumerate(itertools.chain(chunks, [None])):
+            if number < start:
+                if chunk is None:
+                    raise ValueError("journal does not match the source (source is shorter)")
+                offset += len(chunk)
+                continue
+            if number == start and resume is not None:
+                if offset != resume["offset"]:
+                    raise ValueError("journal does not match the source (chunk offsets differ)")
+                self.restore_state(planner, resume["state"])
+            if journal is not None:
+                journal.checkpoint(number, offset, self.capture_state(planner))
+            started = time.perf_counter() if profiler is not None else None
+            plan = planner.finish() if chunk is None else planner.feed(chunk)
+            if digraphs is not None:
+                digraphs.shape(plan, self.rng)
+            if started is not None:
+                profiler.add(PHASE_PLAN, time.perf_counter() - started)
+            yield number, plan
+            if chunk is None:
+                return
+            planner.plan.clear()
+            offset += len(chunk)
+
+    def capture_state(self, planner):
+        """Everything needed to re-plan from here: RNG, timing walk and planner state,
+        plus the source chars committed so far (less than the chunk offset while the
+        planner holds back a segment to paste)."""
+        return {
+            "rng": _rng_state(self.rng),
+            "timing": self.timing.get_state(),
+            "planner": planner.get_state(),
+            "index": self.current_index,
+        }
+
+    def restore_state(self, planner, state):
+        _set_rng_state(self.rng, state["rng"])
+        self.timing.set_state(state["timing"])
+        planner.set_state(state["planner"])
+        if "index" in state:
+            self.current_index = state["index"]
+
+    def prepare(self, total_chars=None):
+        """Reset per-run state; from here on the engine counts as typing.
+
+        total_chars (the source length, if known) lets telemetry report progress and ETA.
+        """
+        self.control.start()
+        self.current_index = 0
+        self.metrics.reset(total_chars)
+        self.set_status("Status: Starting...")
+        # Reset typing pattern variables (starts at middle speed) from a seeded session RNG,
+        # recorded in the report so any run can be reproduced
+        self.session_seed = self.seed if self.seed is not None else int.from_bytes(os.urandom(8), "big")
+        self.rng = random.Random(self.session_seed)
+        self.timing = make_timing_model(self.min_wpm, self.max_wpm, rng=self.rng)
+        self.profiler = PhaseProfiler(self.phase_sample) if self.phase_sample else None
+
+    def make_scheduler(self, time_scale=None):
+        """A DeadlineScheduler whose sleeps wake up on pause/stop requests."""
+        return DeadlineScheduler(
+            time_scale=self.time_scale if time_scale is None else time_scale,
+            sleep=self.control.sleep,
+            sleep_async=self.control.sleep_async,
+            profiler=self.profiler,
+        )
+
+    def run(self, chunks, countdown=0.0, journal=None, resume=None, trace=None):
+        """Type the source chunks, blocking until done or stopped. Call prepare() first.
+
+        journal (a SessionJournal) records progress for a later resume; resume (a point
+        from SessionJournal.load) continues an interrupted session of the same source,
+        with the settings it was started with. trace (a TraceWriter) records every
+        emitted keystroke. Returns True if the whole source was typed.
+        """
+        if not self.typing:
+            if journal is not None:
+                journal.close()
+            return False  # Stopped before we got going
+
+        # Plan the first chunk while the countdown runs, then wait out the rest of it
+        started = time.time()
+        try:
+            plans, skip = self._start_plans(chunks, journal, resume)
+        except BaseException:
+            self._abort(journal, trace)
+            raise
+        countdown -= time.time() - started
+        return self._execute(plans, countdown, skip, journal, trace)
+
+    async def run_async(self, chunks, countdown=0.0, journal=None, resume=None, trace=None):
+        """Coroutine version of run(): types on the running event loop, so any number of
+        sessions and a control API can share one thread.
+
+        Behaves like run() (same plan, corrections, pauses and bursts for the same seed)
+        and is controlled the same way; cancelling the task stops the session, with its
+        progress kept in the journal. Chunks are planned on a worker thread, so other
+        sessions on the loop keep their schedule meanwhile; backend calls run inline.
+        """
+        if not self.typing:
+            if journal is not None:
+                journal.close()
+            return False
+
+        started = time.time()
+        try:
+            plans, skip = await self._in_thread(self._start_plans, chunks, journal, resume)
+        except BaseException:
+            self._abort(journal, trace)
+            raise
+        countdown -= time.time() - started
+        return await self._execute_async(plans, countdown, skip, journal, trace)
+
+    @staticmethod
+    async def _in_thread(func, *args):
+        """Run func(*args) on the loop's default executor. If the task is cancelled
+        meanwhile, the call is still waited for, so nothing (such as the journal) is
+        closed under it."""
+        import asyncio
+
+        future = asyncio.get_running_loop().run_in_executor(None, func, *args)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            await asyncio.wait([future])
+            raise
+
+    def _start_plans(self, chunks, journal=None, resume=None):
+        """Plan the first chunk up front; returns the (chunk number, plan) pairs and how
+        many events of the first one were replayed before an interruption."""
+        plans = self.iter_plans(self.make_planner(), chunks, journal, resume)
+        first = next(plans)
+        skip = 0
+        if resume is not None:
+            self.current_index = resume["index"]
+            skip = resume["event"]  # Events of the first chunk replayed before the interruption
+        return itertools.chain([first], plans), skip
+
+    def replay(self, plan, countdown=0.0, trace=None):
+        """Re-emit a recorded KeystrokeTrace (or any plan) exactly: same keys and delays,
+        no planning and no randomness. Call prepare() first."""
+        if not self.typing:
+            return False
+        return self._execute([(0, plan)], countdown, trace=trace)
+
+    async def replay_async(self, plan, countdown=0.0, trace=None):
+        """Coroutine version of replay()."""
+        if not self.typing:
+            return False
+        return await self._execute_async([(0, plan)], countdown, trace=trace)
+
+    def _execute(self, plans, countdown, skip=0, journal=None, trace=None):
+        """Replay (chunk number, plan) pairs after the countdown and close out the run."""
+        try:
+            if self.backend is None:
+                self.backend = create_backend(self.backend_name)
+            self.control.sleep(max(0.0, countdown), wake_on_pause=False)
+            scheduler = self._begin()
+        except BaseException:
+            self._abort(journal, trace)
+            raise
+        completed = False
+        try:
+            for number, plan in plans:
+                self.replay_plan(plan, scheduler, number, skip, journal, trace)
+                skip = 0
+                if trace is not None:
+                    trace.flush()
+                if not self.typing:
+                    break
+            completed = self.typing
+        finally:
+            self._close(scheduler, completed, journal, trace)
+        return completed
+
+    async def _execute_async(self, plans, countdown, skip=0, journal=None, trace=None):
+        """Coroutine version of _execute()."""
+        try:
+            if self.backend is None:
+                self.backend = create_backend(self.backend_name)
+            await self.control.sleep_async(max(0.0, countdown), wake_on_pause=False)
+            scheduler = self._begin()
+        except BaseException:
+            self._abort(journal, trace)
+            raise
+        completed = False
+        plans = iter(plans)
+        try:
+            while True:
+                planned = await self._in_thread(next, plans, None)  # Planning off the loop
+                if planned is None:
+                    break
+                number, plan = planned
+                await self.replay_plan_async(plan, scheduler, number, skip, journal, trace)
+                skip = 0
+                if trace is not None:
+                    trace.flush()
+                if not self.typing:
+                    break
+            completed = self.typing
+        finally:
+            self._close(scheduler, completed, journal, trace)
+        return completed
+
+    def _begin(self):
+        """Start the clock once the countdown is over; returns the session's scheduler."""
+        scheduler = self.make_scheduler()
+        self.metrics.start()
+        self.set_status("Status: Typing...")
+        return scheduler
+
+    def _close(self, scheduler, completed, journal=None, trace=None):
+        """Close the journal and trace, publish the report and end the session."""
+        if journal is not None:
+            journal.close(completed)
+        if trace is not None:
+            trace.close()
+        self.metrics.finish()
+        self.last_report = scheduler.report()
+        self.last_report["seed"] = self.session_seed
+        if self.profiler is not None:
+            self.last_report["phases"] = self.profiler.report()
+        report = self.last_report
+        self.set_status(
+            f"Status: Completed ({report['achieved_wpm']:.0f} WPM, target {report['target_wpm']:.0f})"
+            if completed else "Status: Ready"
+        )
+        self.control.acknowledge()
+        self.control.finish()
+
+    def _abort(self, journal=None, trace=None):
+        """End a run that failed before typing began (unreadable source, bad layout,
+        a journal that doesn't match, a backend that can't start): close the files and
+        stop counting as typing."""
+        if journal is not None:
+            journal.close()
+        if trace is not None:
+            trace.close()
+        self.set_status("Status: Ready")
+        self.control.finish()
+
+    def _hold(self, scheduler):
+        """Act on pause/stop: block while paused (excluded from the schedule).
+
+        Returns False once stopped.
+        """
+        control = self.control
+        while True:
+            control.acknowledge()
+            if not control.running:
+                return False
+            if not control.paused:
+                return True
+            paused_for = control.wait_while_paused()
+            self.metrics.paused_s += paused_for
+            scheduler.exclude(paused_for)
+
+    async def _hold_async(self, scheduler):
+        """Coroutine version of _hold()."""
+        control = self.control
+        while True:
+            control.acknowledge()
+            if not control.running:
+                return False
+            if not control.paused:
+                return True
+            paused_for = await control.wait_while_paused_async()
+            self.metrics.paused_s += paused_for
+            scheduler.exclude(paused_for)
+
+    def _wait(self, scheduler, delay_ms):
+        """Wait out a planned gap; a pause holds it and a stop cuts it short."""
+        if not scheduler.wait(delay_ms):
+            while self._hold(scheduler) and not scheduler.wait(0):
+                pass
+
+    async def _wait_async(self, scheduler, delay_ms):
+        """Coroutine version of _wait()."""
+        if not await scheduler.wait_async(delay_ms):
+            while await self._hold_async(scheduler) and not await scheduler.wait_async(0):
+                pass
+
+    def replay_plan(self, plan, scheduler, chunk=0, start=0, journal=None, trace=None):
+        """Replay a KeystrokePlan (from event `start`) on the scheduler's absolute deadlines.
+
+        With a journal, progress through `chunk` is recorded as events complete; with a
+        trace, every emitted event is recorded with its emission time.
+
+        In throughput mode (coalesce_ms > 0) consecutive keys whose planned gap is below
+        coalesce_ms are held back and sent in one backend.write() together with the next
+        key, and their gaps are waited out after it. The per-call cost of the backend is
+        then paid once per run of keys, so high speeds stay reachable; typos and
+        corrections are unaffected since backspaces and pauses always end a run.
+        """
+        steps = self._replay_steps(plan, scheduler, chunk, start, journal, trace)
+        try:
+            request = next(steps)
+            while True:
+                if request is None:
+                    request = steps.send(self._hold(scheduler))
+                else:
+                    self._wait(scheduler, request)
+                    request = next(steps)
+        except StopIteration:
+            pass
+
+    async def replay_plan_async(self, plan, scheduler, chunk=0, start=0, journal=None, trace=None):
+        """Coroutine version of replay_plan()."""
+        steps = self._replay_steps(plan, scheduler, chunk, start, journal, trace)
+        try:
+            request = next(steps)
+            while True:
+                if request is None:
+                    request = steps.send(await self._hold_async(scheduler))
+                else:
+                    await self._wait_async(scheduler, request)
+                    request = next(steps)
+        except StopIteration:
+            pass
+
+    def _replay_steps(self, plan, scheduler, chunk, start, journal, trace):
+        """The replay loop shared by replay_plan() and replay_plan_async(), minus the waiting.
+
+        Yields the gap (ms) to wait out after each emitted event, or None when paused or
+        stopped; the driver then holds and sends back whether to carry on.
+        """
+        backend = self.backend
+        control = self.control
+        metrics = self.metrics
+        profiler = self.profiler
+        interval_counts = metrics.interval_counts
+        last_bucket = len(interval_counts) - 1
+        coalesce_ms = self.coalesce_ms
+        batch = []  # (key, delay_ms, advance) held back for one backend call
+        for event, (key, action, delay_ms, advance) in enumerate(plan.events(start), start + 1):
+            if batch:
+                if action == ACTION_WRITE:
+                    batch.append((key, delay_ms, advance))
+                    if delay_ms >= coalesce_ms or len(batch) >= self.COALESCE_KEYS:
+                        yield from self._send_batch(batch, scheduler, chunk, event, journal, trace)
+                    continue
+                yield from self._send_batch(batch, scheduler, chunk, event - 1, journal, trace)
+
+            if (control.paused or not control.running) and not (yield None):
+                break
+
+            if action == ACTION_WRITE and delay_ms < coalesce_ms:
+                batch.append((key, delay_ms, advance))
+                continue
+
+            started = time.perf_counter() if profiler is not None and profiler.tick() else None
+            if action == ACTION_WRITE:
+                backend.write(key)
+                if started is not None:
+                    profiler.add(PHASE_WRITE if advance else PHASE_RETYPE, time.perf_counter() - started)
+                if not advance:
+                    metrics.correction_ms += delay_ms  # Retyping a corrected word
+            elif action == ACTION_BACKSPACE:
+                backend.press('backspace')
+                if started is not None:
+                    profiler.add(PHASE_BACKSPACE, time.perf_counter() - started)
+                metrics.backspaces += 1
+                metrics.correction_ms += delay_ms
+            elif action == ACTION_PASTE:
+                text, advance = plan.pastes[ord(key)]
+                self.set_status("Status: Pasting...")
+                if text:
+                    if started is not None:
+                        started = time.perf_counter()  # Not counting the status update
+                    backend.paste(text)
+                    if started is not None:
+                        profiler.add(PHASE_PASTE, time.perf_counter() - started)
+                metrics.pastes += 1
+                metrics.pasted_chars += advance
+                if trace is not None:
+                    trace.record_paste(text, advance, delay_ms, time.perf_counter() - scheduler.origin)
+                self.current_index += advance  # Not counted toward the typing speed
+                if journal is not None:
+                    journal.progress(chunk, event, self.current_index, delay_ms)
+                yield delay_ms
+                if control.running:
+                    self.set_status("Status: Typing...")
+                continue
+            else:
+                metrics.pauses += 1
+                metrics.pause_ms += delay_ms
+                if trace is not None:
+                    trace.record(key, action, delay_ms, advance, time.perf_counter() - scheduler.origin)
+                if journal is not None:
+                    journal.progress(chunk, event, self.current_index, delay_ms)
+                self.set_status("Status: Natural pause...")
+                yield delay_ms
+                if control.running:
+                    self.set_status("Status: Typing...")
+                continue
+
+            if trace is not None:
+                trace.record(key, action, delay_ms, advance, time.perf_counter() - scheduler.origin)
+            metrics.keystrokes += 1
+            bucket = int(delay_ms).bit_length()
+            interval_counts[bucket if bucket < last_bucket else last_bucket] += 1
+            metrics.interval_sum_ms += delay_ms
+
+            self.current_index += advance
+            scheduler.advance(advance)
+            if journal is not None:
+                journal.progress(chunk, event, self.current_index, delay_ms)
+            yield delay_ms
+        if batch:
+            yield from self._send_batch(batch, scheduler, chunk, event, journal, trace)
+
+    def _send_batch(self, batch, scheduler, chunk, event, journal=None, trace=None):
+        """Write the keys held back in throughput mode in one call (the last of them is
+        event `event`), account for each of them and yield their combined gap."""
+        if (self.control.paused or not self.control.running) and not (yield None):
+            batch.clear()
+            return
+        profiler = self.profiler
+        started = time.perf_counter() if profiler is not None and profiler.tick() else None
+        self.backend.write("".join(key for key, _, _ in batch))
+        if started is not None:
+            profiler.add(PHASE_WRITE, time.perf_counter() - started)
+        metrics = self.metrics
+        interval_counts = metrics.interval_counts
+        last_bucket = len(interval_counts) - 1
+        now = time.perf_counter() - scheduler.origin
+        gap_ms = 0.0
+        for key, delay_ms, advance in batch:
+            if trace is not None:
+                trace.record(key, ACTION_WRITE, delay_ms, advance, now)
+            if not advance:
+                metrics.correction_ms += delay_ms
+            metrics.keystrokes += 1
+            bucket = int(delay_ms).bit_length()
+            interval_counts[bucket if bucket < last_bucket else last_bucket] += 1
+            metrics.interval_sum_ms += delay_ms
+            self.current_index += advance
+            scheduler.advance(advance)
+            gap_ms += delay_ms
+        metrics.coalesced_calls += 1
+        metrics.coalesced_keys += len(batch)
+        batch.clear()
+        if journal is not None:
+            journal.progress(chunk, event, self.current_index, gap_ms)
+        yield gap_ms
+
+
+# ---------- Jobs ----------
+class TypingJob:
+    """One document to type, the settings to type it with and, once run, its outcome."""
+
+    SETTINGS = TypingEngine.SETTINGS
+
+    def __init__(self, text=None, path=None, name=None, backend="auto", display=None, countdown=0.0, **settings):
+        if (text is None) == (path is None):
+            raise ValueError("a job needs exactly one of text or path")
+        unknown = set(settings) - set(self.SETTINGS)
+        if unknown:
+            raise ValueError(f"unknown job settings: {', '.join(sorted(unknown))}")
+        self.text = text
+        self.path = path
+        self.name = name or (os.path.basename(path) if path else f"text-{id(self):x}")
+        self.backend = backend      # Backend name, or an OutputBackend instance
+        self.display = display      # X display for the xtest backend (None: one from the scheduler's pool)
+        self.countdown = countdown
+        self.settings = settings
+
+        # Outcome
+        self.status = "queued"      # queued, running, completed, stopped, cancelled or failed
+        self.engine = None
+        self.report = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.future = None
+        self.stop_requested = False  # Set by the scheduler's stop(), even before the engine exists
+
+    def make_engine(self):
+        """A fresh engine (own backend, RNG, timing and control state) for this job."""
+        if isinstance(self.backend, OutputBackend):
+            engine = TypingEngine(backend=self.backend)
+        else:
+            engine = TypingEngine(backend=create_backend(self.backend, self.display))
+        engine.apply_settings(self.settings)
+        return engine
+
+    def chars_typed(self):
+        return self.engine.current_index if self.engine is not None else 0
+
+    def summary(self):
+        return {
+            "name": self.name,
+            "status": self.status,
+            "chars": self.chars_typed(),
+            "elapsed_s": round(self.finished - self.started, 3) if self.finished and self.started else None,
+            "report": self.report,
+            "error": self.error,
+        }
+
+
+class JobScheduler:
+    """Queue of typing jobs run by a pool of worker threads.
+
+    Each job runs in its own TypingEngine, so sessions share no RNG, timing or control
+    state and several targets (separate displays or backends) can be typed to in
+    parallel. With one worker, jobs simply run in submission order.
+
+    With `displays`, a job without a display of its own takes a free one from the pool
+    when it starts and hands it back when it ends, so two sessions never type into the
+    same display at once; there must be at least one display per worker.
+    """
+
+    def __init__(self, workers=1, displays=None):
+        self.workers = workers
+        self.jobs = []
+        self._lock = threading.Lock()
+        self._init_displays(displays)
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="autoscribe-session")
+
+    def _init_displays(self, displays):
+        if displays and self.workers is None:
+            self.workers = len(displays)
+        if displays and len(displays) < self.workers:
+            raise ValueError(f"{self.workers} workers need at least as many displays (got {len(displays)})")
+        self._free_displays = deque(displays or ())
+
+    def _take_display(self, job):
+        """Give a job without a display a free one from the pool; returns it (or None)."""
+        if job.display is not None or not self._free_displays:
+            return None
+        with self._lock:
+            job.display = self._free_displays.popleft()
+        return job.display
+
+    def _return_display(self, display):
+        if display is not None:
+            with self._lock:
+                self._free_displays.append(display)
+
+    def submit(self, job):
+        with self._lock:
+            self.jobs.append(job)
+            job.future = self._executor.submit(self._run_job, job)
+        return job
+
+    def _start_job(self, job):
+        """Mark a queued job running; False if it was cancelled first."""
+        with self._lock:
+            if job.status == "cancelled":
+                return False
+            job.started = time.perf_counter()
+            job.status = "running"
+            return True
+
+    def _attach_engine(self, job, engine):
+        """Hand a prepared engine to stop()/pause(). A stop that came in while the
+        engine was being created or prepared stops it now, so it isn't lost."""
+        with self._lock:
+            job.engine = engine
+            if job.stop_requested:
+                engine.stop()
+
+    def _run_job(self, job):
+        if not self._start_job(job):
+            return job
+        display = self._take_display(job)
+        try:
+            engine = job.make_engine()
+            engine.prepare(source_length(job.text, job.path))
+            self._attach_engine(job, engine)
+            completed = engine.run(source_chunks(job.text, job.path), countdown=job.countdown)
+            job.report = engine.last_report
+            job.status = "completed" if completed else "stopped"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished = time.perf_counter()
+            self._return_display(display)
+        return job
+
+    def wait(self):
+        """Block until every submitted job has finished; returns report()."""
+        for job in list(self.jobs):
+            if job.future is not None and not job.future.cancelled():
+                job.future.result()
+        return self.report()
+
+    def pause(self):
+        for job in self.jobs:
+            if job.engine is not None:
+                job.engine.pause()
+
+    def resume(self):
+        for job in self.jobs:
+            if job.engine is not None:
+                job.engine.resume()
+
+    def stop(self):
+        """Cancel queued jobs and stop running ones."""
+        with self._lock:
+            for job in self.jobs:
+                job.stop_requested = True
+                if job.status == "queued":
+                    job.status = "cancelled"
+                if job.engine is not None:
+                    job.engine.stop()
+
+    def shutdown(self):
+        self.stop()
+        self._executor.shutdown(wait=True)
+
+    def report(self):
+        """Per-job outcomes plus aggregate throughput over the scheduler's wall time."""
+        jobs = list(self.jobs)
+        started = [job.started for job in jobs if job.started is not None]
+        finished = [job.finished or time.perf_counter() for job in jobs if job.started is not None]
+        wall = (max(finished) - min(started)) if started else 0.0
+        chars = sum(job.chars_typed() for job in jobs)
+        cps = chars / wall if wall > 0 else 0.0
+        counts = {}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "jobs": counts,
+            "chars": chars,
+            "wall_s": round(wall, 3),
+            "aggregate_chars_per_sec": round(cps, 3),
+            "aggregate_wpm": round(cps * 12, 2),
+            "sessions": [job.summary() for job in jobs],
+        }
+
+
+class AsyncJobScheduler(JobScheduler):
+    """JobScheduler on the asyncio engine: each session is a task on one event loop
+    rather than a worker thread, and up to `workers` of them (all if None) type at once.
+    """
+
+    def __init__(self, workers=None, displays=None):
+        self.workers = workers
+        self.jobs = []
+        self._lock = threading.Lock()
+        self._init_displays(displays)
+
+    def submit(self, job):
+        with self._lock:
+            self.jobs.append(job)
+        return job
+
+    async def run(self):
+        """Run every queued job on the running loop; returns report()."""
+        import asyncio
+
+        slots = asyncio.Semaphore(self.workers) if self.workers else None
+
+        async def run_job(job):
+            if slots is None:
+                return await self._run_job_async(job)
+            async with slots:
+                return await self._run_job_async(job)
+
+        await asyncio.gather(*(run_job(job) for job in list(self.jobs) if job.status == "queued"))
+        return self.report()
+
+    async def _run_job_async(self, job):
+        import asyncio
+
+        if not self._start_job(job):
+            return job
+        display = self._take_display(job)
+        try:
+            engine = job.make_engine()
+            engine.prepare(source_length(job.text, job.path))
+            self._attach_engine(job, engine)
+            completed = await engine.run_async(source_chunks(job.text, job.path), countdown=job.countdown)
+            job.report = engine.last_report
+            job.status = "completed" if completed else "stopped"
+        except asyncio.CancelledError:
+            job.status = "stopped"
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished = time.perf_counter()
+            self._return_display(display)
+        return job
+
+    def wait(self):
+        """Run the queued jobs on a new event loop, blocking until they finish."""
+        import asyncio
+
+        return asyncio.run(self.run())
+
+    def shutdown(self):
+        self.stop()
+
+
+# ---------- Benchmarks ----------
+_BENCH_PROSE = (
+    "The committee met on Tuesday to review the proposal, and after a long discussion "
+    "they agreed that the budget should be revised before the next quarter. Nobody "
+    "expected the vote to be unanimous; still, it was. "
+)
+_BENCH_CODE = (
+    "def merge(left, right):\n"
+    "    result = []\n"
+    "    while left and right:\n"
+    "        result.append(left.pop(0) if left[0] <= right[0] else right.pop(0))\n"
+    "    return result + left + right  # {'a': [1, 2], \"b\": (3, 4)}\n"
+)
+_BENCH_NUMBERS = "Invoice 2024-0317: 14 x 29.99 = 419.86; tax 8.25% -> 34.64, total $454.50. "
+_BENCH_LONG_WORDS = (
+    "internationalization counterrevolutionary electroencephalograph "
+    "incomprehensibilities uncharacteristically overintellectualization "
+)
+
+BENCH_CORPORA = {
+    "prose": _BENCH_PROSE * 8,
+    "code": _BENCH_CODE * 8,
+    "numbers": _BENCH_NUMBERS * 20,
+    "long_words": _BENCH_LONG_WORDS * 12,
+}
+
+
+def _distribution(values, scale=1.0):
+    """Summary statistics of values (multiplied by scale), rounded for JSON output."""
+    if not values:
+        return {}
+    values = sorted(v * scale for v in values)
+    q = statistics.quantiles(values, n=100) if len(values) > 1 else [values[0]] * 99
+    return {
+        "count": len(values),
+        "mean": round(statistics.fmean(values), 4),
+        "stdev": round(statistics.pstdev(values), 4),
+        "p50": round(q[49], 4),
+        "p95": round(q[94], 4),
+        "p99": round(q[98], 4),
+        "max": round(values[-1], 4),
+    }
+
+
+def _expected_gaps(plan):
+    """Planned gap (ms) after each emitted event; pause events fold into the gap before them."""
+    gaps = []
+    for _, action, delay_ms, _ in plan:
+        if action == ACTION_PAUSE:
+            if gaps:
+                gaps[-1] += delay_ms
+        else:
+            gaps.append(delay_ms)
+    return gaps
+
+
+def benchmark_corpus(text, min_wpm=60, max_wpm=80, typo_min_words=5, typo_max_words=12, time_scale=0.01,
+                     coalesce_ms=0.0):
+    """Benchmark the engine on one corpus.
+
+    Measures planning and replay cost per event (null backend, zero delays), then types
+    the corpus on a recording backend with every delay multiplied by time_scale to get
+    the inter-key interval distribution, timing jitter against the plan and the
+    achieved speed. Intervals and WPM are reported in unscaled (real typing) time.
+    coalesce_ms enables throughput mode for the timed run.
+    """
+    engine = TypingEngine(backend=NullBackend())
+    engine.min_wpm, engine.max_wpm = min_wpm, max_wpm
+    engine.typo_min_words, engine.typo_max_words = typo_min_words, typo_max_words
+
+    # Planning cost
+    engine.prepare()
+    started = time.perf_counter()
+    plan = engine.build_plan(text)
+    plan_s = time.perf_counter() - started
+    events = max(1, len(plan))
+
+    # Replay cost without any waiting
+    fast = KeystrokePlan()
+    for key, action, _, advance in plan:
+        fast.append(key, action, 0.0, advance)
+    started = time.perf_counter()
+    engine.replay_plan(fast, engine.make_scheduler(1.0))
+    replay_s = time.perf_counter() - started
+
+    # The same with every event profiled (the upper bound of PhaseProfiler's cost)
+    engine.profiler = PhaseProfiler()
+    started = time.perf_counter()
+    engine.replay_plan(fast, engine.make_scheduler(1.0))
+    profiled_s = time.perf_counter() - started
+    engine.profiler = None
+
+    # Timed run on the recording backend
+    recorder = RecordingBackend()
+    engine.backend = recorder
+    engine.coalesce_ms = coalesce_ms
+    scheduler = engine.make_scheduler(time_scale)
+    engine.replay_plan(plan, scheduler)
+    report = scheduler.report()
+    engine.stop()
+
+    intervals = recorder.intervals()
+    expected = _expected_gaps(plan)
+    jitter = [actual * 1000 - gap * time_scale for actual, gap in zip(intervals, expected)]
+
+    correction_ms = sum(d for _, action, d, advance in plan if advance == 0 and action != ACTION_PAUSE)
+    pause_ms = sum(d for _, action, d, _ in plan if action == ACTION_PAUSE)
+    planned_ms = plan.total_delay()
+    return {
+        "chars": len(text),
+        "events": len(plan),
+        "correct_output": recorder.text() == text,
+        "plan_us_per_event": round(plan_s / events * 1e6, 3),
+        "replay_us_per_event": round(replay_s / events * 1e6, 3),
+        "profiled_replay_us_per_event": round(profiled_s / events * 1e6, 3),
+        "interval_ms": _distribution(intervals, 1000 / time_scale),
+        "jitter_ms": _distribution(jitter),
+        "configured_wpm": [min_wpm, max_wpm],
+        "planned_wpm": report["target_wpm"],
+        "achieved_wpm": report["achieved_wpm"],
+        "wpm_error_pct": report["wpm_error_pct"],
+        "correction_ms": round(correction_ms, 1),
+        "correction_pct": round(correction_ms / planned_ms * 100, 2) if planned_ms else 0.0,
+        "natural_pause_ms": round(pause_ms, 1),
+        "coalesced_keys_pct": round(engine.metrics.coalesced_keys / events * 100, 2),
+    }
+
+
+def benchmark_backend(backend, chars=2000, sizes=(1, 4, TypingEngine.COALESCE_KEYS)):
+    """Injection ceiling of an output backend, one key per call and coalesced.
+
+    Writes `chars` characters of prose in calls of each size with no delays, so the
+    result is the highest speed the backend can sustain when every key is a separate
+    call and when runs of keys share one (throughput mode). Interactive backends really
+    type into the focused window.
+    """
+    text = (_BENCH_PROSE * (chars // len(_BENCH_PROSE) + 1))[:chars]
+    result = {}
+    for size in sizes:
+        pieces = [text[i:i + size] for i in range(0, len(text), size)]
+        started = time.perf_counter()
+        for piece in pieces:
+            backend.write(piece)
+        elapsed = max(1e-9, time.perf_counter() - started)
+        result[f"{size}_per_call"] = {
+            "calls": len(pieces),
+            "us_per_call": round(elapsed / len(pieces) * 1e6, 3),
+            "us_per_char": round(elapsed / len(text) * 1e6, 3),
+            "max_wpm": round(len(text) / elapsed * 12, 1),
+        }
+    return result
+
+
+def run_benchmark(corpora=None, min_wpm=60, max_wpm=80, typo_min_words=5, typo_max_words=12, time_scale=0.01,
+                  coalesce_ms=0.0, backends=("null", "recording")):
+    """Benchmark every named corpus and backend; returns a JSON-serializable result."""
+    import platform
+
+    names = corpora or list(BENCH_CORPORA)
+    backend_results = {}
+    for name in backends:
+        try:
+            backend = create_backend(name)
+        except Exception as e:  # e.g. no display for an interactive backend
+            backend_results[name] = {"error": f"{e.__class__.__name__}: {e}"}
+            continue
+        try:
+            backend_results[name] = benchmark_backend(backend)
+        finally:
+            backend.close()
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timing_engine": "batch" if _load_numpy() is not None else "scalar",
+        "time_scale": time_scale,
+        "coalesce_ms": coalesce_ms,
+        "corpora": {
+            name: benchmark_corpus(
+                BENCH_CORPORA[name], min_wpm, max_wpm, typo_min_words, typo_max_words, time_scale, coalesce_ms
+            )
+            for name in names
+        },
+        "backends": backend_results,
+    }
+
+
+# ---------- Simulation ----------
+BOUNDARY_SPACE, BOUNDARY_PUNCT, BOUNDARY_END = 0, 1, 2
+
+
+class SourceProfile:
+    """The word structure of a source: everything the planner's cost depends on.
+
+    How long a document takes depends on how many delay draws it needs and where the
+    corrections fall, which only depends on word lengths, what ends each word and
+    whether the layout can place a typo in it. A profile is built once (in one
+    streaming pass) and simulated many times. Feed chunks like KeystrokePlanner.feed(),
+    then finish(). With a PasteSplitter, pasted segments are counted instead of typed
+    and end the word in progress, as in the planner.
+    """
+
+    def __init__(self, layout=DEFAULT_LAYOUT, splitter=None):
+        self.layout = get_layout(layout)
+        self.splitter = splitter
+        self.chars = 0                 # Source characters (pasted ones and paste markers included)
+        self.pastes = 0                # Segments pasted in one go
+        self.pasted_chars = 0          # Source characters they stand for
+        self.draws = 0                 # Delay draws without typos (every char but word-ending boundaries)
+        self.lengths = array('I')      # Per word: length
+        self.ends = array('B')         # Per word: BOUNDARY_* that ends it
+        self.typoable = array('B')     # Per word: whether a neighbor-key typo can be placed
+        self._length = 0
+        self._typoable = False
+
+    def feed(self, text):
+        self.chars += len(text)
+        if self.splitter is None:
+            self._feed_text(text)
+        else:
+            self._feed_pieces(self.splitter.feed(text))
+        return self
+
+    def _feed_pieces(self, pieces):
+        for paste, text, advance in pieces:
+            if not paste:
+                self._feed_text(text)
+                continue
+            if self._length:
+                self._end_word(BOUNDARY_END)
+            self.pastes += 1
+            self.pasted_chars += advance
+
+    def _feed_text(self, text):
+        table = self.layout.table
+        for ch in text:
+            if _is_word_char(ch):
+                if not self._length:
+                    self._typoable = False
+                self._length += 1
+                self.draws += 1
+                if not self._typoable:
+                    self._typoable = ch in table or ch.lower() in table
+            elif self._length:
+                self._end_word(BOUNDARY_SPACE if ch.isspace() else BOUNDARY_PUNCT)
+            else:
+                self.draws += 1
+
+    def finish(self):
+        if self.splitter is not None:
+            self._feed_pieces(self.splitter.finish())
+        if self._length:
+            self._end_word(BOUNDARY_END)
+        return self
+
+    def _end_word(self, end):
+        self.lengths.append(self._length)
+        self.ends.append(end)
+        self.typoable.append(self._typoable)
+        self._length = 0
+
+    @classmethod
+    def from_chunks(cls, chunks, layout=DEFAULT_LAYOUT, splitter=None):
+        profile = cls(layout, splitter)
+        for chunk in chunks:
+            profile.feed(chunk)
+        return profile.finish()
+
+
+def _typo_words(next_typoable, gaps, count):
+    """Indices of the words that get a typo, as KeystrokePlanner schedules them.
+
+    A typo is planned once `gap` words have gone by since the last one and lands on the
+    first word from there that can take one. next_typoable[i] is the first typoable word
+    at or after i (count if none).
+    """
+    pos = np.cumsum(gaps + 1) - 1  # Where typos land if every word can take one
+    while True:
+        pos = pos[pos < count]
+        landed = next_typoable[pos]
+        moved = np.flatnonzero(landed != pos)
+        if not moved.size:
+            return pos
+        k = moved[0]
+        pos[k:] += landed[k] - pos[k]  # Everything after a skipped word shifts with it
+
+
+def _ramp_sum(c, a, k1, k2, lo, hi):
+    """Sum of the base delays 12000 / w (ms, see TimingModel.next_delay) over steps
+    k1..k2 of the clipped ramp w = clip(c + a*k, lo, hi), elementwise over arrays.
+
+    The unclipped part is summed with the Euler-Maclaurin formula, which is exact to
+    far below a millisecond for these smooth, slowly varying terms.
+    """
+    count = np.maximum(0, k2 - k1 + 1)
+    bound = np.where(a > 0, hi, lo)
+    last = np.where(a != 0, np.floor((bound - c) / a), np.inf)  # Last step before clipping
+    free = np.clip(np.minimum(k2, last) - k1 + 1, 0, count)
+    n = k1 + np.maximum(free, 1) - 1
+    w_m = c + a * k1
+    w_n = c + a * n
+    integral = np.where(a != 0, 12000.0 * np.log1p(a * (n - k1) / w_m) / a, 12000.0 * (n - k1) / w_m)
+    ends = 6000.0 / w_m + 6000.0 / w_n
+    slopes = 1000.0 * a * (1.0 / (w_m * w_m) - 1.0 / (w_n * w_n))
+    return np.where(free > 0, integral + ends + slopes, 0.0) + (count - free) * 12000.0 / bound
+
+
+def _simulate_walks(draws, min_wpm, max_wpm, rng, columns=256):
+    """Simulate the timing walk of len(draws) runs, each over draws[r] delay draws.
+
+    Steps speed segments, not keystrokes: segment lengths, bursts, accelerations,
+    targets and holds are drawn as in BatchTimingModel, only the speed at each segment
+    start is computed sequentially (for all runs at once), and each segment's base
+    delays are then summed in closed form. Returns per run the sum of base delays (ms),
+    an estimate of the sum of their squares and the number of non-burst keystrokes
+    (the ones that can get a thinking pause).
+
+    This reproduces the distribution of BatchTimingModel's walk, not its draws, so a
+    change to the timing model has to be mirrored here.
+    """
+    runs = draws.size
+    lo, hi = float(max(1, min_wpm)), float(max(1, min_wpm, max_wpm))
+    w = np.full(runs, (lo + hi) / 2)
+    pos = np.zeros(runs, dtype=np.int64)
+    base = np.zeros(runs)
+    squares = np.zeros(runs)
+    calm = np.zeros(runs, dtype=np.int64)
+    first = True
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        while (pos < draws).any():
+            size = (columns, runs)  # Segment-major, so each sequential step reads contiguous rows
+            burst = rng.random(size) < 0.3
+            accel = np.where(burst, 5.0, rng.uniform(-2.0, 2.0, size))
+            target = np.where(burst, hi, rng.uniform(lo, hi, size))
+            holds = rng.geometric(0.2, size)
+            lengths = rng.geometric(0.15, size)
+            if first:
+                # The first segment carries the initial state: at rest on the middle speed
+                burst[0], accel[0], target[0] = False, 0.0, (lo + hi) / 2
+                lengths[0] -= 1
+                first = False
+            ends = pos + np.cumsum(lengths, axis=0)
+            lengths = np.clip(draws - (ends - lengths), 0, lengths)
+            pos = np.minimum(ends[-1], draws)
+
+            # Sequential part: the speed each segment starts at
+            w0 = np.empty(size)
+            k_hit = np.empty(size)
+            for s in range(columns):
+                w0[s] = w
+                a, t, length = accel[s], target[s], lengths[s]
+                close = np.abs(w - t) < 0.1
+                k1 = (t - 0.1 - w) / a
+                k2 = (t + 0.1 - w) / a
+                kh = np.where(close, 0, np.maximum(1, np.floor(np.minimum(k1, k2)) + 1))
+                hits = ~burst[s] & (close | (kh < np.maximum(k1, k2))) & (kh < length)
+                kh = np.where(hits, kh, length)  # No hit: the ramp runs the whole segment
+                k_hit[s] = kh
+                w = np.clip(w + a * (kh + np.maximum(0, length - kh - holds[s])), lo, hi)
+
+            # Vectorized part: ramp to the target, hold there, ramp on
+            held = np.minimum(holds, lengths - k_hit)
+            delays = _ramp_sum(w0, accel, 1, k_hit, lo, hi)
+            delays += held * 12000.0 / np.clip(w0 + accel * k_hit, lo, hi)
+            on = np.flatnonzero(lengths > k_hit + held)
+            if on.size:
+                w_on, a_on, h_on = w0.flat[on], accel.flat[on], held.flat[on]
+                delays.flat[on] += _ramp_sum(w_on - a_on * h_on, a_on, k_hit.flat[on] + h_on + 1, lengths.flat[on], lo, hi)
+            base += delays.sum(axis=0)
+            squares += (delays * delays / np.maximum(lengths, 1)).sum(axis=0)
+            rising = np.clip(np.ceil((hi - w0) / accel) - 1, 0, lengths)  # Burst steps below max speed
+            calm += (lengths - np.where(burst, rising, 0)).sum(axis=0).astype(np.int64)
+    return base, squares, calm
+
+
+def simulate_durations(profile, min_wpm=60, max_wpm=80, typo_min_words=5, typo_max_words=12, runs=1000, seed=None):
+    """Monte Carlo the time it takes to type a profiled source, without typing.
+
+    Each run draws the typo schedule, the natural pauses and the timing walk (see
+    _simulate_walks) and costs corrections like the planner: backspaces at
+    max(25, delay / 2), the retyped word, and the 50-200 ms notice delay when a typo is
+    spotted after a space. Pasted segments cost 150-400 ms each. Returns summaries
+    (mean, p50, p95, ...) of the duration and the per-run counters.
+
+    This is a model of KeystrokePlanner, not a run of it, and it approximates in a few
+    places. The ±10% micro variation and the 5% thinking pauses are drawn in aggregate
+    per run. Backspaces and retyped keys are costed at the run's mean keystroke delay.
+    A word cut short by a pasted segment counts toward the typo schedule like any other,
+    and digraph profiles are not modelled. The simulation tests hold the result within
+    about 1.5% of real plans for the median and mean.
+    """
+    if _load_numpy() is None:
+        raise RuntimeError("simulation requires numpy")
+    typo_min_words = max(1, typo_min_words)
+    typo_max_words = max(typo_min_words, typo_max_words)
+    rng = np.random.default_rng(seed)
+
+    lengths = np.frombuffer(profile.lengths, dtype=np.uint32).astype(np.int64)
+    ends = np.frombuffer(profile.ends, dtype=np.uint8)
+    count = lengths.size
+    typoable = np.append(np.flatnonzero(np.frombuffer(profile.typoable, dtype=np.uint8)), count)
+    next_typoable = typoable[np.searchsorted(typoable, np.arange(count + 1))]
+    boundaries = int(np.count_nonzero(ends != BOUNDARY_END))  # Word boundaries count toward pauses
+
+    # Typo and pause schedules, run by run
+    erased = np.empty(runs, dtype=np.int64)     # Backspaces
+    retyped = np.empty(runs, dtype=np.int64)    # Correctly retyped characters
+    spotted = np.empty(runs, dtype=np.int64)    # Typos noticed after a space
+    pauses = np.empty(runs, dtype=np.int64)
+    for r in range(runs):
+        gaps = rng.integers(typo_min_words, typo_max_words + 1, count // (typo_min_words + 1) + 2)
+        typos = _typo_words(next_typoable, gaps, count)
+        spotted[r] = np.count_nonzero(ends[typos] == BOUNDARY_SPACE)
+        retyped[r] = lengths[typos].sum()
+        erased[r] = retyped[r] + spotted[r]
+        pauses[r] = np.searchsorted(np.cumsum(rng.integers(1, 9, boundaries + 1)), boundaries, side="right")
+    draws = profile.draws + erased + retyped
+
+    # Keystroke delays: timing walk plus per-keystroke variation and thinking pauses
+    base, squares, calm = _simulate_walks(draws, min_wpm, max_wpm, rng)
+    thinking = rng.binomial(calm, 0.05)
+    thinking_ms = np.bincount(
+        np.repeat(np.arange(runs), thinking), weights=rng.uniform(100, 300, int(thinking.sum())), minlength=runs
+    )
+    variation_ms = rng.normal(0.0, np.sqrt(squares * (0.2 ** 2 / 12)))
+    keys_ms = base + variation_ms + thinking_ms
+    mean_delay = keys_ms / np.maximum(draws, 1)
+    backspace_ms = erased * np.maximum(25.0, mean_delay * 0.5)
+    correction_ms = backspace_ms + retyped * mean_delay
+
+    notice_ms = np.array([rng.uniform(50, 200, n).sum() for n in spotted])
+    pause_ms = np.array([rng.uniform(500, 3000, n).sum() for n in pauses])
+    paste_ms = rng.uniform(150, 400, (runs, profile.pastes)).sum(axis=1)
+    durations = (keys_ms - erased * mean_delay + backspace_ms + notice_ms + pause_ms + paste_ms) / 1000.0
+
+    return {
+        "runs": runs,
+        "chars": profile.chars,
+        "words": count,
+        "settings": {
+            "min_wpm": min_wpm,
+            "max_wpm": max_wpm,
+            "typo_min_words": typo_min_words,
+            "typo_max_words": typo_max_words,
+            "layout": profile.layout.name,
+        },
+        "duration_s": _distribution(durations.tolist()),
+        "wpm": _distribution((profile.chars / 5 / (durations / 60)).tolist()),
+        "keystrokes": _distribution((profile.chars - profile.pasted_chars + erased + retyped + spotted).tolist()),
+        "pastes": profile.pastes,
+        "backspaces": _distribution(erased.tolist()),
+        "natural_pauses": _distribution(pauses.tolist()),
+        "natural_pause_s": _distribution((pause_ms / 1000).tolist()),
+        "correction_s": _distribution((correction_ms / 1000).tolist()),
+    }
+
+
+UI_REFRESH_MS = 66  # GUI frame interval (~15 Hz), independent of typing speed
+COUNTDOWN_S = 3
+ESTIMATE_RUNS = 500  # Simulated sessions behind the GUI's estimate
 
 
 class AutoScribe:
     def __init__(self):
+        _load_gui()
+
         # Initialize the main window
         self.root = tk.Tk()
         self.root.title("AutoScribe")
-        self.root.geometry("400x600")
+        self.root.geometry("400x660")
 
         # State variables
-        self.typing = False
-        self.paused = False
         self.text_to_type = ""
-        self.current_index = 0
+        self.source_path = None     # When set, stream the document from this file instead
         self.min_wpm = tk.IntVar(value=60)
         self.max_wpm = tk.IntVar(value=80)
 
-        # Typing pattern variables
-        self.current_wpm = 60
-        self.target_wpm = 60            # Target speed to gradually move towards
-        self.speed_change_chance = 0.15 # 15% chance to change speed per character
-        self.acceleration = 0           # Current speed change direction and magnitude
-        self.words_typed_since_last_pause = 0
-        self.next_pause_after_words = random.randint(3, 8)
-        self.burst_mode = False         # For sudden speed bursts
-
         # Human-like typo schedule: every N words (random between min/max) — customizable
         self.typo_min_words = tk.IntVar(value=5)
         self.typo_max_words = tk.IntVar(value=12)
-        self.words_since_last_typo = 0
-        self.next_typo_after_words = random.randint(self.typo_min_words.get(), self.typo_max_words.get())
+
+        # UI update channel: other threads only publish state, refresh_ui() renders it
+        self.start_requested = False  # Set by the start hotkey, acted on by the Tk thread
+        self.countdown_until = 0.0    # perf_counter() deadline of the start countdown
+        self.shown = {}               # Last options rendered per widget
+        self.estimating = False       # An estimate is running on its own thread
+        self.estimate_text = ""       # Its result, published for refresh_ui()
 
         # Load settings and setup UI
         self.load_settings()
+        self.engine = TypingEngine(backend_name=self.backend_name)
         self.setup_ui()
         self.setup_hotkeys()
-
-    def set_status(self, text):
-        """Thread-safe status label update."""
-        self.root.after(0, lambda: self.status_label.config(text=text))
+        self.refresh_ui()
 
     # ---------- Settings ----------
     def load_settings(self):
@@ -60,10 +3654,20 @@ class AutoScribe:
                 self.start_key = config.get("start_hotkey", "F6")
                 self.stop_key = config.get("stop_hotkey", "F7")
                 self.pause_key = config.get("pause_hotkey", "F8")
+                self.backend_name = config.get("backend", "auto")
+                self.layout_name = config.get("keyboard_layout", DEFAULT_LAYOUT)
+                self.coalesce_ms = float(config.get("coalesce_ms", 0.0))
+                self.profile_path = config.get("timing_profile")
+                self.paste_settings = config.get("paste", {})
         except:
             self.start_key = "F6"
             self.stop_key = "F7"
             self.pause_key = "F8"
+            self.backend_name = "auto"
+            self.layout_name = DEFAULT_LAYOUT
+            self.coalesce_ms = 0.0
+            self.profile_path = None
+            self.paste_settings = {}
             self.save_settings()
 
     def save_settings(self):
@@ -71,7 +3675,12 @@ class AutoScribe:
         config = {
             "start_hotkey": self.start_key,
             "stop_hotkey": self.stop_key,
-            "pause_hotkey": self.pause_key
+            "pause_hotkey": self.pause_key,
+            "backend": self.backend_name,
+            "keyboard_layout": self.layout_name,
+            "coalesce_ms": self.coalesce_ms,
+            "timing_profile": self.profile_path,
+            "paste": self.paste_settings
         }
         try:
             with open("config.json", "w") as f:
@@ -89,11 +3698,31 @@ class AutoScribe:
         self.status_label = ttk.Label(main_frame, text="Status: Ready")
         self.status_label.pack(fill=tk.X, pady=(0, 10))
 
+        # Live progress panel (polled from the engine's metrics while typing)
+        progress_frame = ttk.LabelFrame(main_frame, text="Progress", padding="5")
+        progress_frame.pack(fill=tk.X, pady=(0, 5))
+        self.progress_bar = ttk.Progressbar(progress_frame, mode="determinate", maximum=1000)
+        self.progress_bar.pack(fill=tk.X, pady=(0, 3))
+        self.progress_label = ttk.Label(progress_frame, text="Not started")
+        self.progress_label.pack(anchor=tk.W)
+        self.timing_label = ttk.Label(progress_frame, text="")
+        self.timing_label.pack(anchor=tk.W)
+        self.estimate_label = ttk.Label(progress_frame, text="")
+        self.estimate_label.pack(anchor=tk.W)
+
         # Text input area
         ttk.Label(main_frame, text="Enter text to type:").pack(anchor=tk.W)
         self.text_area = tk.Text(main_frame, height=10, width=40, wrap="word")
         self.text_area.pack(fill=tk.BOTH, expand=True, pady=5)
 
+        # Large documents: stream from a file instead of pasting into the text box
+        source_row = ttk.Frame(main_frame)
+        source_row.pack(fill=tk.X)
+        ttk.Button(source_row, text="Stream from file...", command=self.choose_source_file).pack(side=tk.LEFT)
+        ttk.Button(source_row, text="Use text box", command=self.clear_source_file).pack(side=tk.LEFT, padx=5)
+        self.source_label = ttk.Label(source_row, text="")
+        self.source_label.pack(side=tk.LEFT, fill=tk.X)
+
         # Speed control frame
         speed_frame = ttk.LabelFrame(main_frame, text="Typing Speed Range", padding="5")
         speed_frame.pack(fill=tk.X, pady=5)
@@ -144,6 +3773,16 @@ class AutoScribe:
         ttk.Entry(typo_row, textvariable=self.typo_max_words, width=5, justify="center").pack(side=tk.LEFT, padx=5)
         ttk.Label(typo_row, text="words (random)").pack(side=tk.LEFT, padx=(5, 0))
 
+        layout_row = ttk.Frame(typo_frame)
+        layout_row.pack(fill=tk.X, padx=5, pady=(0, 5))
+        ttk.Label(layout_row, text="Keyboard layout:").pack(side=tk.LEFT)
+        self.layout_var = tk.StringVar(value=self.layout_name)
+        layout_box = ttk.Combobox(
+            layout_row, textvariable=self.layout_var, values=available_layouts(), width=10, state="readonly"
+        )
+        layout_box.pack(side=tk.LEFT, padx=5)
+        layout_box.bind("<<ComboboxSelected>>", self.on_layout_selected)
+
         # Validate typo frequency inputs
         def validate_typo(*args):
             try:
@@ -189,6 +3828,9 @@ class AutoScribe:
         )
         self.stop_button.pack(side=tk.LEFT, padx=5)
 
+        self.estimate_button = ttk.Button(button_frame, text="Estimate", command=self.estimate_duration)
+        self.estimate_button.pack(side=tk.LEFT, padx=5)
+
         # Instructions
         instructions = (
             "\nInstructions:\n"
@@ -201,309 +3843,780 @@ class AutoScribe:
         )
         ttk.Label(main_frame, text=instructions, justify=tk.LEFT).pack(pady=10)
 
+    def on_layout_selected(self, event=None):
+        self.layout_name = self.layout_var.get()
+        self.save_settings()
+
     # ---------- Hotkeys ----------
     def setup_hotkeys(self):
-        keyboard.add_hotkey(self.start_key, self.start_typing)
+        import keyboard
+
+        # Hotkeys fire on the keyboard thread: they only flip engine state or set a
+        # flag, and refresh_ui() brings the widgets in line on the Tk thread
+        keyboard.add_hotkey(self.start_key, self.request_start)
         keyboard.add_hotkey(self.stop_key, self.stop_typing)
         keyboard.add_hotkey(self.pause_key, self.toggle_pause)
 
-    # ---------- Timing ----------
-    def calculate_delay(self):
-        """Calculate delay between keystrokes with dynamic speed changes (returns milliseconds)"""
-        min_wpm = max(1, self.min_wpm.get())
-        max_wpm = max(min_wpm, self.max_wpm.get())
+    def request_start(self):
+        self.start_requested = True
 
-        # Chance to change typing behavior
-        if random.random() < self.speed_change_chance:
-            # Decide whether to start a burst or change target speed
-            if random.random() < 0.3:  # 30% chance for burst
-                self.burst_mode = True
-                self.target_wpm = max_wpm
-                self.acceleration = 5.0  # Rapid acceleration
-            else:
-                self.burst_mode = False
-                self.target_wpm = random.uniform(min_wpm, max_wpm)
-                self.acceleration = random.uniform(-2.0, 2.0)
+    # ---------- Control flow ----------
+    def start_typing(self):
+        """Start the typing process"""
+        if self.engine.typing:
+            return
 
-        # Update current speed based on acceleration and target
-        if self.burst_mode:
-            # Rapid approach to target during burst
-            self.current_wpm = min(self.current_wpm + self.acceleration, self.target_wpm)
-            if self.current_wpm >= self.target_wpm:
-                self.burst_mode = False
-                self.target_wpm = min_wpm  # Return to slower speed after burst
+        if self.source_path:
+            self.text_to_type = ""
+            chunks = source_chunks(path=self.source_path)
+            total_chars = source_length(path=self.source_path)
+            fingerprint = source_fingerprint(path=self.source_path)
         else:
-            # Gradual approach to target speed
-            if abs(self.current_wpm - self.target_wpm) < 0.1:
-                if random.random() < 0.2:  # 20% chance to change target
-                    self.target_wpm = random.uniform(min_wpm, max_wpm)
+            self.text_to_type = self.text_area.get("1.0", tk.END).strip()
+            if not self.text_to_type:
+                messagebox.showwarning("Warning", "Please enter text to type")
+                return
+            chunks = source_chunks(self.text_to_type)
+            total_chars = len(self.text_to_type)
+            fingerprint = source_fingerprint(self.text_to_type)
+
+        # Normalize typo schedule UI values
+        mn = max(1, self.typo_min_words.get())
+        mx = max(mn, self.typo_max_words.get())
+        self.typo_min_words.set(mn)
+        self.typo_max_words.set(mx)
+
+        # Snapshot settings so the typing thread never reads Tk variables
+        engine = self.engine
+        engine.min_wpm = self.min_wpm.get()
+        engine.max_wpm = self.max_wpm.get()
+        engine.typo_min_words = mn
+        engine.typo_max_words = mx
+        engine.layout = self.layout_name
+        engine.coalesce_ms = self.coalesce_ms
+        engine.profile = self.profile_path
+        engine.paste_markup = bool(self.paste_settings.get("markup"))
+        engine.paste_min_lines = int(self.paste_settings.get("min_lines", 0))
+        engine.paste_non_ascii = bool(self.paste_settings.get("non_ascii"))
+
+        # Offer to pick up an interrupted session of the same source where it stopped
+        header, point = SessionJournal.load(JOURNAL_FILE)
+        resume = (
+            point is not None
+            and point["index"] > 0
+            and header.get("source") == fingerprint
+            and messagebox.askyesno(
+                "Resume", f"This text was interrupted after {point['index']:,} characters. Resume from there?"
+            )
+        )
+        journal, resume, settings = open_journal(JOURNAL_FILE, fingerprint, engine.get_settings(), resume)
+        engine.apply_settings(settings)
+        engine.prepare(total_chars)
+
+        # Start typing in a separate thread; refresh_ui() shows the countdown and progress
+        self.countdown_until = time.perf_counter() + COUNTDOWN_S
+        threading.Thread(target=self.type_text, args=(chunks, journal, resume), daemon=True).start()
+
+    def type_text(self, chunks, journal=None, resume=None):
+        """Run the engine on the typing thread (it publishes its own final status)."""
+        try:
+            self.engine.run(chunks, countdown=COUNTDOWN_S, journal=journal, resume=resume)
+        except Exception as e:  # e.g. the mouse-corner failsafe; progress is in the journal
+            self.engine.set_status(f"Status: Stopped ({e.__class__.__name__})")
+
+    def estimate_duration(self):
+        """Simulate the current source and settings on a worker thread (see simulate_durations)."""
+        if self.estimating:
+            return
+        if self.source_path:
+            chunks = source_chunks(path=self.source_path)
+        else:
+            text = self.text_area.get("1.0", tk.END).strip()
+            if not text:
+                messagebox.showwarning("Warning", "Please enter text to type")
+                return
+            chunks = source_chunks(text)
+        try:
+            mn = max(1, self.typo_min_words.get())
+            settings = (self.min_wpm.get(), self.max_wpm.get(), mn, max(mn, self.typo_max_words.get()))
+        except (tk.TclError, ValueError):  # A speed or typo field that isn't a number
+            messagebox.showwarning("Warning", "Please enter whole numbers for speed and typo frequency")
+            return
+        splitter = make_splitter(
+            bool(self.paste_settings.get("markup")),
+            int(self.paste_settings.get("min_lines", 0)),
+            bool(self.paste_settings.get("non_ascii")),
+        )
+        self.estimating = True
+        self.estimate_text = "Estimating..."
+        threading.Thread(
+            target=self.run_estimate, args=(chunks, self.layout_name, settings, splitter), daemon=True
+        ).start()
+
+    def run_estimate(self, chunks, layout, settings, splitter=None):
+        try:
+            profile = SourceProfile.from_chunks(chunks, layout, splitter)
+            result = simulate_durations(profile, *settings, runs=ESTIMATE_RUNS)
+            p50, p95 = result["duration_s"]["p50"], result["duration_s"]["p95"]
+            self.estimate_text = (
+                f"Estimated {int(p50 // 60)}:{int(p50 % 60):02d} (p95 {int(p95 // 60)}:{int(p95 % 60):02d})"
+            )
+        except (RuntimeError, OSError) as e:
+            self.estimate_text = f"Estimate unavailable: {e}"
+        finally:
+            self.estimating = False
+
+    def show(self, widget, **options):
+        """Reconfigure a widget only if its options changed since the last frame."""
+        if self.shown.get(widget) != options:
+            self.shown[widget] = options
+            widget.config(**options)
+
+    def refresh_ui(self):
+        """Render the engine state every UI_REFRESH_MS, on the Tk thread.
+
+        The typing and hotkey threads never touch widgets: they publish state (status
+        text, counters, control flags) on the engine, and each frame reads one snapshot
+        of it and updates only what changed, so UI cost doesn't grow with typing speed.
+        """
+        self.root.after(UI_REFRESH_MS, self.refresh_ui)
+        if self.start_requested:
+            self.start_requested = False
+            self.start_typing()
+
+        engine = self.engine
+        typing, paused = engine.typing, engine.paused
+        countdown = self.countdown_until - time.perf_counter()
+        if typing and countdown > 0:
+            status = f"Starting in {math.ceil(countdown)}..."
+        elif typing and paused:
+            status = "Status: Paused"
+        else:
+            status = engine.status
+        self.show(self.status_label, text=status)
+        self.show(self.start_button, state=tk.DISABLED if typing else tk.NORMAL)
+        self.show(self.pause_button, state=tk.NORMAL if typing else tk.DISABLED,
+                  text=f"Resume ({self.pause_key})" if paused else f"Pause ({self.pause_key})")
+        self.show(self.stop_button, state=tk.NORMAL if typing else tk.DISABLED)
+        self.show(self.estimate_button, state=tk.DISABLED if self.estimating else tk.NORMAL)
+        self.show(self.estimate_label, text=self.estimate_text)
+
+        if engine.metrics.started is not None:
+            snap = engine.metrics.snapshot(engine.current_index)
+            total = snap["total_chars"]
+            if total:
+                done = f"{snap['chars']:,} / {total:,} chars ({snap['progress']:.0%})"
             else:
-                self.current_wpm += self.acceleration
-                self.current_wpm = max(min_wpm, min(self.current_wpm, max_wpm))
+                done = f"{snap['chars']:,} chars"
+            eta = snap["eta_s"]
+            eta_text = f"ETA {int(eta // 60)}:{int(eta % 60):02d}" if eta is not None else "ETA --:--"
+            self.show(self.progress_bar, value=round(min(1.0, snap["progress"] or 0.0) * 1000))
+            self.show(self.progress_label, text=f"{done} · {snap['current_wpm']:.0f} WPM · {eta_text}")
+            self.show(self.timing_label, text=(
+                f"Natural pauses {snap['natural_pause_s']:.1f} s · Corrections {snap['correction_s']:.1f} s"
+            ))
 
-        # Convert current WPM to milliseconds per character
-        chars_per_minute = max(5, self.current_wpm * 5)
-        base_delay = 60000 / chars_per_minute
+    def choose_source_file(self):
+        """Pick a text file to stream instead of the text box contents."""
+        path = filedialog.askopenfilename(
+            title="Stream text from file",
+            filetypes=[("Text files", "*.txt *.md"), ("All files", "*.*")],
+        )
+        if path:
+            self.source_path = path
+            self.source_label.config(text=os.path.basename(path))
 
-        # Add micro variations (±10%)
-        variation = base_delay * 0.1
-        actual_delay = base_delay + random.uniform(-variation, variation)
+    def clear_source_file(self):
+        self.source_path = None
+        self.source_label.config(text="")
 
-        # Occasionally add "thinking" pauses mid-word (5% chance)
-        if not self.burst_mode and random.random() < 0.05:
-            actual_delay += random.uniform(100, 300)  # Add 0.1–0.3 second pause
+    def toggle_pause(self):
+        """Toggle pause state (safe from any thread; the UI follows on its next frame)"""
+        if self.engine.typing:
+            self.engine.toggle_pause()
 
-        return actual_delay
+    def stop_typing(self):
+        """Stop the typing process (safe from any thread; the UI follows on its next frame)"""
+        self.engine.stop()
+
+    def run(self):
+        """Start the application"""
+        self.root.mainloop()
+
+
+
+# ---------- Command line ----------
+DAEMON_PORT = 47653
+DAEMON_TOKEN_FILE = os.path.join(os.path.expanduser("~"), ".autoscribe-daemon-token")
+
+
+class TypingDaemon:
+    """Long-lived job server: the engine and its backend are initialized once and
+    reused for every job.
+
+    Speaks JSON lines over a local TCP socket. A job ({"text": ...} or {"file": ...}
+    plus any of the optional JOB_FIELDS) runs after any job already in progress and is
+    answered when it finishes; every job starts from the daemon's own settings, so
+    nothing carries over from the previous one, and a null field means the default. Commands
+    ({"command": "pause" | "resume" | "stop" | "status"}) are answered immediately,
+    even while a job is typing.
+
+    Any local process (or web page) can reach a TCP port, so every request must carry
+    the "token" the daemon writes to token_file (readable by its user only), and a
+    connection is dropped on the first line that isn't an authorized JSON request.
+    File jobs and digraph profiles are limited to files inside allowed_dirs (none by
+    default).
+
+    serve_forever() uses a thread per connection and types on it; serve_async() serves
+    the same protocol from one event loop, with jobs typed by the asyncio engine.
+    """
+
+    # Fields a job may set, with their JSON types
+    JOB_FIELDS = {
+        "text": str, "file": str, "countdown": float, "phase_sample": int,
+        "min_wpm": int, "max_wpm": int, "typo_min_words": int, "typo_max_words": int, "layout": str,
+        "seed": int, "coalesce_ms": float, "profile": str,
+        "paste_markup": bool, "paste_min_lines": int, "paste_non_ascii": bool,
+    }
+
+    def __init__(self, engine, host="127.0.0.1", port=DAEMON_PORT, token_file=DAEMON_TOKEN_FILE, allowed_dirs=()):
+        self.engine = engine
+        self.defaults = engine.get_settings()  # What every job starts from
+        self.host = host
+        self.port = port
+        self.token_file = token_file
+        self.allowed_dirs = [os.path.realpath(path) for path in allowed_dirs]
+        self.token = None
+        self.job_lock = threading.Lock()
 
-    # ---------- Human-like typo helpers ----------
-    def _keyboard_neighbors(self):
-        # QWERTY adjacency (lowercase; case restored later)
+    def write_token(self):
+        """Create a fresh token and store it in token_file, readable by this user only."""
+        import secrets
+
+        self.token = secrets.token_hex(16)
+        tmp = f"{self.token_file}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(self.token)
+        os.replace(tmp, self.token_file)
+        return self.token
+
+    def decode(self, line):
+        """The request on a line, or None if it isn't an authorized JSON request."""
+        import hmac
+
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(request, dict) or self.token is None:
+            return None
+        token = request.pop("token", None)
+        if not isinstance(token, str) or not hmac.compare_digest(token, self.token):
+            return None
+        return request
+
+    def allowed_file(self, path):
+        """The real path of a file the daemon is asked to read (a job's source or
+        profile); ValueError outside allowed_dirs."""
+        real = os.path.realpath(path)
+        for allowed in self.allowed_dirs:
+            if os.path.commonpath([real, allowed]) == allowed:
+                return real
+        raise ValueError(f"the daemon only reads files inside --allow-dir directories: {path}")
+
+    def check_job(self, request):
+        """The job's fields, with nulls dropped; ValueError for a missing source or a
+        field of the wrong type."""
+        job = {}
+        for name, kind in self.JOB_FIELDS.items():
+            value = request.get(name)
+            if value is None:
+                continue
+            if kind is float and isinstance(value, int) and not isinstance(value, bool):
+                value = float(value)
+            if not isinstance(value, kind) or (kind is not bool and isinstance(value, bool)):
+                raise ValueError(f"'{name}' must be of type {kind.__name__}")
+            job[name] = value
+        if "text" not in job and "file" not in job:
+            raise ValueError("job needs 'text' or 'file'")
+        return job
+
+    def handle(self, request):
+        """Handle one decoded request and return the response object."""
+        response = self.handle_command(request)
+        if response is not None:
+            return response
+        with self.job_lock:
+            try:
+                job = self.check_job(request)
+                chunks = self.start_job(job)
+                completed = self.engine.run(chunks, countdown=job.get("countdown", 0.0))
+            except Exception as e:
+                self.engine.stop()
+                return {"ok": False, "error": str(e) or type(e).__name__}
+        return self.job_response(completed)
+
+    async def handle_async(self, request, job_lock):
+        """Coroutine version of handle(); job_lock is an asyncio.Lock."""
+        response = self.handle_command(request)
+        if response is not None:
+            return response
+        async with job_lock:
+            try:
+                job = self.check_job(request)
+                chunks = self.start_job(job)
+                completed = await self.engine.run_async(chunks, countdown=job.get("countdown", 0.0))
+            except Exception as e:
+                self.engine.stop()
+                return {"ok": False, "error": str(e) or type(e).__name__}
+        return self.job_response(completed)
+
+    def handle_command(self, request):
+        """Answer a control command; None for a job to run."""
+        engine = self.engine
+        command = request.get("command")
+        if command == "pause":
+            engine.pause()
+        elif command == "resume":
+            engine.resume()
+        elif command == "stop":
+            engine.stop()
+        elif command not in (None, "status"):
+            return {"ok": False, "error": f"unknown command: {command}"}
+        if command is not None:
+            return {
+                "ok": True,
+                "typing": engine.typing,
+                "paused": engine.paused,
+                "current_index": engine.current_index,
+                "metrics": engine.metrics_snapshot(),
+            }
+        return None
+
+    def start_job(self, job):
+        """Apply a checked job's settings over the defaults and prepare the engine;
+        returns its source chunks. Call with the job lock held."""
+        engine = self.engine
+        settings = dict(self.defaults)
+        settings.update((name, job[name]) for name in engine.SETTINGS if name in job)
+        if "profile" in job:
+            settings["profile"] = self.allowed_file(job["profile"])
+        engine.apply_settings(settings)
+        engine.phase_sample = job.get("phase_sample", 0)
+        text = job.get("text")
+        path = self.allowed_file(job["file"]) if text is None else None
+        engine.prepare(source_length(text, path))
+        return source_chunks(text, path)
+
+    def job_response(self, completed):
         return {
-            'q': ['w', 'a'],
-            'w': ['q', 'e', 'a', 's'],
-            'e': ['w', 'r', 's', 'd'],
-            'r': ['e', 't', 'd', 'f'],
-            't': ['r', 'y', 'f', 'g'],
-            'y': ['t', 'u', 'g', 'h'],
-            'u': ['y', 'i', 'h', 'j'],
-            'i': ['u', 'o', 'j', 'k'],
-            'o': ['i', 'p', 'k', 'l'],
-            'p': ['o', 'l'],
-            'a': ['q', 'w', 's', 'z'],
-            's': ['w', 'e', 'a', 'd', 'z', 'x'],
-            'd': ['e', 'r', 's', 'f', 'x', 'c'],
-            'f': ['r', 't', 'd', 'g', 'c', 'v'],
-            'g': ['t', 'y', 'f', 'h', 'v', 'b'],
-            'h': ['y', 'u', 'g', 'j', 'b', 'n'],
-            'j': ['u', 'i', 'h', 'k', 'n', 'm'],
-            'k': ['i', 'o', 'j', 'l', 'm'],
-            'l': ['o', 'p', 'k'],
-            'z': ['a', 's', 'x'],
-            'x': ['s', 'd', 'z', 'c'],
-            'c': ['d', 'f', 'x', 'v'],
-            'v': ['f', 'g', 'c', 'b'],
-            'b': ['g', 'h', 'v', 'n'],
-            'n': ['h', 'j', 'b', 'm'],
-            'm': ['j', 'k', 'n'],
-            '1': ['2'], '2': ['1', '3'], '3': ['2', '4'], '4': ['3', '5'],
-            '5': ['4', '6'], '6': ['5', '7'], '7': ['6', '8'], '8': ['7', '9'],
-            '9': ['8', '0'], '0': ['9']
+            "ok": True,
+            "completed": completed,
+            "report": self.engine.last_report,
+            "metrics": self.engine.metrics_snapshot(),
         }
 
-    def _neighbor_for_char(self, ch):
-        """Return a nearby key for ch (preserving case) or None"""
-        neighbors = self._keyboard_neighbors()
-        is_upper = ch.isalpha() and ch.isupper()
-        base = ch.lower()
-        if base in neighbors and neighbors[base]:
-            cand = random.choice(neighbors[base])
-            return cand.upper() if is_upper else cand
-        return None
+    def serve_forever(self):
+        import socketserver
 
-    def _press_backspaces(self, count):
-        """Backspace with varied delays; respects pause state"""
-        for _ in range(count):
-            while self.paused and self.typing:
-                time.sleep(0.05)
-            pyautogui.press('backspace')
-            delay_ms = max(25, self.calculate_delay() * 0.5)
-            time.sleep(delay_ms / 1000.0)
+        daemon = self
 
-    # ---------- Control flow ----------
-    def start_typing(self):
-        """Start the typing process"""
-        if self.typing:
-            return
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    request = daemon.decode(line)
+                    if request is None:
+                        break  # Not one of our clients (e.g. an HTTP request from a browser)
+                    response = daemon.handle(request)
+                    self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
 
-        self.text_to_type = self.text_area.get("1.0", tk.END).strip()
-        if not self.text_to_type:
-            messagebox.showwarning("Warning", "Please enter text to type")
-            return
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        with socketserver.ThreadingTCPServer((self.host, self.port), Handler) as server:
+            server.daemon_threads = True
+            server.serve_forever()
 
-        self.typing = True
-        self.paused = False
-        self.current_index = 0
+    async def serve_async(self):
+        """Serve on the running event loop until cancelled."""
+        import asyncio
 
-        # Reset typing pattern variables
-        self.current_wpm = (self.min_wpm.get() + self.max_wpm.get()) / 2  # Start at middle speed
-        self.words_typed_since_last_pause = 0
-        self.next_pause_after_words = random.randint(1, 8)
+        job_lock = asyncio.Lock()
 
-        # Reset typo schedule based on current UI values
-        self.words_since_last_typo = 0
-        mn = max(1, self.typo_min_words.get())
-        mx = max(mn, self.typo_max_words.get())
-        self.typo_min_words.set(mn)
-        self.typo_max_words.set(mx)
-        self.next_typo_after_words = random.randint(mn, mx)
+        async def handle_connection(reader, writer):
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    if not line.strip():
+                        continue
+                    request = self.decode(line)
+                    if request is None:
+                        break  # Not one of our clients (e.g. an HTTP request from a browser)
+                    response = await self.handle_async(request, job_lock)
+                    writer.write((json.dumps(response) + "\n").encode("utf-8"))
+                    await writer.drain()
+            finally:
+                writer.close()
 
-        # Update UI
-        self.start_button.config(state=tk.DISABLED)
-        self.pause_button.config(state=tk.NORMAL)
-        self.stop_button.config(state=tk.NORMAL)
-        self.status_label.config(text="Status: Starting...")
+        server = await asyncio.start_server(handle_connection, self.host, self.port, reuse_address=True)
+        async with server:
+            await server.serve_forever()
 
-        # Start typing in a separate thread
-        threading.Thread(target=self.type_text, daemon=True).start()
 
-        # Start countdown
-        self.countdown(3)
+def send_to_daemon(request, host="127.0.0.1", port=DAEMON_PORT, token_file=DAEMON_TOKEN_FILE):
+    """Send one request to a running daemon (with the token it wrote to token_file)
+    and return its response."""
+    import socket
 
-    def countdown(self, seconds):
-        """Countdown before starting to type"""
-        if seconds > 0:
-            self.status_label.config(text=f"Starting in {seconds}...")
-            self.root.after(1000, lambda: self.countdown(seconds - 1))
-        else:
-            self.status_label.config(text="Status: Typing...")
+    with open(token_file, "r") as f:
+        request = dict(request, token=f.read().strip())
+    with socket.create_connection((host, port)) as sock:
+        sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        with sock.makefile("r", encoding="utf-8") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("the daemon closed the connection (token rejected?)")
+    return json.loads(line)
 
-    def type_text(self):
-        """Type text with random delays and scheduled 'mistype then correct' behavior."""
-        time.sleep(3)  # Initial delay for countdown
 
-        # Track current word and typo plan
-        current_word_correct = []  # Intended correct characters for the current word
-        typed_word_len = 0         # How many chars actually typed for this word (including the typo)
-        typo_planned = False       # Whether this word should get a typo
-        typo_introduced = False    # Whether we've already injected the typo in this word
+def build_arg_parser():
+    parser = argparse.ArgumentParser(prog="autoscribe", description="Human-like automated typing.")
+    sub = parser.add_subparsers(dest="command")
 
-        def is_word_char(c):
-            return c.isalnum() or c in "'-"
+    sub.add_parser("gui", help="start the desktop app (default)")
 
-        while self.current_index < len(self.text_to_type) and self.typing:
-            if self.paused:
-                time.sleep(0.1)
-                continue
+    def add_source_options(p, default_file):
+        source = p.add_mutually_exclusive_group()
+        source.add_argument("--file", default=default_file, help="source document ('-' for stdin)")
+        source.add_argument("--text", help="text to type")
 
-            ch = self.text_to_type[self.current_index]
+    def add_job_options(p, countdown, typing=True):
+        p.add_argument("--min-wpm", type=int, default=60)
+        p.add_argument("--max-wpm", type=int, default=80)
+        p.add_argument("--typo-min-words", type=int, default=5, help="mistake every N words (lower bound)")
+        p.add_argument("--typo-max-words", type=int, default=12, help="mistake every N words (upper bound)")
+        p.add_argument("--layout", default=DEFAULT_LAYOUT, choices=available_layouts(),
+                       help="keyboard layout used to place typos")
+        if countdown is not None:
+            p.add_argument("--countdown", type=float, default=countdown, help="seconds to wait before typing")
+        p.add_argument("--seed", type=int, help="seed the session RNG to reproduce a run (see the report's seed)")
+        if typing:  # Options the estimate's simulation doesn't model
+            p.add_argument("--coalesce-ms", type=float, default=0.0,
+                           help="throughput mode: send keys planned less than this many ms apart in one call")
+            p.add_argument("--profile", help="digraph timing profile (see fit-profile) shaping per-key-pair timing")
+        p.add_argument("--paste-markup", action="store_true",
+                       help=f"paste segments between {PASTE_OPEN} and {PASTE_CLOSE} through the clipboard")
+        p.add_argument("--paste-blocks", type=int, default=0, metavar="N",
+                       help="paste blocks of more than N consecutive non-blank lines")
+        p.add_argument("--paste-non-ascii", action="store_true",
+                       help="paste runs of non-ASCII characters the backend may not be able to type")
 
-            if is_word_char(ch):
-                # Starting a new word? Decide if this word should get a typo based on schedule
-                if not current_word_correct:
-                    typo_planned = (self.words_since_last_typo >= self.next_typo_after_words)
-                    typo_introduced = False
-                    typed_word_len = 0
+    def add_profiling_options(p):
+        p.add_argument("--phase-sample", type=int, default=0, metavar="N",
+                       help="profile the typing loop, timing one event in N on average (1 = every event);"
+                            " the report gains per-phase histograms")
 
-                # Try to introduce exactly one neighbor-key mistake in this word
-                out = ch
-                if typo_planned and not typo_introduced:
-                    nb = self._neighbor_for_char(ch)
-                    if nb and nb != ch:
-                        out = nb
-                        typo_introduced = True
+    def add_address_options(p):
+        p.add_argument("--host", default="127.0.0.1")
+        p.add_argument("--port", type=int, default=DAEMON_PORT)
+        p.add_argument("--token-file", default=DAEMON_TOKEN_FILE,
+                       help="file holding the daemon's access token (written by the daemon)")
 
-                pyautogui.write(out)
-                self.current_index += 1
-                typed_word_len += 1
-                current_word_correct.append(ch)
+    backend_choices = ["auto", *BACKENDS]
 
-                time.sleep(self.calculate_delay() / 1000.0)
+    p = sub.add_parser("type", help="type a document without the GUI")
+    add_source_options(p, "-")
+    add_job_options(p, 3.0)
+    p.add_argument("--backend", default="auto", choices=backend_choices)
+    p.add_argument("--metrics-file", help="periodically write live metrics to this file")
+    p.add_argument("--metrics-format", default="json", choices=["json", "prometheus"])
+    p.add_argument("--metrics-interval", type=float, default=5.0, help="seconds between metrics writes")
+    p.add_argument("--journal", help="record progress to this file so an interrupted run can be resumed")
+    p.add_argument("--resume", action="store_true",
+                   help="continue the unfinished session in --journal (same source) instead of starting over")
+    p.add_argument("--trace", help="record the emitted keystrokes and delays to this binary trace file")
+    add_profiling_options(p)
 
-            else:
-                # Word boundary (space/punct/newline)
-                if current_word_correct:
-                    self.words_typed_since_last_pause += 1
-
-                    if typo_planned and typo_introduced:
-                        if ch.isspace():
-                            # Many people notice right after hitting the space
-                            pyautogui.write(ch)
-                            self.current_index += 1
-                            time.sleep(random.uniform(0.05, 0.2))
-                            # Delete space + word, then retype correctly, then space
-                            self._press_backspaces(1 + typed_word_len)
-                            for cc in current_word_correct:
-                                pyautogui.write(cc)
-                                time.sleep(self.calculate_delay() / 1000.0)
-                            pyautogui.write(' ')
-                        else:
-                            # Punctuation: correct before committing punctuation
-                            self._press_backspaces(typed_word_len)
-                            for cc in current_word_correct:
-                                pyautogui.write(cc)
-                                time.sleep(self.calculate_delay() / 1000.0)
-                            pyautogui.write(ch)
-                            self.current_index += 1
-
-                        # Reset mistake schedule after a correction
-                        self.words_since_last_typo = 0
-                        mn = max(1, self.typo_min_words.get())
-                        mx = max(mn, self.typo_max_words.get())
-                        self.next_typo_after_words = random.randint(mn, mx)
-                    else:
-                        # No typo on this word: just type the boundary
-                        pyautogui.write(ch)
-                        self.current_index += 1
-                        # Count this word toward the next scheduled typo
-                        self.words_since_last_typo += 1
-
-                    # Natural word-level pause after boundary/correction
-                    if self.words_typed_since_last_pause >= self.next_pause_after_words:
-                        self.set_status("Status: Natural pause...")
-                        time.sleep(random.uniform(0.5, 3.0))
-                        self.set_status("Status: Typing...")
-                        self.words_typed_since_last_pause = 0
-                        self.next_pause_after_words = random.randint(1, 8)
-
-                    # Reset word trackers
-                    current_word_correct = []
-                    typed_word_len = 0
-                    typo_planned = False
-                    typo_introduced = False
-                else:
-                    # Not in a word; just type boundary and continue
-                    pyautogui.write(ch)
-                    self.current_index += 1
-                    time.sleep(self.calculate_delay() / 1000.0)
-
-        # If text ended right after a typo word (no boundary), correct it now
-        if current_word_correct and typo_planned and typo_introduced:
-            self._press_backspaces(typed_word_len)
-            for cc in current_word_correct:
-                pyautogui.write(cc)
-                time.sleep(self.calculate_delay() / 1000.0)
-
-        if self.current_index >= len(self.text_to_type):
-            # Set completed first so stop_typing doesn't overwrite it
-            self.root.after(0, lambda: self.status_label.config(text="Status: Completed"))
-            self.root.after(0, self.stop_typing)
+    p = sub.add_parser("batch", help="type several documents as a queue of jobs")
+    p.add_argument("files", nargs="+", help="source documents, one job each")
+    add_job_options(p, 0.0)
+    p.add_argument("--workers", type=int, default=1, help="sessions typing in parallel")
+    p.add_argument("--backend", default="auto", choices=backend_choices)
+    p.add_argument("--display", action="append",
+                   help="X display for the xtest backend (repeatable, at least one per worker; each display"
+                        " types one job at a time)")
+    p.add_argument("--asyncio", action="store_true",
+                   help="run the sessions as tasks on one event loop instead of a thread per worker")
 
-    def toggle_pause(self):
-        """Toggle pause state"""
-        if self.typing:
-            self.paused = not self.paused
-            self.pause_button.config(
-                text=f"Resume ({self.pause_key})" if self.paused else f"Pause ({self.pause_key})"
-            )
-            self.status_label.config(
-                text="Status: Paused" if self.paused else "Status: Typing..."
-            )
+    p = sub.add_parser("replay", help="re-emit a recorded trace with its exact keystrokes and delays")
+    p.add_argument("trace", help="trace file written by 'type --trace'")
+    p.add_argument("--backend", default="auto", choices=backend_choices)
+    p.add_argument("--countdown", type=float, default=3.0, help="seconds to wait before typing")
+    p.add_argument("--record", help="record this replay to a new trace file (to compare timing)")
+    add_profiling_options(p)
 
-    def stop_typing(self):
-        """Stop the typing process"""
-        self.typing = False
-        self.paused = False
-
-        # Reset UI
-        self.start_button.config(state=tk.NORMAL)
-        self.pause_button.config(state=tk.DISABLED)
-        self.stop_button.config(state=tk.DISABLED)
-        self.pause_button.config(text=f"Pause ({self.pause_key})")
-        if self.status_label.cget("text") != "Status: Completed":
-            self.status_label.config(text="Status: Ready")
+    p = sub.add_parser("fit-profile", help="fit a digraph timing profile from keystroke logs")
+    p.add_argument("logs", nargs="+", help="trace files (from 'type --trace') or CSV logs with key,time_ms columns")
+    p.add_argument("--output", required=True, help="profile file to write")
+    p.add_argument("--quantiles", type=int, default=16, help="latency quantiles stored per bigram")
+    p.add_argument("--min-samples", type=int, default=8, help="observations needed to keep a bigram of its own")
+    p.add_argument("--max-gap-ms", type=float, default=1500.0, help="longer gaps count as pauses, not latency")
+
+    p = sub.add_parser("daemon", help="serve typing jobs over a local socket")
+    add_address_options(p)
+    p.add_argument("--backend", default="auto", choices=backend_choices)
+    p.add_argument("--asyncio", action="store_true",
+                   help="serve connections and type jobs on one event loop instead of a thread per connection")
+    p.add_argument("--allow-dir", action="append", default=[],
+                   help="directory whose files may be typed by path in a job's 'file' field (repeatable)")
+
+    p = sub.add_parser("bench", help="benchmark engine overhead, jitter and achieved WPM")
+    p.add_argument("--corpus", action="append", choices=list(BENCH_CORPORA),
+                   help="corpus to run (repeatable; default: all)")
+    p.add_argument("--min-wpm", type=int, default=60)
+    p.add_argument("--max-wpm", type=int, default=80)
+    p.add_argument("--typo-min-words", type=int, default=5)
+    p.add_argument("--typo-max-words", type=int, default=12)
+    p.add_argument("--time-scale", type=float, default=0.01, help="delay multiplier for the timed run")
+    p.add_argument("--coalesce-ms", type=float, default=0.0, help="throughput mode threshold for the timed run")
+    p.add_argument("--backend", action="append", choices=list(BACKENDS),
+                   help="backend to measure the injection ceiling of (repeatable; default: null and recording;"
+                        " interactive backends type into the focused window)")
+    p.add_argument("--output", help="write JSON results to this file instead of stdout")
+
+    p = sub.add_parser("estimate", help="estimate how long a document takes to type, without typing it")
+    add_source_options(p, "-")
+    add_job_options(p, None, typing=False)
+    p.add_argument("--runs", type=int, default=1000, help="simulated sessions")
+
+    p = sub.add_parser("send", help="send a job or a control command to a running daemon")
+    add_source_options(p, None)
+    add_job_options(p, 0.0)
+    p.add_argument("--control", choices=["pause", "resume", "stop", "status"],
+                   help="send a control command instead of a job")
+    add_profiling_options(p)
+    add_address_options(p)
+    return parser
+
+
+def _job_settings(args):
+    return {
+        "min_wpm": args.min_wpm,
+        "max_wpm": args.max_wpm,
+        "typo_min_words": args.typo_min_words,
+        "typo_max_words": args.typo_max_words,
+        "layout": args.layout,
+        "seed": args.seed,
+        "coalesce_ms": args.coalesce_ms,
+        "profile": os.path.abspath(args.profile) if args.profile else None,
+        "paste_markup": args.paste_markup,
+        "paste_min_lines": args.paste_blocks,
+        "paste_non_ascii": args.paste_non_ascii,
+    }
 
-    def run(self):
-        """Start the application"""
-        self.root.mainloop()
 
+def run_type(args):
+    engine = TypingEngine(backend_name=args.backend)
+    engine.apply_settings(_job_settings(args))
+    engine.phase_sample = args.phase_sample
+    path = None if args.text is not None else args.file
+    exporter = None
+    try:
+        journal = resume = None
+        if args.journal:
+            fingerprint = source_fingerprint(args.text, path)
+            if fingerprint is None:
+                print("autoscribe: --journal needs a file or --text source, not stdin", file=sys.stderr)
+                return 2
+            journal, resume, settings = open_journal(args.journal, fingerprint, engine.get_settings(), args.resume)
+            engine.apply_settings(settings)
+        engine.prepare(source_length(args.text, path))
+        trace = None
+        if args.trace:
+            trace = TraceWriter(args.trace, {"seed": engine.session_seed, "settings": engine.get_settings()})
+        if args.metrics_file:
+            exporter = MetricsExporter(engine, args.metrics_file, args.metrics_format, args.metrics_interval).start()
+        completed = engine.run(
+            source_chunks(args.text, path), countdown=args.countdown, journal=journal, resume=resume, trace=trace
+        )
+    except (OSError, ValueError) as e:  # A missing or unreadable source, journal or profile
+        engine.stop()
+        print(f"autoscribe: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        engine.stop()
+        return 130
+    finally:
+        if exporter is not None:
+            exporter.stop()
+    print(json.dumps(engine.last_report))
+    return 0 if completed else 1
+
+
+def run_replay(args):
+    try:
+        trace = KeystrokeTrace.load(args.trace)
+    except (OSError, ValueError) as e:
+        print(f"autoscribe: {e}", file=sys.stderr)
+        return 2
+    engine = TypingEngine(backend_name=args.backend)
+    engine.apply_settings(trace.header.get("settings", {}))
+    engine.phase_sample = args.phase_sample
+    engine.prepare(trace.source_length())
+    record = None
+    if args.record:
+        record = TraceWriter(args.record, dict(trace.header, replay_of=os.path.abspath(args.trace)))
+    try:
+        completed = engine.replay(trace, countdown=args.countdown, trace=record)
+    except KeyboardInterrupt:
+        engine.stop()
+        return 130
+    print(json.dumps(engine.last_report))
+    return 0 if completed else 1
+
+
+def run_batch(args):
+    if args.workers > 1 and not args.display and args.backend not in ("null", "recording"):
+        print("autoscribe: parallel workers on one display would interleave their keystrokes in the focused"
+              " window; give each worker its own --display", file=sys.stderr)
+        return 2
+    try:
+        if args.asyncio:
+            scheduler = AsyncJobScheduler(args.workers, args.display)
+        else:
+            scheduler = JobScheduler(args.workers, args.display)
+    except ValueError as e:
+        print(f"autoscribe: {e}", file=sys.stderr)
+        return 2
+    for path in args.files:
+        scheduler.submit(TypingJob(path=path, backend=args.backend, countdown=args.countdown, **_job_settings(args)))
+    try:
+        report = scheduler.wait()
+    except KeyboardInterrupt:
+        scheduler.stop()
+        report = scheduler.wait()
+    finally:
+        scheduler.shutdown()
+    print(json.dumps(report))
+    return 0 if all(job.status == "completed" for job in scheduler.jobs) else 1
+
+
+def run_daemon(args):
+    daemon = TypingDaemon(TypingEngine(backend_name=args.backend), args.host, args.port, args.token_file, args.allow_dir)
+    daemon.write_token()
+    print(f"AutoScribe daemon listening on {args.host}:{args.port} (token in {args.token_file})", file=sys.stderr)
+    try:
+        if args.asyncio:
+            import asyncio
+
+            asyncio.run(daemon.serve_async())
+        else:
+            daemon.serve_forever()
+    except KeyboardInterrupt:
+        daemon.engine.stop()
+    return 0
 
-def main():
+
+def run_send(args):
+    if args.control:
+        request = {"command": args.control}
+    else:
+        request = dict(_job_settings(args), countdown=args.countdown, phase_sample=args.phase_sample)
+        if args.text is not None:
+            request["text"] = args.text
+        elif args.file and args.file != "-":
+            with open(args.file, "r", encoding="utf-8") as f:
+                request["text"] = f.read()  # Read with our permissions, not the daemon's
+        else:
+            request["text"] = sys.stdin.read()
+    try:
+        response = send_to_daemon(request, args.host, args.port, args.token_file)
+    except (OSError, ConnectionError) as e:
+        print(f"autoscribe: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(response))
+    return 0 if response.get("ok") else 1
+
+
+def run_bench(args):
+    result = run_benchmark(
+        args.corpus, args.min_wpm, args.max_wpm, args.typo_min_words, args.typo_max_words, args.time_scale,
+        args.coalesce_ms, args.backend or ("null", "recording"),
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+    return 0
+
+
+def run_fit_profile(args):
+    options = {"quantiles": args.quantiles, "min_samples": args.min_samples, "max_gap_ms": args.max_gap_ms}
+    events = []
+    try:
+        for path in args.logs:
+            with open(path, "rb") as f:
+                is_trace = f.read(len(TRACE_MAGIC)) == TRACE_MAGIC
+            events.extend(_trace_keystrokes(KeystrokeTrace.load(path)) if is_trace else _csv_keystrokes(path))
+            events.append((None, 0.0))  # Logs don't continue one another
+        profile = DigraphProfile.fit(events, **options)
+    except (OSError, ValueError) as e:
+        print(f"autoscribe: {e}", file=sys.stderr)
+        return 2
+    profile.save(args.output)
+    print(json.dumps(dict(profile.header, rows=len(profile), output=args.output)))
+    return 0
+
+
+def run_estimate(args):
+    splitter = make_splitter(args.paste_markup, args.paste_blocks, args.paste_non_ascii)
+    chunks = source_chunks(args.text, None if args.text is not None else args.file)
+    try:
+        profile = SourceProfile.from_chunks(chunks, args.layout, splitter)
+        result = simulate_durations(
+            profile, args.min_wpm, args.max_wpm, args.typo_min_words, args.typo_max_words, args.runs, args.seed
+        )
+    except (RuntimeError, OSError, ValueError) as e:
+        print(f"autoscribe: {e}", file=sys.stderr)
+        return 2
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+def run_gui():
+    _load_gui()
     try:
         app = AutoScribe()
         app.run()
     except Exception as e:
         messagebox.showerror("Error", f"An error occurred: {str(e)}")
+    return 0
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.command == "type":
+        return run_type(args)
+    if args.command == "replay":
+        return run_replay(args)
+    if args.command == "batch":
+        return run_batch(args)
+    if args.command == "daemon":
+        return run_daemon(args)
+    if args.command == "send":
+        return run_send(args)
+    if args.command == "bench":
+        return run_bench(args)
+    if args.command == "estimate":
+        return run_estimate(args)
+    if args.command == "fit-profile":
+        return run_fit_profile(args)
+    return run_gui()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
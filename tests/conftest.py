@@ -0,0 +1,22 @@
+import os
+import sys
+
+# The app is a single module at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import autoscribe
+
+
+@pytest.fixture
+def make_engine():
+    """Factory for a seeded engine that records its keystrokes and skips the real delays."""
+
+    def make(backend=None, seed=7, **settings):
+        engine = autoscribe.TypingEngine(backend=backend if backend is not None else autoscribe.RecordingBackend())
+        engine.apply_settings(dict(settings, seed=seed))
+        engine.time_scale = 1e-6
+        return engine
+
+    return make
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+import autoscribe
+
+TEXT = (
+    "Both engines replay the same plan: the same keys, typos and corrections, and the\n"
+    "same pauses, whether a thread or an event loop drives the session. "
+    "[[paste]]Ünïcode[[/paste]] done.\n"
+) * 30
+
+
+@pytest.fixture
+def session(make_engine):
+    def make(**settings):
+        engine = make_engine(seed=11, **settings)
+        engine.prepare(len(TEXT.strip()))
+        return engine
+
+    return make
+
+
+def chunks():
+    return autoscribe.iter_text_chunks(TEXT.strip(), 300)
+
+
+@pytest.mark.parametrize(
+    "settings",
+    [{}, {"coalesce_ms": 40.0}, {"paste_markup": True, "paste_non_ascii": True}],
+    ids=["plain", "coalesced", "paste"],
+)
+def test_async_engine_matches_threaded_engine(session, settings):
+    threaded = session(**settings)
+    assert threaded.run(chunks())
+    on_loop = session(**settings)
+    assert asyncio.run(on_loop.run_async(chunks()))
+    assert on_loop.backend.keys == threaded.backend.keys
+    assert on_loop.current_index == threaded.current_index == len(TEXT.strip())
+    assert on_loop.metrics.keystrokes == threaded.metrics.keystrokes
+
+
+def test_sessions_sharing_a_loop_are_independent(session):
+    async def run_all():
+        engines = [session() for _ in range(4)]
+        results = await asyncio.gather(*(engine.run_async(chunks()) for engine in engines))
+        return engines, results
+
+    engines, results = asyncio.run(run_all())
+    assert all(results)
+    assert all(engine.backend.keys == engines[0].backend.keys for engine in engines)
+
+
+def test_cancelling_the_task_stops_the_session(tmp_path, session):
+    engine = session(min_wpm=300, max_wpm=400)
+    engine.time_scale = 0.5
+    journal = autoscribe.SessionJournal(str(tmp_path / "session.journal")).open({"source": "x"})
+
+    async def cancel_soon():
+        task = asyncio.ensure_future(engine.run_async(chunks(), journal=journal))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_soon())
+    assert not engine.typing
+    assert 0 < engine.current_index < len(TEXT.strip())
+    assert autoscribe.SessionJournal.load(journal.path)[1] is not None
@@ -0,0 +1,50 @@
+import types
+
+import pytest
+
+import autoscribe
+
+
+class FakeRoot:
+    """Root window of a 1920x1080 screen whose pointer the test moves."""
+
+    def __init__(self):
+        self.x, self.y = 960, 540
+        self.queries = 0
+
+    def query_pointer(self):
+        self.queries += 1
+        return types.SimpleNamespace(root_x=self.x, root_y=self.y)
+
+
+def fake_xtest(root):
+    """An XTestBackend wired to a fake screen instead of an X server."""
+    backend = autoscribe.XTestBackend.__new__(autoscribe.XTestBackend)
+    backend._root = root
+    backend._corners = ((0, 1919), (0, 1079))
+    backend._checked = 0.0
+    backend.typed = []
+    backend._tap = backend.typed.append
+    backend.display = types.SimpleNamespace(flush=lambda: None)
+    return backend
+
+
+@pytest.mark.parametrize("corner", [(0, 0), (1919, 0), (0, 1079), (1919, 1079)])
+def test_xtest_stops_with_the_pointer_in_a_corner(corner):
+    root = FakeRoot()
+    backend = fake_xtest(root)
+    backend.write("ok")
+    root.x, root.y = corner
+    backend._checked = 0.0
+    with pytest.raises(autoscribe.FailSafeError):
+        backend.press("a")
+    assert backend.typed == ["o", "k"]
+
+
+def test_xtest_queries_the_pointer_at_most_once_per_interval():
+    root = FakeRoot()
+    backend = fake_xtest(root)
+    for _ in range(100):
+        backend.press("a")
+    assert root.queries == 1
+    assert len(backend.typed) == 100
@@ -0,0 +1,29 @@
+import pytest
+
+import autoscribe
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["type", "--file", "{missing}", "--backend", "null"],
+        ["type", "--file", "{dir}", "--backend", "null", "--countdown", "0"],
+        ["estimate", "--file", "{missing}"],
+        ["estimate", "--file", "{dir}"],
+        ["replay", "{missing}", "--backend", "null"],
+    ],
+    ids=["type-missing", "type-unreadable", "estimate-missing", "estimate-unreadable", "replay-missing"],
+)
+def test_unreadable_source_is_reported_without_a_traceback(tmp_path, capsys, argv):
+    paths = {"missing": str(tmp_path / "missing.txt"), "dir": str(tmp_path)}
+    status = autoscribe.main([arg.format(**paths) for arg in argv])
+    assert status == 2
+    err = capsys.readouterr().err
+    assert err.startswith("autoscribe: ") and "Traceback" not in err
+
+
+def test_type_runs_a_text_source(capsys):
+    status = autoscribe.main(["type", "--text", "hello there", "--backend", "null", "--countdown", "0",
+                              "--min-wpm", "600", "--max-wpm", "700", "--seed", "1"])
+    assert status == 0
+    assert '"chars": 11' in capsys.readouterr().out
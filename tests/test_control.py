@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import autoscribe
+
+
+def later(seconds, action):
+    timer = threading.Timer(seconds, action)
+    timer.start()
+    return timer
+
+
+@pytest.fixture
+def control():
+    control = autoscribe.TypingControl()
+    control.start()
+    return control
+
+
+def test_sleep_runs_its_course_when_nothing_happens(control):
+    started = time.perf_counter()
+    assert control.sleep(0.05)
+    assert time.perf_counter() - started >= 0.05
+
+
+@pytest.mark.parametrize("request_", ["pause", "stop"])
+def test_pause_or_stop_wakes_a_sleep_at_once(control, request_):
+    later(0.05, getattr(control, request_))
+    started = time.perf_counter()
+    assert not control.sleep(5)
+    assert time.perf_counter() - started < 0.5
+
+
+def test_countdown_sleep_ignores_pause_but_not_stop(control):
+    later(0.02, control.pause)
+    assert control.sleep(0.1, wake_on_pause=False)
+    later(0.02, control.stop)
+    assert not control.sleep(5, wake_on_pause=False)
+
+
+def test_wait_while_paused_blocks_until_resumed(control):
+    control.pause()
+    later(0.1, control.resume)
+    paused = control.wait_while_paused()
+    assert 0.1 <= paused < 0.5
+    assert control.running and not control.paused
+
+
+def test_stop_releases_a_paused_thread(control):
+    control.pause()
+    later(0.05, control.stop)
+    control.wait_while_paused()
+    assert not control.running and not control.paused
+
+
+def test_toggle_pause_and_idle_requests(control):
+    assert control.toggle_pause()
+    assert not control.toggle_pause()
+    control.finish()
+    control.pause()  # Nothing to pause once the run is over
+    assert not control.paused
+
+
+def test_acknowledged_requests_are_kept_as_latency(control):
+    control.pause()
+    time.sleep(0.01)
+    control.acknowledge()
+    control.resume()
+    control.stop()
+    control.acknowledge()
+    report = control.latency_report()
+    assert report["pause"]["count"] == 1 and report["pause"]["last_ms"] >= 10
+    assert report["stop"]["count"] == 1
+
+
+def test_async_sleep_is_woken_from_another_thread(control):
+    async def run():
+        later(0.05, control.pause)
+        started = time.perf_counter()
+        woken = not await control.sleep_async(5)
+        return woken, time.perf_counter() - started
+
+    woken, elapsed = asyncio.run(run())
+    assert woken and elapsed < 0.5
+    assert not control._waiters
+
+
+def test_async_sleep_times_out(control):
+    assert asyncio.run(control.sleep_async(0.05))
+    assert not control._waiters
+
+
+def test_async_pause_blocks_only_its_own_task(control):
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.02)
+
+    async def run():
+        control.pause()
+        later(0.15, control.resume)
+        tick_task = asyncio.ensure_future(ticker())
+        paused = await control.wait_while_paused_async()
+        await tick_task
+        return paused
+
+    paused = asyncio.run(run())
+    assert 0.15 <= paused < 0.6
+    assert len(ticks) == 5 and ticks[-1] - ticks[0] < 0.15  # The loop kept running meanwhile
+
+
+def test_one_stop_wakes_waiters_on_every_loop(control):
+    results = []
+
+    def session():
+        results.append(asyncio.run(control.sleep_async(5)))
+
+    threads = [threading.Thread(target=session) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    control.stop()
+    for thread in threads:
+        thread.join(1)
+    assert results == [False, False, False]
+    assert not control._waiters
+
+
+def test_pausing_a_session_holds_its_progress(make_engine):
+    text = "Paused sessions type nothing until they are resumed. " * 4
+    engine = make_engine(min_wpm=600, max_wpm=700)
+    engine.time_scale = 0.05
+    engine.prepare(len(text.strip()))
+    result = []
+    thread = threading.Thread(target=lambda: result.append(engine.run(autoscribe.iter_text_chunks(text.strip()))))
+    thread.start()
+    time.sleep(0.1)
+    engine.pause()
+    time.sleep(0.05)
+    typed = len(engine.backend.keys)
+    assert 0 < engine.current_index < len(text.strip())
+    time.sleep(0.2)
+    assert len(engine.backend.keys) == typed
+    engine.resume()
+    thread.join(10)
+    assert result == [True]
+    assert engine.current_index == len(text.strip())
+    assert engine.metrics_snapshot()["user_paused_s"] >= 0.2
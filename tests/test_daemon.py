@@ -0,0 +1,91 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import autoscribe
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    engine = autoscribe.TypingEngine(backend_name="null")
+    engine.time_scale = 1e-6
+    daemon = autoscribe.TypingDaemon(engine, port=free_port(), token_file=str(tmp_path / "token"),
+                                     allowed_dirs=[str(tmp_path / "allowed")])
+    daemon.write_token()
+    threading.Thread(target=daemon.serve_forever, daemon=True).start()
+    for _ in range(100):
+        try:
+            socket.create_connection((daemon.host, daemon.port)).close()
+            break
+        except OSError:
+            time.sleep(0.02)
+    return daemon
+
+
+def send(daemon, request):
+    return autoscribe.send_to_daemon(request, daemon.host, daemon.port, daemon.token_file)
+
+
+def test_wrong_token_closes_the_connection(daemon, tmp_path):
+    with socket.create_connection((daemon.host, daemon.port)) as sock:
+        sock.sendall(b'{"token": "not-the-token", "command": "status"}\n')
+        with sock.makefile("r") as f:
+            assert f.readline() == ""
+    wrong = tmp_path / "wrong"
+    wrong.write_text("0" * 32)
+    with pytest.raises(ConnectionError):
+        autoscribe.send_to_daemon({"command": "status"}, daemon.host, daemon.port, str(wrong))
+
+
+def test_status(daemon):
+    response = send(daemon, {"command": "status"})
+    assert response["ok"] and not response["typing"] and not response["paused"]
+
+
+def test_job_on_the_null_backend(daemon):
+    response = send(daemon, {"text": "A job typed by the daemon.", "seed": 1, "min_wpm": 200, "max_wpm": 240})
+    assert response["ok"] and response["completed"]
+    assert response["metrics"]["chars"] == len("A job typed by the daemon.")
+
+
+@pytest.mark.parametrize(
+    "request_",
+    [{"text": None, "min_wpm": None}, {"text": "x", "min_wpm": "fast"}, {"text": 5}, {"text": "x", "seed": True},
+     {"text": "x", "layout": "../qwerty"}],
+    ids=["nulls", "string-wpm", "number-text", "bool-seed", "unknown-layout"],
+)
+def test_malformed_job_is_answered_with_an_error(daemon, request_):
+    response = send(daemon, request_)
+    assert not response["ok"] and response["error"]
+    assert send(daemon, {"command": "status"})["typing"] is False
+
+
+def test_job_settings_do_not_carry_over(daemon):
+    defaults = daemon.engine.get_settings()
+    assert send(daemon, {"text": "first", "min_wpm": 200, "max_wpm": 240, "seed": 3, "coalesce_ms": 20})["ok"]
+    assert send(daemon, {"text": "second"})["ok"]
+    assert daemon.engine.get_settings() == defaults
+
+
+def test_daemon_reads_files_only_inside_allowed_dirs(daemon, tmp_path):
+    outside = tmp_path / "profile.json"
+    outside.write_text("{}")
+    response = send(daemon, {"text": "x", "profile": str(outside)})
+    assert not response["ok"] and "--allow-dir" in response["error"]
+    response = send(daemon, {"file": str(outside)})
+    assert not response["ok"] and "--allow-dir" in response["error"]
+
+    allowed = tmp_path / "allowed"
+    allowed.mkdir()
+    (allowed / "notes.txt").write_text("typed from a file")
+    response = send(daemon, {"file": str(allowed / "notes.txt")})
+    assert response["ok"] and response["completed"]
@@ -0,0 +1,119 @@
+import random
+
+import pytest
+
+import autoscribe
+
+# Gap (ms) after each key of "the ": "th" is quick and " t" hesitates; mean 100 ms
+GAPS = {"t": 50.0, "h": 100.0, "e": 100.0, " ": 150.0}
+
+
+def keylog(repeats=20):
+    events = []
+    at = 0.0
+    for _ in range(repeats):
+        for key in "the ":
+            events.append((key, at))
+            at += GAPS[key]
+    return events
+
+
+def plan_of(text, delay=100.0):
+    plan = autoscribe.KeystrokePlan()
+    for ch in text:
+        plan.append(ch, autoscribe.ACTION_WRITE, delay, 1)
+    return plan
+
+
+def test_fit_keeps_each_bigram_as_a_ratio_to_the_mean():
+    profile = autoscribe.DigraphProfile.fit(keylog(), quantiles=4)
+    assert profile.header["mean_ms"] == pytest.approx(100.0, rel=0.01)
+
+    def row(code):
+        offset = profile.index[code]
+        return list(profile.values[offset:offset + 4])
+
+    assert row(autoscribe._pair_code(ord("t"), ord("h"))) == pytest.approx([0.5] * 4, rel=0.01)
+    assert row(autoscribe._pair_code(ord(" "), ord("t"))) == pytest.approx([1.5] * 4, rel=0.01)
+    assert row(autoscribe._pair_code(0, ord("h"))) == pytest.approx([0.5] * 4, rel=0.01)  # Any key before h
+    overall = row(0)
+    assert overall == sorted(overall)
+    assert overall[0] == pytest.approx(0.5, rel=0.01) and overall[-1] == pytest.approx(1.5, rel=0.01)
+
+
+def test_rare_bigrams_fall_back_to_the_key_and_global_rows():
+    profile = autoscribe.DigraphProfile.fit(keylog(5), min_samples=8)
+    assert list(profile.index) == [0]
+    profile = autoscribe.DigraphProfile.fit(keylog(10), min_samples=8)
+    assert len(profile) == 4 + 4 + 1  # Four bigrams, four keys, everything
+
+
+def test_pauses_and_corrections_are_not_latency():
+    events = [("a", 0.0), ("b", 100.0), ("c", 5000.0), ("\b", 5100.0), ("d", 5200.0), ("e", 5300.0), ("f", 5400.0)]
+    profile = autoscribe.DigraphProfile.fit(events, min_samples=1)
+    assert profile.header["samples"] == 3  # ab, de, ef
+    with pytest.raises(ValueError):
+        autoscribe.DigraphProfile.fit([("a", 0.0), ("b", 9000.0)])
+    with pytest.raises(ValueError):
+        autoscribe.DigraphProfile.fit(keylog(), quantiles=1)
+
+
+def test_shape_scales_write_gaps_by_their_bigram():
+    profile = autoscribe.DigraphProfile.fit(keylog())
+    plan = plan_of("the thx")
+    plan.append("x", autoscribe.ACTION_BACKSPACE, 100.0)
+    plan.append("x", autoscribe.ACTION_WRITE, 100.0, 1)
+    profile.shape(plan, random.Random(1))
+    delays = list(plan.delays)
+    assert delays[0] == pytest.approx(50.0, rel=0.01)   # t -> h
+    assert delays[3] == pytest.approx(150.0, rel=0.01)  # ' ' -> t
+    assert delays[4] == pytest.approx(50.0, rel=0.01)   # t -> h again
+    assert 50.0 <= delays[5] <= 150.0                   # h -> x: unknown pair, global row
+    assert delays[6:] == [100.0] * 3                    # Around the backspace: unchanged
+
+
+def test_shape_from_start_leaves_earlier_events_alone():
+    profile = autoscribe.DigraphProfile.fit(keylog())
+    plan = plan_of("the the")
+    profile.shape(plan, random.Random(1), start=4)
+    assert list(plan.delays)[:4] == [100.0] * 4
+    assert plan.delays[4] == pytest.approx(50.0, rel=0.01)
+
+
+def test_profile_round_trips_through_a_file(tmp_path):
+    profile = autoscribe.DigraphProfile.fit(keylog())
+    path = str(tmp_path / "me.prof")
+    profile.save(path)
+    loaded = autoscribe.DigraphProfile.load(path)
+    assert loaded.path == path
+    assert loaded.quantiles == profile.quantiles
+    assert loaded.index == profile.index
+    assert list(loaded.values) == list(profile.values)
+    assert list(loaded.counts) == list(profile.counts)
+    with open(path, "wb") as f:
+        f.write(b"not a profile")
+    with pytest.raises(ValueError):
+        autoscribe.DigraphProfile.load(path)
+
+
+def test_fit_from_a_csv_log(tmp_path):
+    path = tmp_path / "keys.csv"
+    path.write_text("Key,Time_ms\n" + "".join(f"{key},{at}\n" for key, at in keylog()))
+    profile = autoscribe.DigraphProfile.from_csv(str(path))
+    assert autoscribe._pair_code(ord("t"), ord("h")) in profile.index
+    path.write_text("key,when\nt,0\n")
+    with pytest.raises(ValueError):
+        autoscribe.DigraphProfile.from_csv(str(path))
+
+
+def test_engine_with_a_profile_keeps_the_keys_and_shapes_the_rhythm(tmp_path, make_engine):
+    path = str(tmp_path / "me.prof")
+    autoscribe.DigraphProfile.fit(keylog()).save(path)
+    text = "the theme of the thesis is the thing " * 5
+    plain = make_engine()
+    plain.prepare()
+    shaped = make_engine(profile=path)
+    shaped.prepare()
+    a, b = plain.build_plan(text), shaped.build_plan(text)
+    assert list(a.keys) == list(b.keys) and list(a.actions) == list(b.actions)
+    assert list(a.delays) != list(b.delays)
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+import autoscribe
+
+TEXT = "A run that cannot start must not be left counting as typing.\n" * 5
+
+
+def no_backend(name):
+    raise ModuleNotFoundError("No module named 'pyautogui'")
+
+
+def test_failed_start_ends_the_run(make_engine):
+    engine = make_engine()
+    engine.prepare()
+    with pytest.raises(FileNotFoundError):
+        engine.run(autoscribe.source_chunks(path="/nonexistent/source.txt"))
+    assert not engine.typing
+
+
+@pytest.mark.parametrize("on_loop", [False, True], ids=["threaded", "async"])
+def test_backend_that_fails_to_start_ends_the_run(tmp_path, monkeypatch, on_loop):
+    monkeypatch.setattr(autoscribe, "create_backend", no_backend)
+    engine = autoscribe.TypingEngine()
+    engine.prepare()
+    journal = autoscribe.SessionJournal(str(tmp_path / "session.journal")).open({"source": "x"})
+    chunks = autoscribe.iter_text_chunks(TEXT, 100)
+    with pytest.raises(ModuleNotFoundError):
+        if on_loop:
+            asyncio.run(engine.run_async(chunks, journal=journal))
+        else:
+            engine.run(chunks, journal=journal)
+    assert not engine.typing
+    assert journal._file is None
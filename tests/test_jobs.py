@@ -0,0 +1,54 @@
+import pytest
+
+import autoscribe
+
+TEXT = "Every job types into its own engine, and a stop reaches all of them.\n" * 20
+
+
+class FastJob(autoscribe.TypingJob):
+    """Records its keystrokes and skips the real delays."""
+
+    def __init__(self, **settings):
+        super().__init__(text=TEXT, backend=autoscribe.RecordingBackend(), **settings)
+
+    def make_engine(self):
+        engine = super().make_engine()
+        engine.time_scale = 1e-6
+        return engine
+
+
+class StoppedWhileStarting(FastJob):
+    """A job whose scheduler is stopped while its engine is still being set up."""
+
+    scheduler = None
+
+    def make_engine(self):
+        engine = super().make_engine()
+        self.scheduler.stop()
+        return engine
+
+
+@pytest.fixture(params=[autoscribe.JobScheduler, autoscribe.AsyncJobScheduler], ids=["threaded", "async"])
+def scheduler(request):
+    scheduler = request.param(1)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def test_jobs_run_to_completion(scheduler):
+    jobs = [scheduler.submit(FastJob(seed=seed)) for seed in range(3)]
+    report = scheduler.wait()
+    assert report["jobs"] == {"completed": 3}
+    assert all(job.chars_typed() == len(TEXT.strip()) for job in jobs)
+
+
+def test_stop_while_a_job_is_starting_is_not_lost(scheduler):
+    job = StoppedWhileStarting()
+    job.scheduler = scheduler
+    queued = FastJob()
+    scheduler.submit(job)
+    scheduler.submit(queued)
+    scheduler.wait()
+    assert job.status == "stopped"
+    assert job.chars_typed() == 0
+    assert queued.status == "cancelled"
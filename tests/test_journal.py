@@ -0,0 +1,147 @@
+import random
+
+import pytest
+
+import autoscribe
+
+CHUNK = 200
+TEXT = (
+    "The committee met on Tuesday to review the proposal, and after a long discussion "
+    "they agreed that the budget should be revised before the next quarter.\n"
+    "[[paste]]HEADER: naïve café\nversion 2[[/paste]] then the rest of it, typed.\n\n"
+    "line one\nline two\nline three\nline four\n\n"
+) * 6
+PASTE = {"paste_markup": True, "paste_min_lines": 3, "paste_non_ascii": True}
+
+
+class Crash(Exception):
+    pass
+
+
+class CrashingBackend(autoscribe.RecordingBackend):
+    """Records like RecordingBackend and raises on the call after `limit` calls."""
+
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+        self.calls = 0
+
+    def _call(self):
+        self.calls += 1
+        if self.calls > self.limit:
+            raise Crash()
+
+    def write(self, text):
+        self._call()
+        super().write(text)
+
+    def press(self, key):
+        self._call()
+        super().press(key)
+
+    def paste(self, text):
+        self._call()
+        super().paste(text)
+
+
+def chunks():
+    return autoscribe.iter_text_chunks(TEXT.strip(), CHUNK)
+
+
+def uninterrupted(make_engine, settings):
+    engine = make_engine(**settings)
+    engine.prepare(len(TEXT.strip()))
+    assert engine.run(chunks())
+    return engine.backend.keys, engine.current_index
+
+
+@pytest.mark.parametrize("settings", [{}, {"coalesce_ms": 40.0}, PASTE, dict(PASTE, coalesce_ms=40.0)],
+                         ids=["plain", "coalesced", "paste", "paste-coalesced"])
+def test_resumed_session_matches_an_uninterrupted_one(tmp_path, monkeypatch, make_engine, settings):
+    monkeypatch.setattr(autoscribe, "SOURCE_CHUNK_SIZE", CHUNK)
+    expected_keys, expected_index = uninterrupted(make_engine, settings)
+    rng = random.Random(1)
+    for trial in range(8):
+        path = str(tmp_path / f"session{trial}.journal")
+        fingerprint = autoscribe.source_fingerprint(TEXT)
+        backend = CrashingBackend(rng.randint(1, 600))
+        resume = None
+        crashes = 0
+        while True:
+            engine = make_engine(backend, **settings)
+            journal = autoscribe.SessionJournal(path, flush_every=1)  # Nothing is retyped after a crash
+            if resume is None:
+                journal.open({"source": fingerprint, "chunk_size": CHUNK, "settings": engine.get_settings()})
+            else:
+                journal.open()
+            engine.prepare(len(TEXT.strip()))
+            try:
+                assert engine.run(chunks(), journal=journal, resume=resume)
+                break
+            except Crash:
+                crashes += 1
+                backend.limit = backend.calls + rng.randint(1, 600)
+                _, resume = autoscribe.SessionJournal.load(path)
+        assert crashes
+        assert backend.keys == expected_keys
+        assert engine.current_index == expected_index == len(TEXT.strip())
+
+
+@pytest.mark.parametrize("settings", [{}, PASTE], ids=["plain", "paste"])
+def test_resume_from_each_checkpoint(tmp_path, monkeypatch, make_engine, settings):
+    """A session killed right after a checkpoint (no progress in that chunk yet) resumes
+    with the right index even when the planner held text back across the boundary."""
+    monkeypatch.setattr(autoscribe, "SOURCE_CHUNK_SIZE", CHUNK)
+    path = str(tmp_path / "full.journal")
+    engine = make_engine(**settings)
+    engine.prepare(len(TEXT.strip()))
+    journal = autoscribe.SessionJournal(path).open({"source": "x", "chunk_size": CHUNK, "settings": {}})
+    assert engine.run(chunks(), journal=journal)
+    expected_keys = engine.backend.keys
+
+    with open(path) as f:
+        lines = f.readlines()
+    checkpoints = [i for i, line in enumerate(lines) if '"type":"checkpoint"' in line]
+    assert len(checkpoints) > 3
+    for i in checkpoints[1:]:
+        cut = str(tmp_path / "cut.journal")
+        with open(cut, "w") as f:
+            f.writelines(lines[:i + 1])
+        _, resume = autoscribe.SessionJournal.load(cut)
+        resumed = make_engine(**settings)
+        resumed.prepare(len(TEXT.strip()))
+        assert resumed.run(chunks(), resume=resume)
+        assert resumed.current_index == len(TEXT.strip())
+        assert resumed.backend.keys == expected_keys[len(expected_keys) - len(resumed.backend.keys):]
+
+
+class WatchedJournal(autoscribe.SessionJournal):
+    """Notes after each progress() call how many events the file is behind."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.behind = []
+
+    def progress(self, chunk, events, index, delay_ms=0.0):
+        super().progress(chunk, events, index, delay_ms)
+        with open(self.path) as f:
+            written = [line.split() for line in f if line.startswith("P ")]
+        last = int(written[-1][2]) if written and int(written[-1][1]) == chunk else 0
+        self.behind.append(events - last)
+
+
+def test_journal_lags_less_than_flush_every_events_when_coalescing(tmp_path, make_engine):
+    engine = make_engine(autoscribe.NullBackend(), coalesce_ms=40.0, min_wpm=1000, max_wpm=1200)
+    engine.prepare()
+    journal = WatchedJournal(str(tmp_path / "session.journal")).open({"source": "x"})
+    engine.run(chunks(), journal=journal)
+    assert max(journal.behind) < journal.flush_every
+
+
+def test_completed_journal_has_no_resume_point(tmp_path, make_engine):
+    path = str(tmp_path / "session.journal")
+    engine = make_engine(autoscribe.NullBackend())
+    engine.prepare()
+    journal = autoscribe.SessionJournal(path).open({"source": "x"})
+    assert engine.run(chunks(), journal=journal)
+    assert autoscribe.SessionJournal.load(path)[1] is None
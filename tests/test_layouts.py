@@ -0,0 +1,86 @@
+import random
+import string
+
+import pytest
+
+import autoscribe
+
+LAYOUTS = autoscribe.available_layouts()
+
+
+def test_bundled_layouts_are_available():
+    assert set(LAYOUTS) >= {"qwerty", "azerty", "qwertz", "dvorak"}
+
+
+@pytest.mark.parametrize("name", LAYOUTS)
+def test_layout_loads_with_every_letter_and_digit(name):
+    layout = autoscribe.KeyboardLayout.load(name)
+    assert layout.title
+    for ch in string.ascii_letters + string.digits:
+        assert ch in layout.positions
+        assert layout.neighbors(ch), ch
+
+
+@pytest.mark.parametrize("name", LAYOUTS)
+def test_ascii_keys_only_get_ascii_typos(name):
+    layout = autoscribe.get_layout(name)
+    for ch, (candidates, _, _) in layout.table.items():
+        if ch.isascii():
+            assert all(out.isascii() for out in candidates), ch
+
+
+@pytest.mark.parametrize("name", LAYOUTS)
+def test_typos_keep_the_shift_state(name):
+    layout = autoscribe.get_layout(name)
+    for ch in string.ascii_lowercase:
+        assert all(not out.isupper() for out in layout.neighbors(ch))
+    for ch in string.ascii_uppercase:
+        assert all(not out.islower() for out in layout.neighbors(ch))
+
+
+def test_nearest_keys_are_hit_most_often():
+    neighbors = autoscribe.get_layout("qwerty").neighbors("g")
+    assert sum(neighbors.values()) == pytest.approx(1.0)
+    assert set(neighbors) >= {"f", "h", "t", "y", "v", "b"}
+    assert neighbors["f"] == pytest.approx(neighbors["h"])
+    assert neighbors["f"] > neighbors["t"]
+
+
+@pytest.mark.parametrize("weights", [[1.0], [1.0, 1.0], [4.0, 1.0, 0.25], [0.1, 5.0, 2.0, 2.0, 0.7]])
+def test_alias_table_reproduces_the_weights(weights):
+    prob, alias = autoscribe._alias_table(weights)
+    n = len(weights)
+    drawn = [0.0] * n
+    for i in range(n):
+        drawn[i] += prob[i] / n
+        drawn[alias[i]] += (1.0 - prob[i]) / n
+    total = sum(weights)
+    assert drawn == pytest.approx([w / total for w in weights])
+
+
+def test_neighbor_samples_match_the_table():
+    layout = autoscribe.get_layout("azerty")
+    rng = random.Random(5)
+    counts = {}
+    for _ in range(20000):
+        out = layout.neighbor("e", rng)
+        counts[out] = counts.get(out, 0) + 1
+    expected = layout.neighbors("e")
+    assert set(counts) == set(expected)
+    for out, p in expected.items():
+        assert counts[out] / 20000 == pytest.approx(p, abs=0.015)
+
+
+def test_uppercase_of_a_lowercase_only_key_uses_its_neighbors():
+    layout = autoscribe.get_layout("azerty")
+    assert "É" not in layout.positions
+    rng = random.Random(1)
+    expected = {out.upper() for out in layout.neighbors("é")}
+    assert {layout.neighbor("É", rng) for _ in range(200)} == expected
+
+
+def test_get_layout_caches_and_rejects_unknown_names():
+    assert autoscribe.get_layout("qwertz") is autoscribe.get_layout("qwertz")
+    assert autoscribe.get_layout().name == autoscribe.DEFAULT_LAYOUT
+    with pytest.raises(ValueError):
+        autoscribe.get_layout("../layouts/qwerty")
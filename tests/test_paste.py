@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+import autoscribe
+
+OPEN, CLOSE = autoscribe.PASTE_OPEN, autoscribe.PASTE_CLOSE
+
+
+def split(splitter, text, cuts=()):
+    """Feed text cut at the given offsets; returns the pieces merged across calls."""
+    pieces = []
+    start = 0
+    for cut in list(cuts) + [len(text)]:
+        pieces.extend(splitter.feed(text[start:cut]))
+        start = cut
+    pieces.extend(splitter.finish())
+    return autoscribe.PasteSplitter._merge(pieces)
+
+
+def random_source(rng):
+    lines = []
+    for _ in range(rng.randint(5, 40)):
+        kind = rng.random()
+        if kind < 0.2:
+            lines.append(rng.choice(["", " ", "   ", "\t", " \t "]))
+        elif kind < 0.3:
+            lines.append(f"{OPEN}pasted {rng.randint(0, 9)}\nmore{CLOSE} after")
+        elif kind < 0.4:
+            lines.append("naïve café – ünïcode")
+        else:
+            lines.append(" ".join(rng.choice(["alpha", "beta", "x = 1", "  indented"]) for _ in range(rng.randint(1, 5))))
+    return "\n".join(lines) + rng.choice(["", "\n", "  "])
+
+
+def test_marked_segments_are_pasted_without_their_markers():
+    splitter = autoscribe.PasteSplitter(markup=True)
+    text = f"Typed {OPEN}pasted{CLOSE} typed again"
+    assert split(splitter, text) == [
+        (False, "Typed ", 6),
+        (True, "pasted", len(OPEN) + 6 + len(CLOSE)),
+        (False, " typed again", 12),
+    ]
+
+
+def test_markers_split_across_feeds_are_recognised():
+    text = f"Typed {OPEN}pasted{CLOSE} typed again"
+    whole = split(autoscribe.PasteSplitter(markup=True), text)
+    for cut in range(1, len(text)):
+        assert split(autoscribe.PasteSplitter(markup=True), text, [cut]) == whole
+
+
+def test_long_blocks_are_pasted_and_short_ones_typed():
+    splitter = autoscribe.PasteSplitter(markup=False, min_lines=2)
+    text = "short\nblock\n\nthree\nline\nblock\n\nend"
+    assert split(splitter, text) == [
+        (False, "short\nblock\n\n", 13),
+        (True, "three\nline\nblock\n", 17),
+        (False, "\nend", 4),
+    ]
+
+
+def test_runs_of_non_ascii_are_pasted():
+    splitter = autoscribe.PasteSplitter(markup=False, non_ascii=True)
+    assert split(splitter, "a café — ok") == [
+        (False, "a caf", 5), (True, "é", 1), (False, " ", 1), (True, "—", 1), (False, " ok", 3),
+    ]
+
+
+@pytest.mark.parametrize("min_lines", [0, 1, 3])
+@pytest.mark.parametrize("markup", [False, True])
+def test_pieces_do_not_depend_on_where_chunks_end(markup, min_lines):
+    """Feeding a source in pieces gives the same split as feeding it whole, including
+    blank and whitespace-only lines right at a chunk boundary."""
+    rng = random.Random(min_lines * 2 + markup)
+    for _ in range(150):
+        text = random_source(rng)
+        whole = split(autoscribe.PasteSplitter(markup, min_lines, True), text)
+        cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(1, 12))))
+        assert split(autoscribe.PasteSplitter(markup, min_lines, True), text, cuts) == whole, (text, cuts)
+        assert sum(advance for _, _, advance in whole) == len(text)
+        out = "".join(piece for _, piece, _ in whole)
+        assert out == (text.replace(OPEN, "").replace(CLOSE, "") if markup else text)
+
+
+def test_whitespace_only_line_ends_a_pasted_block_at_any_boundary():
+    text = "one\ntwo\nthree\n   \nafter"
+    whole = split(autoscribe.PasteSplitter(False, 2), text)
+    assert whole == [(True, "one\ntwo\nthree\n", 14), (False, "   \nafter", 9)]
+    for cut in range(1, len(text)):
+        assert split(autoscribe.PasteSplitter(False, 2), text, [cut]) == whole, cut
+
+
+def test_state_round_trip_continues_the_split():
+    text = f"one\ntwo\nthree\nfour\n{OPEN}half"
+    first = autoscribe.PasteSplitter(True, 2, True)
+    head = first.feed(text)
+    second = autoscribe.PasteSplitter(True, 2, True)
+    second.set_state(first.get_state())
+    rest = second.feed(f" done{CLOSE} tail") + second.finish()
+    assert autoscribe.PasteSplitter._merge(head + rest) == split(
+        autoscribe.PasteSplitter(True, 2, True), text + f" done{CLOSE} tail"
+    )
+
+
+def test_make_splitter_only_when_something_is_pasted():
+    assert autoscribe.make_splitter() is None
+    assert isinstance(autoscribe.make_splitter(min_lines=3), autoscribe.PasteSplitter)
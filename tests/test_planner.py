@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+import autoscribe
+
+
+def render(plan):
+    """The text a plan leaves in the target window."""
+    out = []
+    for key, action, _, _ in plan:
+        if action == autoscribe.ACTION_WRITE:
+            out.append(key)
+        elif action == autoscribe.ACTION_BACKSPACE:
+            out.pop()
+        elif action == autoscribe.ACTION_PASTE:
+            out.append(plan.pastes[ord(key)][0])
+    return "".join(out)
+
+
+def planner(typo_every=1, seed=1, **kwargs):
+    rng = random.Random(seed)
+    return autoscribe.KeystrokePlanner(
+        lambda: 100.0,
+        lambda ch: "x" if ch != "x" else "z",
+        typo_every, typo_every, rng=rng, **kwargs,
+    )
+
+
+@pytest.mark.parametrize("boundary", ["\n", "\t", " ", "\r\n"])
+def test_typo_fixed_on_a_whitespace_boundary_keeps_the_boundary(boundary):
+    text = f"first{boundary}second{boundary}third"
+    p = planner()
+    p.feed(text)
+    plan = p.finish()
+    assert render(plan) == text
+    assert autoscribe.ACTION_BACKSPACE in plan.actions
+
+
+def test_typo_right_before_a_newline_retypes_the_newline():
+    p = planner()
+    p.feed("ab cd\nef")
+    plan = p.finish()
+    keys = "".join(key for key, action, _, _ in plan if action != autoscribe.ACTION_PAUSE)
+    assert keys.startswith("ab xd\n\b\b\bcd\n")  # The newline reveals the typo and is typed again
+
+
+def test_every_plan_types_its_source():
+    layout = autoscribe.get_layout("qwerty")
+    source = " ".join(autoscribe.BENCH_CORPORA.values()) + "\n\tend,\n\nlast"
+    for seed in range(20):
+        rng = random.Random(seed)
+        p = autoscribe.KeystrokePlanner(
+            lambda: 100.0, lambda ch: layout.neighbor(ch, rng), 1, 3, rng=rng,
+        )
+        for start in range(0, len(source), 97):  # Words and typos span the feeds
+            p.feed(source[start:start + 97])
+        assert render(p.finish()) == source
+
+
+def test_advances_add_up_to_the_source_length():
+    text = "Typos, corrections and pauses advance by the source characters only.\nDone"
+    p = planner(typo_every=2)
+    p.feed(text)
+    plan = p.finish()
+    assert sum(plan.advances) == len(text)
+
+
+def test_state_round_trip_continues_the_same_plan():
+    text = "state carried across a checkpoint keeps the plan identical word for word"
+    whole = planner(typo_every=2, seed=4)
+    whole.feed(text)
+    expected = list(whole.finish())
+
+    first = planner(typo_every=2, seed=4)
+    first.feed(text[:31])
+    rng_state = first.rng.getstate()
+    state = first.get_state()
+    second = planner(typo_every=2, seed=99)
+    second.rng.setstate(rng_state)
+    second.set_state(state)
+    second.feed(text[31:])
+    assert list(first.plan) + list(second.finish()) == expected
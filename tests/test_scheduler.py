@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import autoscribe
+
+
+def test_work_between_waits_is_taken_out_of_the_next_gap():
+    scheduler = autoscribe.DeadlineScheduler()
+    started = time.perf_counter()
+    for _ in range(20):
+        time.sleep(0.004)  # Injecting the key
+        assert scheduler.wait(10)
+    elapsed = time.perf_counter() - started
+    assert 0.2 <= elapsed < 0.23
+    assert scheduler.rebases == 0
+
+
+def test_waits_land_on_their_deadlines():
+    scheduler = autoscribe.DeadlineScheduler()
+    late = []
+    for delay_ms in (5, 12, 1, 30, 8) * 4:
+        scheduler.wait(delay_ms)
+        late.append(time.perf_counter() - scheduler.deadline)
+    assert min(late) >= 0
+    assert sorted(late)[len(late) // 2] < 0.001
+
+
+def test_a_short_stall_is_caught_up():
+    scheduler = autoscribe.DeadlineScheduler(max_lag=0.25)
+    time.sleep(0.1)
+    started = time.perf_counter()
+    for _ in range(5):
+        scheduler.wait(10)  # Still behind: no waiting
+    assert time.perf_counter() - started < 0.02
+    assert scheduler.rebases == 0
+    assert scheduler.max_lag_seen >= 0.09
+
+
+def test_a_long_stall_rebases_instead_of_bursting():
+    scheduler = autoscribe.DeadlineScheduler(max_lag=0.25)
+    time.sleep(0.4)
+    assert scheduler.wait(10)
+    assert scheduler.rebases == 1
+    started = time.perf_counter()
+    scheduler.wait(20)
+    assert time.perf_counter() - started >= 0.019  # Paced from the stall, not from the old schedule
+    report = scheduler.report()
+    assert report["rebases"] == 1
+    assert report["elapsed_s"] < 0.1  # The stall is excluded
+
+
+def test_a_sleep_woken_early_keeps_its_deadline():
+    woken = []
+
+    def interrupted_sleep(seconds):
+        woken.append(seconds)
+        return False
+
+    scheduler = autoscribe.DeadlineScheduler(sleep=interrupted_sleep)
+    assert not scheduler.wait(50)
+    assert woken and woken[0] > 0.04
+    scheduler.sleep = autoscribe._plain_sleep
+    started = time.perf_counter()
+    assert scheduler.wait(0)  # Finishes the rest of the gap
+    assert time.perf_counter() >= scheduler.deadline
+    assert time.perf_counter() - started >= 0.04
+
+
+def test_excluded_time_pushes_the_schedule_back():
+    scheduler = autoscribe.DeadlineScheduler(time_scale=0.1)
+    scheduler.exclude(0.05)
+    started = time.perf_counter()
+    scheduler.wait(100)  # 10 ms scaled, after the 50 ms exclusion
+    assert time.perf_counter() - started >= 0.059
+    scheduler.advance(10)
+    report = scheduler.report()
+    assert report["planned_s"] == 0.1
+    assert abs(report["drift_ms"]) < 30
+
+
+def test_async_waits_keep_the_same_schedule():
+    async def run():
+        scheduler = autoscribe.DeadlineScheduler()
+        started = time.perf_counter()
+        for _ in range(20):
+            time.sleep(0.004)
+            assert await scheduler.wait_async(10)
+        return time.perf_counter() - started
+
+    assert 0.2 <= asyncio.run(run()) < 0.24
+
+
+def test_late_async_waits_still_yield_to_the_loop():
+    ran = []
+
+    async def other():
+        ran.append(True)
+
+    async def run():
+        scheduler = autoscribe.DeadlineScheduler(max_lag=10)
+        time.sleep(0.05)
+        task = asyncio.ensure_future(other())
+        assert await scheduler.wait_async(1)  # Late: returns at once but lets other() run
+        return task
+
+    asyncio.run(run())
+    assert ran
@@ -0,0 +1,83 @@
+import statistics
+
+import pytest
+
+import autoscribe
+
+pytest.importorskip("numpy")
+
+TEXT = " ".join(autoscribe.BENCH_CORPORA.values()) * 2
+SEEDS = range(40)
+PASTE = {"paste_markup": True, "paste_min_lines": 3, "paste_non_ascii": True}
+BLOCK = "\n".join(f"row {i} = value + {i}" for i in range(12))
+MIXED = (
+    autoscribe.BENCH_CORPORA["prose"][:600] + f"\n[[paste]]HEADER: naïve café[[/paste]]\n{BLOCK}\n\n"
+    "Crème brûlée and jalapeño, typed around the pasted ünïcode.\n"
+)
+SOURCES = dict(autoscribe.BENCH_CORPORA, mixed=MIXED)
+
+
+def planned_durations(engine_name, settings, monkeypatch, text=TEXT):
+    """Durations (s) of real plans of text, one per seed, on the given timing engine."""
+    make = autoscribe.make_timing_model
+    monkeypatch.setattr(
+        autoscribe, "make_timing_model",
+        lambda *args, **kwargs: make(*args, **dict(kwargs, engine=engine_name)),
+    )
+    durations = []
+    for seed in SEEDS:
+        engine = autoscribe.TypingEngine()
+        engine.apply_settings(dict(settings, seed=seed))
+        engine.prepare()
+        durations.append(engine.build_plan(text).total_delay() / 1000)
+    return durations
+
+
+@pytest.mark.parametrize("engine_name", ["batch", "scalar"])
+@pytest.mark.parametrize(
+    "settings",
+    [
+        {"min_wpm": 60, "max_wpm": 80, "typo_min_words": 5, "typo_max_words": 12},
+        {"min_wpm": 30, "max_wpm": 50, "typo_min_words": 2, "typo_max_words": 4},
+        {"min_wpm": 120, "max_wpm": 160, "typo_min_words": 10, "typo_max_words": 20},
+    ],
+    ids=["default", "slow-sloppy", "fast"],
+)
+def test_simulation_matches_planned_durations(engine_name, settings, monkeypatch):
+    planned = planned_durations(engine_name, settings, monkeypatch)
+    result = autoscribe.simulate_durations(
+        autoscribe.SourceProfile.from_chunks([TEXT]),
+        settings["min_wpm"], settings["max_wpm"], settings["typo_min_words"], settings["typo_max_words"],
+        runs=400, seed=1,
+    )
+    simulated = result["duration_s"]
+    assert simulated["p50"] == pytest.approx(statistics.median(planned), rel=0.01)
+    assert simulated["mean"] == pytest.approx(statistics.fmean(planned), rel=0.01)
+    assert simulated["p95"] == pytest.approx(statistics.quantiles(planned, n=20)[18], rel=0.015)
+    assert 0.6 < simulated["stdev"] / statistics.pstdev(planned) < 1.6
+
+
+def test_simulation_costs_pasted_segments_like_the_planner():
+    body = "\n".join(f"row {i} = value + {i}" for i in range(200))
+    text = f"Some prose first.\n[[paste]]\n{body}\n[[/paste]]\nThe end."
+    splitter = autoscribe.make_splitter(markup=True)
+    result = autoscribe.simulate_durations(
+        autoscribe.SourceProfile.from_chunks([text], splitter=splitter), runs=200, seed=1
+    )
+    assert result["pastes"] == 1
+    assert result["duration_s"]["p95"] < 30
+
+
+@pytest.mark.parametrize("layout", ["qwerty", "azerty"])
+@pytest.mark.parametrize("source", sorted(SOURCES))
+def test_simulation_matches_planned_durations_per_source(source, layout, monkeypatch):
+    text = SOURCES[source] * (6000 // len(SOURCES[source]))
+    paste = PASTE if source == "mixed" else {}  # Pasting the code corpus would leave nothing to type
+    settings = dict(paste, typo_min_words=3, typo_max_words=8, layout=layout)
+    planned = planned_durations("batch", settings, monkeypatch, text)
+    splitter = autoscribe.make_splitter(markup=True, min_lines=3, non_ascii=True) if paste else None
+    profile = autoscribe.SourceProfile.from_chunks([text], layout, splitter)
+    simulated = autoscribe.simulate_durations(profile, typo_min_words=3, typo_max_words=8, runs=400, seed=1)
+    assert simulated["duration_s"]["p50"] == pytest.approx(statistics.median(planned), rel=0.015)
+    assert simulated["duration_s"]["mean"] == pytest.approx(statistics.fmean(planned), rel=0.015)
+    assert simulated["duration_s"]["p95"] == pytest.approx(statistics.quantiles(planned, n=20)[18], rel=0.02)
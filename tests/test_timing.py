@@ -0,0 +1,25 @@
+import random
+
+import pytest
+
+import autoscribe
+
+pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("min_wpm,max_wpm", [(30, 50), (60, 80), (100, 150)])
+def test_batch_engine_matches_scalar_distribution(min_wpm, max_wpm):
+    result = autoscribe.compare_timing_engines(100000, min_wpm, max_wpm, seed=1)
+    scalar, batch = result["scalar"], result["batch"]
+    assert batch["mean"] == pytest.approx(scalar["mean"], rel=0.02)
+    assert batch["p50"] == pytest.approx(scalar["p50"], rel=0.02)
+    assert batch["p95"] == pytest.approx(scalar["p95"], rel=0.04)
+    assert result["ks_distance"] < 0.02
+
+
+def test_batch_engine_is_reproducible_from_the_session_rng():
+    def delays(seed):
+        return autoscribe.BatchTimingModel(60, 80, rng=random.Random(seed)).delays(1000).tolist()
+
+    assert delays(5) == delays(5)
+    assert delays(5) != delays(6)
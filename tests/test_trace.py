@@ -0,0 +1,72 @@
+import pytest
+
+import autoscribe
+
+TEXT = (
+    "Traces keep the keystrokes a session emitted, typos and corrections included.\n"
+    "[[paste]]Pasted: naïve[[/paste]] and typed again.\n"
+) * 40
+PASTE = {"paste_markup": True, "paste_non_ascii": True}
+
+
+def typed_with_trace(make_engine, path, settings):
+    engine = make_engine(seed=3, **settings)
+    engine.prepare(len(TEXT.strip()))
+    with autoscribe.TraceWriter(path, {"seed": engine.session_seed, "settings": engine.get_settings()}) as trace:
+        assert engine.run(autoscribe.iter_text_chunks(TEXT.strip(), 500), trace=trace)
+    return engine
+
+
+@pytest.mark.parametrize("settings", [{}, {"coalesce_ms": 40.0}, PASTE], ids=["plain", "coalesced", "paste"])
+def test_trace_round_trip_replays_the_same_keystrokes(tmp_path, make_engine, settings):
+    path = str(tmp_path / "session.trace")
+    engine = typed_with_trace(make_engine, path, settings)
+    trace = autoscribe.KeystrokeTrace.load(path)
+    assert trace.header["seed"] == engine.session_seed
+    assert trace.source_length() == engine.current_index == len(TEXT.strip())
+    assert len(trace.times) == len(trace)
+
+    replayer = make_engine()
+    replayer.prepare(trace.source_length())
+    assert replayer.replay(trace)
+    assert replayer.backend.keys == engine.backend.keys
+    assert replayer.current_index == engine.current_index
+
+
+def test_saved_trace_loads_back_identical(tmp_path, make_engine):
+    path = str(tmp_path / "session.trace")
+    typed_with_trace(make_engine, path, PASTE)
+    trace = autoscribe.KeystrokeTrace.load(path)
+    copy_path = str(tmp_path / "copy.trace")
+    trace.save(copy_path)
+    copy = autoscribe.KeystrokeTrace.load(copy_path)
+    assert list(copy) == list(trace)
+    assert copy.pastes == trace.pastes
+    assert copy.times == trace.times
+
+
+def test_trace_cut_short_by_a_crash_keeps_its_complete_blocks(tmp_path, make_engine):
+    path = str(tmp_path / "session.trace")
+    typed_with_trace(make_engine, path, {})
+    complete = autoscribe.KeystrokeTrace.load(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:-7])
+    cut = autoscribe.KeystrokeTrace.load(path)
+    assert 0 < len(cut) < len(complete)
+    assert list(cut) == list(complete)[:len(cut)]
+
+
+def test_trace_is_readable_while_the_session_runs(tmp_path):
+    path = str(tmp_path / "live.trace")
+    writer = autoscribe.TraceWriter(path, {"seed": 1}, flush_every=100, flush_s=1.0)
+    assert autoscribe.KeystrokeTrace.load(path).header["seed"] == 1
+
+    for i in range(250):
+        writer.record("a", autoscribe.ACTION_WRITE, 10.0, 1, i * 0.001)
+    assert len(autoscribe.KeystrokeTrace.load(path)) == 200  # Every flush_every events
+
+    writer.record("b", autoscribe.ACTION_WRITE, 10.0, 1, 1.5)
+    assert len(autoscribe.KeystrokeTrace.load(path)) == 251  # flush_s after the block began
+    writer.close()